@@ -0,0 +1,126 @@
+"""
+Benchmark: TitleIndex.match vs the linear CalendarBase.match_event scan
+
+Run from anywhere:  python backend/benchmarks/bench_title_index.py
+
+Before timing, checks that the index returns the same event as the linear
+scan on randomized calendars and queries (typos, names, strings sharing no
+trigram with any title, time windows, tied start times), and exits
+non-zero on any disagreement.
+
+Queries without an exact or substring hit stay linear in the number of
+distinct titles (see TitleIndex), so the index time grows with n; the
+speedup over match_event is a constant factor.
+"""
+
+from pathlib import Path
+import contextlib
+import io
+import random
+import string
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Add backend directory to path
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from services.calendar_service import CalendarBase
+from utils.title_index import TitleIndex
+from utils.date_parser import DateParser
+from benchmarks.corpus import synthetic_events, WORDS, TITLE_QUERIES as QUERIES
+
+# Queries that share no word (and often no trigram) with the corpus titles
+STRAY_QUERIES = ['priya', 'xyz', 'qq', 'z', 'mom', '1:1 with priya', 'review yoga']
+
+def random_query(rng: random.Random) -> str:
+    kind = rng.randrange(4)
+    if kind == 0:
+        return rng.choice(STRAY_QUERIES)
+    if kind == 1:
+        return ''.join(rng.choice(string.ascii_lowercase + ' ') for _ in range(rng.randint(1, 12)))
+    word = rng.choice(WORDS)
+    if kind == 2:
+        # One-letter typo
+        i = rng.randrange(len(word))
+        return word[:i] + rng.choice(string.ascii_lowercase) + word[i + 1:]
+    return ' '.join(rng.sample(WORDS, 2))
+
+def random_calendar(rng: random.Random) -> list:
+    """A few events with colliding start times, in start order like the callers pass them"""
+    base = datetime(2026, 1, 1, 9, 0)
+    events = []
+    for i in range(rng.randint(1, 12)):
+        start = base + timedelta(hours=rng.randint(0, 6))
+        title = ' '.join(rng.sample(WORDS + STRAY_QUERIES, rng.randint(1, 3)))
+        events.append({
+            'id': f'ev{i}',
+            'summary': rng.choice([title, title.title(), f"{title} {rng.randint(1, 9)}"]),
+            'start': {'dateTime': start.isoformat() + '+05:30'},
+            'end': {'dateTime': (start + timedelta(hours=1)).isoformat() + '+05:30'}
+        })
+    events.sort(key=lambda e: DateParser.event_bounds(e)[0])
+    return events
+
+def disagreements(cal: CalendarBase, trials: int = 600, seed: int = 3) -> list:
+    """(query, linear id, index id) wherever the two disagree on random calendars"""
+    rng = random.Random(seed)
+    out = []
+    for _ in range(trials):
+        events = random_calendar(rng)
+        index = TitleIndex(events)
+        for _ in range(6):
+            query = random_query(rng)
+            time_min = time_max = None
+            scope = events
+            if rng.random() < 0.3:
+                time_min = DateParser.event_bounds(events[0])[0] + timedelta(hours=rng.randint(0, 3))
+                time_max = time_min + timedelta(hours=rng.randint(1, 4))
+                scope = [e for e in events if DateParser.event_bounds(e)[1] > time_min and DateParser.event_bounds(e)[0] < time_max]
+            linear = (cal.match_event(query, scope) or {}).get('id')
+            indexed = (index.match(query, time_min, time_max) or {}).get('id')
+            if linear != indexed:
+                out.append((query, linear, indexed))
+    return out
+
+def timed(fn, repeat: int) -> float:
+    """Mean seconds per call"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+def main():
+    cal = CalendarBase()
+    with contextlib.redirect_stdout(io.StringIO()):
+        wrong = disagreements(cal)
+    if wrong:
+        for query, linear, indexed in wrong[:10]:
+            print(f"  {query!r}: linear {linear}, index {indexed}")
+        sys.exit(f"TitleIndex disagreed with match_event on {len(wrong)} random queries")
+    print("agreement on random calendars: 100%\n")
+
+    print(f"{'events':>8} {'linear ms':>10} {'index ms':>10} {'speedup':>8} {'build ms':>9} {'agree':>6}")
+    for n in (100, 10_000, 100_000):
+        events = synthetic_events(n)
+        with contextlib.redirect_stdout(io.StringIO()):
+            t0 = time.perf_counter()
+            index = TitleIndex(events)
+            build = time.perf_counter() - t0
+
+            repeat = 20 if n <= 10_000 else 2
+            linear = sum(timed(lambda: cal.match_event(q, events), repeat) for q in QUERIES) / len(QUERIES)
+            indexed = sum(timed(lambda: index.match(q), repeat * 5) for q in QUERIES) / len(QUERIES)
+            rng = random.Random(n)
+            queries = QUERIES + [random_query(rng) for _ in range(8 if n > 10_000 else 40)]
+            agree = sum(
+                (cal.match_event(q, events) or {}).get('id') == (index.match(q) or {}).get('id')
+                for q in queries
+            )
+        print(f"{n:>8} {linear * 1e3:>10.3f} {indexed * 1e3:>10.3f} {linear / indexed:>7.1f}x {build * 1e3:>9.1f} {agree:>3}/{len(queries)}")
+        if agree != len(queries):
+            sys.exit(f"TitleIndex disagreed with match_event at {n} events")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Synthetic chat messages shared by the benchmarks and the extractor checks
+"""
+
+from datetime import datetime, timedelta
+import random
+
+MESSAGES = [
+    "add team meeting tomorrow at 10am",
+    "Add meeting tomorrow at 2pm",
+    "schedule call with John next monday 3pm for 30 min",
+    "book dentist appointment on 30th april at 11am",
+    "create standup on friday from 9:30 to 10 am",
+    "add gym session today from 5 to 6:30 PM",
+    "schedule review this wednesday at 4:15 pm for 2 hours",
+    "set up sync in 3 days at 11 am",
+    "add lunch in 2 weeks at 1pm",
+    "remind me to call mom at 6pm tonight",
+    "add offsite on 12/24 at 9am for 3 hrs",
+    "add flight on 1/5/2027 at 6:45am",
+    "book haircut december 3rd at 10.30 am",
+    "add yoga on sunday 7 am for 45 minutes",
+    "schedule interview of 90 mins next friday at 2 pm",
+    "move standup to 5pm",
+    "reschedule gym to tomorrow 7am for 2 hours",
+    "change the design review to next tuesday at 3:30pm",
+    "update 'Design Review' to 4pm",
+    "delete pwc",
+    "cancel my 3 PM call",
+    "delete the standup tomorrow",
+    "delete all events this month",
+    "delete all events",
+    "clear all meetings next week",
+    "list my events this week",
+    "show my schedule this week",
+    "what's on tomorrow",
+    "show schedules next 10 days",
+    "list events next month",
+    "what do I have on monday",
+    "show my calendar for yesterday",
+    "add party on may 5",
+    "add trip to goa on friday",
+    "add 1:1 with priya at 4",
+    "hello there",
+    "delete standup and add review friday at 3pm and list next week",
+    "schedule 30 min sometime next week",
+    "add planning sep 9 at 12 pm",
+    "add dinner tonight at 8:00 pm for 2 hrs",
+]
+
+def message_corpus(n: int, seed: int = 11) -> list:
+    """n messages sampled from MESSAGES (with repeats, like real traffic)"""
+    rng = random.Random(seed)
+    return [rng.choice(MESSAGES) for _ in range(n)]
+
+WORDS = [
+    'team', 'standup', 'review', 'sync', 'design', 'lunch', 'call', 'client', 'pwc', 'demo',
+    'planning', 'retro', 'interview', 'dentist', 'gym', 'yoga', 'product', 'budget', 'hiring',
+    'offsite', 'weekly', 'monthly', 'one', 'on', 'launch', 'marketing', 'sales', 'board', 'doctor'
+]
+
+TITLE_QUERIES = ['standup', 'team sync', 'dentst', 'client call', 'budget review', 'gym', 'xyz meeting', 'pwc']
+
+def synthetic_events(n: int, seed: int = 7) -> list:
+    """n Calendar event resources, 30 minutes apart, with titles drawn from WORDS"""
+    rng = random.Random(seed)
+    base = datetime(2026, 1, 1, 9, 0)
+    events = []
+    for i in range(n):
+        title = ' '.join(rng.sample(WORDS, rng.randint(1, 3)))
+        if rng.random() < 0.3:
+            title += f" {rng.randint(1, 500)}"
+        start = base + timedelta(minutes=30 * i)
+        events.append({
+            'id': f'ev{i}',
+            'summary': title,
+            'start': {'dateTime': start.isoformat() + '+05:30'},
+            'end': {'dateTime': (start + timedelta(minutes=30)).isoformat() + '+05:30'}
+        })
+    return events
@@ -0,0 +1,172 @@
+"""
+Prompt size report and intent comparison for GroqService
+
+    python backend/benchmarks/prompt_report.py            # token estimate, legacy vs current prompt
+    python backend/benchmarks/prompt_report.py --live     # also run both prompts through Groq (GROQ_BASE_URL)
+                                                          # and fail if any corpus intent differs
+
+Token counts are estimated offline (words and punctuation, about what a
+BPE tokenizer gives for English). --live also reports the prompt_tokens
+the API bills. "varying" is what changes between requests and cannot come
+from the provider's prompt-prefix cache.
+
+The intent comparison only says something about the prompts when
+GROQ_BASE_URL reaches a real model. loadtest/fake_groq answers from the
+user message alone and ignores the prompt, so against it the intents
+always match.
+"""
+
+from pathlib import Path
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+import argparse
+import asyncio
+import re
+import sys
+
+# Add backend directory to path
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from benchmarks.corpus import MESSAGES
+from services.groq_service import GroqService, prompt_messages
+from config import get_settings
+
+TOKEN = re.compile(r"\w+|[^\w\s]")
+LOCAL_HOSTS = {'localhost', '127.0.0.1', '::1'}
+
+def estimate_tokens(text: str) -> int:
+    return len(TOKEN.findall(text))
+
+def legacy_messages(user_message: str) -> list:
+    """The prompt as extract_intent built it before the system prefix split"""
+    now = datetime.now()
+    today_str = now.strftime("%Y-%m-%d")
+    today_day = now.strftime("%A")
+    tomorrow_str = (now + timedelta(days=1)).strftime("%Y-%m-%d")
+
+    # Pre-compute next occurrences of each weekday
+    day_names = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+    next_days = {}
+    for i, name in enumerate(day_names):
+        days_ahead = i - now.weekday()
+        if days_ahead <= 0:
+            days_ahead += 7
+        next_days[name] = (now + timedelta(days=days_ahead)).strftime("%Y-%m-%d")
+
+    next_week_dates = "\n".join(f"  next {name} = {date}" for name, date in next_days.items())
+
+    prompt = f"""You are a calendar assistant. Today is {today_day}, {today_str}.
+
+Reference dates:
+  today = {today_str}
+  tomorrow = {tomorrow_str}
+{next_week_dates}
+
+User message: "{user_message}"
+
+Extract ALL of the following fields from the message:
+- action: one of "create", "update", "delete", "delete_all", "list"
+- title: the event name only (no time/date/duration/action words). null if none.
+- date: event date in YYYY-MM-DD format. Resolve relative expressions using the reference dates above. null if no date mentioned.
+- time: event start time in HH:MM 24-hour format. null if no time mentioned.
+- duration: event duration in minutes as an integer. null if no duration mentioned.
+- time_range: one of "this_week", "this_month", "next_week", "next_month", "next_X_days" (e.g. "next_7_days"), or null
+
+RULES:
+- action "create": triggered by add, schedule, book, create, set up, remind
+- action "update": triggered by move, change, reschedule, update, shift
+- action "delete": triggered by delete, remove, cancel (single event)
+- action "delete_all": triggered by "delete all", "remove all", "cancel all", "clear all"
+- action "list": triggered by list, show, display, what, view
+- title: remove time, date, action words. Keep only the event name. null for list/delete_all.
+- Resolve "next monday", "this friday", "next week", "in 3 days", "April 30" etc. using the reference dates.
+- time_range: detect phrases like "this week", "this month", "next 10 days"
+
+TIME RANGE DETECTION:
+- "this week" -> "this_week"
+- "this month" -> "this_month"
+- "next week" -> "next_week"
+- "next month" -> "next_month"
+- "next 7 days", "next 10 days" -> "next_7_days", "next_10_days"
+
+Examples:
+"list my events this week" -> {{"action":"list","title":null,"date":null,"time":null,"duration":null,"time_range":"this_week"}}
+"show schedules next 10 days" -> {{"action":"list","title":null,"date":null,"time":null,"duration":null,"time_range":"next_10_days"}}
+"delete all events this month" -> {{"action":"delete_all","title":null,"date":null,"time":null,"duration":null,"time_range":"this_month"}}
+"delete all events" -> {{"action":"delete_all","title":null,"date":null,"time":null,"duration":null,"time_range":null}}
+"add meeting tomorrow at 10am" -> {{"action":"create","title":"meeting","date":"{tomorrow_str}","time":"10:00","duration":null,"time_range":null}}
+"delete pwc" -> {{"action":"delete","title":"pwc","date":null,"time":null,"duration":null,"time_range":null}}
+
+Respond ONLY with valid JSON, no explanation."""
+
+    return [
+        {"role": "system", "content": "You are a JSON-only calendar parser. Return only valid JSON."},
+        {"role": "user", "content": prompt}
+    ]
+
+def shared_prefix(a: str, b: str) -> int:
+    """Length of the common prefix of a and b"""
+    n = 0
+    while n < min(len(a), len(b)) and a[n] == b[n]:
+        n += 1
+    return n
+
+def token_report():
+    print(f"{'prompt':<8} {'total':>7} {'system':>7} {'user':>6} {'varying':>8}")
+    for name, build in (('legacy', legacy_messages), ('current', prompt_messages)):
+        totals, systems, users, varying = [], [], [], []
+        for message in MESSAGES:
+            msgs = build(message)
+            system, user = msgs[0]['content'], msgs[1]['content']
+            other = build("x")[1]['content']
+            systems.append(estimate_tokens(system))
+            users.append(estimate_tokens(user))
+            totals.append(systems[-1] + users[-1])
+            # Everything after the prefix shared with another message varies per request
+            varying.append(estimate_tokens(user[shared_prefix(user, other):]))
+        mean = lambda xs: sum(xs) / len(xs)
+        print(f"{name:<8} {mean(totals):>7.0f} {mean(systems):>7.0f} {mean(users):>6.0f} {mean(varying):>8.0f}")
+
+async def live_check() -> int:
+    """Run every corpus message through both prompts; returns the number of differing intents"""
+    groq = GroqService()
+    mismatches = 0
+    billed = {'legacy': 0, 'current': 0}
+    try:
+        for message in MESSAGES:
+            intents = {}
+            for name, build in (('legacy', legacy_messages), ('current', prompt_messages)):
+                response = await groq._complete(build(message))
+                billed[name] += response.usage.prompt_tokens
+                intents[name] = GroqService.parse_completion(response.choices[0].message.content.strip())
+            if intents['legacy'] != intents['current']:
+                mismatches += 1
+                print(f"✗ {message!r}\n    legacy:  {intents['legacy']}\n    current: {intents['current']}")
+    finally:
+        await groq.close()
+
+    n = len(MESSAGES)
+    endpoint = get_settings().GROQ_BASE_URL or 'the Groq API'
+    print(f"\nbilled prompt tokens per request: legacy {billed['legacy'] / n:.0f}, current {billed['current'] / n:.0f}")
+    print(f"{n - mismatches}/{n} corpus intents identical from {endpoint}")
+    if urlparse(get_settings().GROQ_BASE_URL).hostname in LOCAL_HOSTS:
+        print(
+            "⚠️  That is a local endpoint. If it is loadtest/fake_groq, it ignores the prompt and\n"
+            "   derives intents from the user message, so this is not a check of the prompt change."
+        )
+    else:
+        print("   Each prompt ran once at temperature 0.1, so sampling noise can add differences.")
+    return mismatches
+
+def main():
+    parser = argparse.ArgumentParser(description="Prompt size report and intent comparison")
+    parser.add_argument('--live', action='store_true', help="call the configured Groq endpoint with both prompts")
+    args = parser.parse_args()
+
+    token_report()
+    if args.live:
+        sys.exit(1 if asyncio.run(live_check()) else 0)
+
+if __name__ == "__main__":
+    main()
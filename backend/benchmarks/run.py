@@ -0,0 +1,213 @@
+"""
+Micro-benchmarks for the per-message parsing and matching hot paths
+
+    python backend/benchmarks/run.py                 # report
+    python backend/benchmarks/run.py --check         # fail on regression vs baseline.json
+    python backend/benchmarks/run.py --save          # record a new baseline
+    python backend/benchmarks/run.py -k matcher      # only cases whose name contains "matcher"
+
+Each case reports ops/sec and per-call p50/p95/p99 latency from the best
+of --repeats rounds (lowest p50); the garbage collector is off while
+timing, as in timeit. Every round is paired with a round of a fixed
+calibration workload, and a case's "relative" cost is the median over
+rounds of its mean time per call divided by the calibration's. Rounds
+cover whole passes over the inputs, so the mean weighs every input the
+same way each time, where a p50 would jump between the fast and slow
+queries of the matcher cases. Host speed and drift between rounds
+largely cancel out of the ratio.
+
+--check compares those ratios, not raw microseconds, so a baseline
+recorded on one machine holds on another. It fails when a case's
+relative cost is more than --tolerance above the baseline's, or more
+than --small-tolerance for cases under SMALL_CASE_US, where timer
+overhead and cache effects dominate.
+"""
+
+from pathlib import Path
+import argparse
+import contextlib
+import gc
+import io
+import json
+import re
+import statistics
+import sys
+import time
+
+# Add backend directory to path
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from benchmarks.corpus import message_corpus, synthetic_events, TITLE_QUERIES
+from utils.nlp_extractor import NLPExtractor, _extract_all
+from utils.date_parser import DateParser
+from utils.event_matcher import EventMatcher
+from utils.intent_parser import IntentParser
+from utils.title_index import TitleIndex
+from services.calendar_service import CalendarBase
+from services.groq_service import GroqService
+
+BASELINE_FILE = Path(__file__).resolve().parent / "baseline.json"
+EVENT_SIZES = (100, 1_000, 10_000)
+# Rounds take whole multiples of this many samples: one pass over TITLE_QUERIES, so
+# every round of a slow matcher case sees the same query mix
+MIN_SAMPLES = len(TITLE_QUERIES)
+# Cases faster than this get --small-tolerance
+SMALL_CASE_US = 10.0
+# Stored next to a case's numbers in the baseline, for whoever reads them there
+CASE_NOTES = {
+    'title_index.match': (
+        "Linear in distinct titles when the query has no exact or substring hit: "
+        "the fuzzy step bounds, and often scores, every title to return exactly "
+        "what calendar.match_event returns"
+    ),
+}
+
+CALIBRATION_TEXT = "schedule the weekly design review with Priya next tuesday at 4:30 pm for 45 minutes"
+CALIBRATION_TOKEN = re.compile(r'\d+(?::\d+)?\s*(?:am|pm)?')
+
+def calibration():
+    """Fixed string, dict and regex work, the same kind the parsing hot paths do"""
+    counts = {}
+    for word in CALIBRATION_TEXT.lower().split():
+        counts[word] = counts.get(word, 0) + len(word)
+    return CALIBRATION_TOKEN.findall(CALIBRATION_TEXT), sorted(counts)
+
+def cycle(items):
+    """Endless iterator over items, so each call sees a different input"""
+    while True:
+        yield from items
+
+def build_cases() -> dict:
+    """name -> zero-argument callable doing one unit of work"""
+    messages = message_corpus(500)
+    groq = GroqService()
+    cal = CalendarBase()
+    cases = {}
+
+    def per_message(fn):
+        it = cycle(messages)
+        return lambda: fn(next(it))
+
+    # Bypass the memo so every call does the full extraction
+    cases['nlp.extract_all'] = per_message(lambda m: _extract_all.__wrapped__(m, ''))
+    cases['nlp.extract_all_memoized'] = per_message(NLPExtractor.extract_all)
+    cases['date_parser.parse_relative'] = per_message(DateParser.parse_relative)
+    cases['date_parser.parse_time'] = per_message(DateParser.parse_time)
+    cases['date_parser.extract_duration'] = per_message(DateParser.extract_duration)
+    cases['groq.fallback'] = per_message(groq._fallback)
+    cases['groq.extract_title'] = per_message(groq._extract_title)
+    cases['intent_parser.parse'] = per_message(IntentParser.parse)
+
+    for n in EVENT_SIZES:
+        events = synthetic_events(n)
+        index = TitleIndex(events)
+        queries = cycle(TITLE_QUERIES)
+        cases[f'matcher.find_match[{n}]'] = lambda e=events: EventMatcher.find_match(next(queries), e)
+        cases[f'matcher.find_all[{n}]'] = lambda e=events: EventMatcher.find_all(next(queries), e)
+        cases[f'calendar.match_event[{n}]'] = lambda e=events: cal.match_event(next(queries), e)
+        cases[f'title_index.match[{n}]'] = lambda i=index: i.match(next(queries))
+    return cases
+
+def measure(fn, min_time: float, max_calls: int) -> dict:
+    """Time individual calls until min_time has elapsed (or max_calls)"""
+    # One untimed pass over the inputs, so every query's caches are warm
+    for _ in range(MIN_SAMPLES):
+        fn()
+
+    samples = []
+    clock = time.perf_counter_ns
+    deadline = time.perf_counter() + min_time
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        while len(samples) < max_calls and (
+            len(samples) < MIN_SAMPLES or len(samples) % MIN_SAMPLES or time.perf_counter() < deadline
+        ):
+            start = clock()
+            fn()
+            samples.append(clock() - start)
+    finally:
+        if collecting:
+            gc.enable()
+
+    samples.sort()
+    def pct(p):
+        return samples[min(len(samples) - 1, int(p * len(samples)))] / 1e3
+
+    return {
+        'calls': len(samples),
+        'ops_per_sec': round(len(samples) / (sum(samples) / 1e9), 1),
+        'mean_us': round(sum(samples) / len(samples) / 1e3, 2),
+        'p50_us': round(pct(0.50), 2),
+        'p95_us': round(pct(0.95), 2),
+        'p99_us': round(pct(0.99), 2)
+    }
+
+def paired_rounds(fn, repeats: int, min_time: float, max_calls: int) -> dict:
+    """
+    Best of repeats rounds, each right after a calibration round
+
+    The result also carries 'relative': the median over rounds of the
+    round's mean time per call divided by its calibration round's.
+    """
+    rounds, ratios = [], []
+    for _ in range(repeats):
+        unit = measure(calibration, min_time / repeats, max_calls // repeats)['mean_us']
+        r = measure(fn, min_time / repeats, max_calls // repeats)
+        rounds.append(r)
+        ratios.append(r['mean_us'] / unit)
+    best = min(rounds, key=lambda r: r['p50_us'])
+    best['relative'] = round(statistics.median(ratios), 3)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-k', default='', help='only run cases whose name contains this')
+    parser.add_argument('--min-time', type=float, default=0.5, help='seconds to spend per case')
+    parser.add_argument('--max-calls', type=int, default=100_000)
+    parser.add_argument('--check', action='store_true', help='exit 1 if any relative cost regressed past the baseline')
+    parser.add_argument('--repeats', type=int, default=9, help='rounds per case; the lowest p50 is kept')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative slowdown for --check (0.25 = 25%%)')
+    parser.add_argument('--small-tolerance', type=float, default=0.6, help=f'allowed slowdown for cases under {SMALL_CASE_US:g}us')
+    parser.add_argument('--save', action='store_true', help=f'write results to {BASELINE_FILE.name}')
+    args = parser.parse_args()
+
+    baseline = json.loads(BASELINE_FILE.read_text()) if BASELINE_FILE.exists() else {}
+    results = {}
+    regressions = []
+
+    cases = build_cases()
+    print(f"{'case':<34} {'ops/sec':>12} {'p50 us':>10} {'p95 us':>10} {'p99 us':>10} {'relative':>9} {'vs base':>8}")
+    for name, fn in cases.items():
+        if args.k not in name:
+            continue
+        # Matchers print their decisions; keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            r = paired_rounds(fn, args.repeats, args.min_time, args.max_calls)
+        note = CASE_NOTES.get(name.split('[')[0])
+        if note:
+            r['note'] = note
+        results[name] = r
+
+        delta = ''
+        if baseline.get(name, {}).get('relative'):
+            change = r['relative'] / baseline[name]['relative'] - 1
+            delta = f"{change:+.0%}"
+            small = min(r['p50_us'], baseline[name]['p50_us']) < SMALL_CASE_US
+            if change > (args.small_tolerance if small else args.tolerance):
+                regressions.append((name, change))
+        print(f"{name:<34} {r['ops_per_sec']:>12,.0f} {r['p50_us']:>10.2f} {r['p95_us']:>10.2f} {r['p99_us']:>10.2f} {r['relative']:>9.2f} {delta:>8}")
+
+    if args.save:
+        BASELINE_FILE.write_text(json.dumps({**baseline, **results}, indent=2, sort_keys=True) + "\n")
+        print(f"\n💾 Baseline written to {BASELINE_FILE}")
+
+    if args.check and regressions:
+        print(f"\n❌ {len(regressions)} case(s) regressed more than {args.tolerance:.0%}:")
+        for name, change in regressions:
+            print(f"   {name}: relative cost {change:+.0%}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
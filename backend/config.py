@@ -13,20 +13,73 @@ class Settings(BaseSettings):
     GOOGLE_CLIENT_SECRET: str = Field(default="")
     GOOGLE_REDIRECT_URI: str = Field(default="http://localhost:8000/auth/callback")
     
+    # Google Calendar API
+    GOOGLE_CALENDAR_API_URL: str = Field(default="https://www.googleapis.com/calendar/v3")
+    GOOGLE_CALENDAR_BATCH_URL: str = Field(default="https://www.googleapis.com/batch/calendar/v3")
+    CALENDAR_BATCH_CONCURRENCY: int = Field(default=4)
+    CALENDAR_POOL_SIZE: int = Field(default=256)
+    CALENDAR_POOL_TTL_SECONDS: int = Field(default=1800)
+    # Refresh access tokens this long before they expire; the loop checks active users this often
+    CREDENTIAL_REFRESH_BEFORE_SECONDS: int = Field(default=300)
+    CREDENTIAL_CHECK_SECONDS: int = Field(default=60)
+    
+    # Local event mirror (events_cache)
+    EVENT_MIRROR_ENABLED: bool = Field(default=True)
+    EVENT_MIRROR_TTL_SECONDS: int = Field(default=60)
+    # While a push channel watches the calendar, trust the mirror this long between syncs
+    EVENT_MIRROR_WATCHED_TTL_SECONDS: int = Field(default=3600)
+    # Days listed for create-time conflict checks when the mirror is off
+    CONFLICT_WINDOW_DAYS: int = Field(default=7)
+    
+    # Free-slot search for creates without a time (working hours in Asia/Kolkata)
+    WORK_DAY_START: str = Field(default="09:00")
+    WORK_DAY_END: str = Field(default="18:00")
+    SLOT_BUFFER_MINUTES: int = Field(default=10)
+    SLOT_WEEKENDS: bool = Field(default=False)
+    SLOT_SEARCH_DAYS: int = Field(default=7)
+    
     # Groq API (replacing Gemini)
     GROQ_API_KEY: str = Field(default="")
+    GROQ_BASE_URL: str = Field(default="")
+    GROQ_TIMEOUT_SECONDS: float = Field(default=4.0)
+    # Send a second completion when the first is slower than the observed p95
+    GROQ_HEDGE_ENABLED: bool = Field(default=True)
+    GROQ_HEDGE_MIN_SAMPLES: int = Field(default=20)
+    # Skip Groq when the local parser is at least this confident
+    LOCAL_INTENT_THRESHOLD: float = Field(default=0.9)
+    INTENT_CACHE_SIZE: int = Field(default=1024)
+    INTENT_CACHE_TTL_SECONDS: int = Field(default=3600)
     
     # MongoDB
     MONGODB_URI: str = Field(default="mongodb://localhost:27017/")
     DATABASE_NAME: str = Field(default="calpal_db")
+    USER_CACHE_SIZE: int = Field(default=1024)
+    USER_CACHE_TTL_SECONDS: int = Field(default=60)
+    # chat_history write-behind buffer; turns are dropped while the queue is full
+    CHAT_HISTORY_QUEUE_SIZE: int = Field(default=10000)
+    CHAT_HISTORY_BATCH_SIZE: int = Field(default=200)
+    CHAT_HISTORY_FLUSH_SECONDS: float = Field(default=1.0)
+    CHAT_HISTORY_RETENTION_DAYS: int = Field(default=90)
+    # Follow-up context ("delete the third one") per user
+    SESSION_STORE_SIZE: int = Field(default=4096)
+    SESSION_TTL_SECONDS: int = Field(default=1800)
     
     # JWT
     JWT_SECRET_KEY: str = Field(default="change-this-secret-key-in-production")
     JWT_ALGORITHM: str = Field(default="HS256")
     JWT_EXPIRATION_HOURS: int = Field(default=24)
     
+    # Calendar push notifications (events.watch); empty disables them.
+    # Google only delivers to a public https URL: {WEBHOOK_BASE_URL}/webhooks/calendar
+    WEBHOOK_BASE_URL: str = Field(default="")
+    WATCH_TTL_SECONDS: int = Field(default=604800)
+    WATCH_RENEW_BEFORE_SECONDS: int = Field(default=86400)
+    WATCH_CHECK_SECONDS: int = Field(default=600)
+    
     # App
     FRONTEND_URL: str = Field(default="http://localhost:5173")
+    # DEBUG shows the per-message trace (intents, matches, Calendar calls)
+    LOG_LEVEL: str = Field(default="INFO")
     
     class Config:
         env_file = str(ENV_FILE)
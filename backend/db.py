@@ -0,0 +1,20 @@
+from motor.motor_asyncio import AsyncIOMotorClient
+from config import get_settings
+
+settings = get_settings()
+
+# One async client per process, opened and closed by the FastAPI lifespan
+_client: AsyncIOMotorClient = None
+
+def get_db():
+    """Shared async database handle"""
+    global _client
+    if _client is None:
+        _client = AsyncIOMotorClient(settings.MONGODB_URI)
+    return _client[settings.DATABASE_NAME]
+
+def close_db():
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
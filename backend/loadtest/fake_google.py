@@ -0,0 +1,226 @@
+"""
+Local stand-in for the Google OAuth token endpoint and Calendar v3 API
+
+Implements just what calPal calls: events list/insert/import/get/update/delete
+(with pageToken and syncToken), freeBusy, events.watch / channels.stop
+(notifications delivered by fake_notifier.py), the batch endpoint, and
+token refresh.
+Every request can be delayed (latency_ms + random jitter_ms) and failed
+with probability error_rate (503), so the app's tail behaviour can be
+exercised without touching Google.
+
+Each bearer token is its own calendar. Tokens are handed out by /token
+as the refresh token itself, so seeded users keep their data after a
+refresh.
+"""
+
+from fastapi import FastAPI, Request, Response, HTTPException
+from loadtest.fake_notifier import FakeNotifier
+from datetime import datetime, timezone
+import asyncio
+import itertools
+import json
+import random
+import re
+
+class FakeCalendar:
+    """One user's events plus a change log for incremental sync"""
+    def __init__(self):
+        self.events = {}
+        self.changes = []          # (version, event) in order
+        self.version = 0
+        self.channels = {}         # open push channels, by id
+
+    def touch(self, event: dict):
+        self.version += 1
+        event['updated'] = datetime.now(timezone.utc).isoformat()
+        self.changes.append((self.version, dict(event)))
+        for channel in self.channels.values():
+            channel.changed()
+
+def _bound(value: str) -> datetime:
+    dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+def _start(event: dict) -> datetime:
+    point = event['start']
+    return _bound(point.get('dateTime') or point['date'] + 'T00:00:00+05:30')
+
+def _end(event: dict) -> datetime:
+    point = event['end']
+    return _bound(point.get('dateTime') or point['date'] + 'T00:00:00+05:30')
+
+def create_app(latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0.0) -> FastAPI:
+    app = FastAPI(title="fake Google Calendar")
+    app.state.calendars = {}
+    app.state.latency_ms = latency_ms
+    app.state.jitter_ms = jitter_ms
+    app.state.error_rate = error_rate
+    app.state.notifier = FakeNotifier()
+    ids = itertools.count()
+
+    def calendar_for(request: Request) -> FakeCalendar:
+        token = request.headers.get('authorization', '').removeprefix('Bearer ').strip()
+        if not token:
+            raise HTTPException(status_code=401, detail="missing token")
+        return app.state.calendars.setdefault(token, FakeCalendar())
+
+    @app.middleware("http")
+    async def inject_faults(request: Request, call_next):
+        delay = app.state.latency_ms + random.uniform(0, app.state.jitter_ms)
+        if delay:
+            await asyncio.sleep(delay / 1000)
+        if random.random() < app.state.error_rate:
+            return Response(status_code=503, content='{"error": "injected"}', media_type="application/json")
+        return await call_next(request)
+
+    def list_events(cal: FakeCalendar, params) -> tuple:
+        sync_token = params.get('syncToken')
+        if sync_token is not None:
+            if not sync_token.isdigit() or int(sync_token) > cal.version:
+                return 410, {'error': {'code': 410, 'message': 'Sync token is no longer valid'}}
+            latest = {}
+            for version, event in cal.changes:
+                if version > int(sync_token):
+                    latest[event['id']] = event
+            items = list(latest.values())
+        else:
+            items = list(cal.events.values())
+            if params.get('timeMin'):
+                time_min = _bound(params['timeMin'])
+                items = [e for e in items if _end(e) > time_min]
+            if params.get('timeMax'):
+                time_max = _bound(params['timeMax'])
+                items = [e for e in items if _start(e) < time_max]
+            items.sort(key=_start)
+
+        offset = int(params.get('pageToken') or 0)
+        size = int(params.get('maxResults') or 250)
+        page = items[offset:offset + size]
+        # Honour an items(...) partial-response mask
+        mask = re.match(r'items\(([^)]*)\)', params.get('fields') or '')
+        if mask:
+            keys = mask.group(1).split(',')
+            page = [{k: e[k] for k in keys if k in e} for e in page]
+        body = {'kind': 'calendar#events', 'items': page}
+        if offset + size < len(items):
+            body['nextPageToken'] = str(offset + size)
+        else:
+            body['nextSyncToken'] = str(cal.version)
+        return 200, body
+
+    def freebusy(cal: FakeCalendar, body: dict) -> tuple:
+        time_min, time_max = _bound(body['timeMin']), _bound(body['timeMax'])
+        spans = sorted(
+            (max(_start(e), time_min), min(_end(e), time_max)) for e in cal.events.values()
+            if e.get('transparency') != 'transparent' and _end(e) > time_min and _start(e) < time_max
+        )
+        # Google reports merged busy blocks
+        busy = []
+        for start, end in spans:
+            if busy and start <= busy[-1][1]:
+                busy[-1][1] = max(busy[-1][1], end)
+            else:
+                busy.append([start, end])
+        fmt = lambda dt: dt.astimezone(timezone.utc).isoformat().replace('+00:00', 'Z')
+        return 200, {
+            'kind': 'calendar#freeBusy',
+            'timeMin': body['timeMin'],
+            'timeMax': body['timeMax'],
+            'calendars': {'primary': {'busy': [{'start': fmt(s), 'end': fmt(e)} for s, e in busy]}}
+        }
+
+    def handle(cal: FakeCalendar, method: str, path: str, params, body) -> tuple:
+        """Dispatch one Calendar call; shared by the REST routes and the batch endpoint"""
+        if path == '/calendar/v3/freeBusy' and method == 'POST':
+            return freebusy(cal, body)
+        if path == '/calendar/v3/calendars/primary/events/watch' and method == 'POST':
+            return 200, app.state.notifier.watch(cal, body)
+        if path == '/calendar/v3/channels/stop' and method == 'POST':
+            if not app.state.notifier.stop(body):
+                return 404, {'error': {'code': 404, 'message': 'Channel not found'}}
+            return 204, None
+        m = re.match(r'^/calendar/v3/calendars/primary/events(?:/([^/?]+))?$', path)
+        if not m:
+            return 404, {'error': {'code': 404, 'message': f'no route {path}'}}
+        event_id = m.group(1)
+
+        if event_id is None and method == 'GET':
+            return list_events(cal, params)
+        if event_id == 'import' and method == 'POST':
+            # events.import: one event per iCalUID, updated in place on re-import
+            existing = next((e for e in cal.events.values() if e.get('iCalUID') == body.get('iCalUID')), None)
+            event = dict(body, id=existing['id'] if existing else f"fake{next(ids)}", status='confirmed')
+            cal.events[event['id']] = event
+            cal.touch(event)
+            return 200, event
+        if event_id is None and method == 'POST':
+            event = dict(body, id=f"fake{next(ids)}", status='confirmed')
+            cal.events[event['id']] = event
+            cal.touch(event)
+            return 200, event
+        if event_id not in cal.events:
+            return 404, {'error': {'code': 404, 'message': 'Not Found'}}
+        if method == 'GET':
+            return 200, cal.events[event_id]
+        if method == 'PUT':
+            event = dict(body, id=event_id, status='confirmed')
+            cal.events[event_id] = event
+            cal.touch(event)
+            return 200, event
+        if method == 'DELETE':
+            del cal.events[event_id]
+            cal.touch({'id': event_id, 'status': 'cancelled'})
+            return 204, None
+        return 405, {'error': {'code': 405, 'message': 'method not allowed'}}
+
+    def respond(status: int, body) -> Response:
+        if body is None:
+            return Response(status_code=status)
+        return Response(status_code=status, content=json.dumps(body), media_type="application/json")
+
+    @app.post("/token")
+    async def token(request: Request):
+        form = await request.form()
+        return {'access_token': form.get('refresh_token'), 'expires_in': 3600, 'token_type': 'Bearer'}
+
+    @app.api_route("/calendar/v3/{rest:path}", methods=["GET", "POST", "PUT", "DELETE"])
+    async def calendar_api(request: Request, rest: str):
+        raw = await request.body()
+        status, body = handle(
+            calendar_for(request), request.method, request.url.path,
+            request.query_params, json.loads(raw) if raw else None
+        )
+        return respond(status, body)
+
+    @app.post("/batch/calendar/v3")
+    async def batch(request: Request):
+        cal = calendar_for(request)
+        boundary = re.search(r'boundary=([^;\s]+)', request.headers['content-type']).group(1)
+        out = []
+        for part in (await request.body()).decode().split('--' + boundary):
+            item = re.search(r'Content-ID:\s*<item(\d+)>', part)
+            line = re.search(r'^(GET|POST|PUT|DELETE) (\S+) HTTP/1\.1', part, re.M)
+            if not item or not line:
+                continue
+            inner = part[line.end():].replace('\r\n', '\n')
+            raw = inner.split('\n\n', 1)[1].strip() if '\n\n' in inner else ''
+            status, body = handle(cal, line.group(1), line.group(2).split('?')[0], {}, json.loads(raw) if raw else None)
+            out.append(
+                f"--batch_response\r\nContent-Type: application/http\r\n"
+                f"Content-ID: <response-item{item.group(1)}>\r\n\r\n"
+                f"HTTP/1.1 {status} X\r\nContent-Type: application/json\r\n\r\n"
+                f"{json.dumps(body) if body is not None else ''}\r\n"
+            )
+        out.append("--batch_response--")
+        return Response(content="".join(out), media_type="multipart/mixed; boundary=batch_response")
+
+    return app
+
+def seed(app: FastAPI, token: str, events: list):
+    """Preload a user's calendar"""
+    cal = app.state.calendars.setdefault(token, FakeCalendar())
+    for event in events:
+        event = dict(event, status='confirmed')
+        cal.events[event['id']] = event
+        cal.touch(event)
@@ -0,0 +1,58 @@
+"""
+Local stand-in for Groq's OpenAI-compatible chat completions endpoint
+
+Answers with the intents IntentParser derives from the user message in the
+prompt, wrapped in a chat.completion response. Latency and error
+injection work like fake_google.
+"""
+
+from fastapi import FastAPI, Request, Response
+import asyncio
+import json
+import random
+import re
+import time
+
+from utils.intent_parser import IntentParser
+
+USER_MESSAGE = re.compile(r'^User message: "(.*)"$', re.M)
+
+def create_app(latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0.0) -> FastAPI:
+    app = FastAPI(title="fake Groq")
+    app.state.latency_ms = latency_ms
+    app.state.jitter_ms = jitter_ms
+    app.state.error_rate = error_rate
+
+    @app.post("/openai/v1/chat/completions")
+    async def completions(request: Request):
+        delay = app.state.latency_ms + random.uniform(0, app.state.jitter_ms)
+        if delay:
+            await asyncio.sleep(delay / 1000)
+        if random.random() < app.state.error_rate:
+            return Response(status_code=503, content='{"error": {"message": "injected"}}', media_type="application/json")
+
+        body = await request.json()
+        prompt = body['messages'][-1]['content']
+        match = USER_MESSAGE.search(prompt)
+        message = match.group(1) if match else prompt
+        intents, _ = IntentParser.parse_all(message)
+
+        content = json.dumps({'actions': [{k: v for k, v in i.items() if k != 'text'} for i in intents]})
+        return {
+            'id': f'chatcmpl-fake-{time.time_ns()}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop'
+            }],
+            'usage': {
+                'prompt_tokens': sum(len(m['content']) for m in body['messages']) // 4,
+                'completion_tokens': len(content) // 4,
+                'total_tokens': (sum(len(m['content']) for m in body['messages']) + len(content)) // 4
+            }
+        }
+
+    return app
@@ -0,0 +1,96 @@
+"""
+Local stand-in for Google's Calendar push-notification delivery
+
+fake_google.py opens a Channel for every events.watch call and tells it
+about each change to that calendar. The channel POSTs the same headers
+Google sends (X-Goog-Channel-ID, X-Goog-Channel-Token, X-Goog-Resource-State,
+...) to the channel's address: first a 'sync' message, then 'exists' for
+changes. Changes within COALESCE_SECONDS go out as one notification,
+roughly as Google batches them.
+"""
+
+import asyncio
+import itertools
+import time
+import uuid
+import httpx
+
+COALESCE_SECONDS = 0.05
+DEFAULT_TTL = 604800
+
+class Channel:
+    def __init__(self, notifier, body: dict):
+        self.notifier = notifier
+        self.id = body['id']
+        self.address = body['address']
+        self.token = body.get('token')
+        self.resource_id = f"res-{uuid.uuid4().hex[:12]}"
+        ttl = int((body.get('params') or {}).get('ttl', DEFAULT_TTL))
+        self.expiration_ms = int((time.time() + ttl) * 1000)
+        self.messages = itertools.count(1)
+        self._pending = None
+
+    def resource(self) -> dict:
+        return {
+            'kind': 'api#channel',
+            'id': self.id,
+            'resourceId': self.resource_id,
+            'resourceUri': 'https://www.googleapis.com/calendar/v3/calendars/primary/events',
+            'token': self.token,
+            'expiration': str(self.expiration_ms)
+        }
+
+    def changed(self):
+        """Schedule an 'exists' notification unless one is already waiting"""
+        if self._pending is None:
+            self._pending = asyncio.get_running_loop().create_task(self.deliver('exists', COALESCE_SECONDS))
+
+    async def deliver(self, state: str, delay: float = 0):
+        if delay:
+            await asyncio.sleep(delay)
+        # Changes from here on get their own notification
+        self._pending = None
+        if time.time() * 1000 > self.expiration_ms:
+            return
+        headers = {
+            'X-Goog-Channel-ID': self.id,
+            'X-Goog-Resource-ID': self.resource_id,
+            'X-Goog-Resource-State': state,
+            'X-Goog-Message-Number': str(next(self.messages)),
+            'X-Goog-Channel-Expiration': time.strftime('%a, %d %b %Y %H:%M:%S GMT', time.gmtime(self.expiration_ms / 1000)),
+            'X-Goog-Resource-URI': self.resource()['resourceUri']
+        }
+        if self.token:
+            headers['X-Goog-Channel-Token'] = self.token
+        try:
+            response = await self.notifier.client().post(self.address, headers=headers)
+            self.notifier.delivered[response.status_code] = self.notifier.delivered.get(response.status_code, 0) + 1
+        except httpx.HTTPError:
+            self.notifier.delivered['error'] = self.notifier.delivered.get('error', 0) + 1
+
+class FakeNotifier:
+    """Every open channel across the fake's calendars, plus delivery counts by status"""
+    def __init__(self):
+        self.channels = {}         # channel id -> (calendar, Channel)
+        self.delivered = {}
+        self._client = None
+
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=5.0)
+        return self._client
+
+    def watch(self, cal, body: dict) -> dict:
+        channel = Channel(self, body)
+        self.channels[channel.id] = (cal, channel)
+        cal.channels[channel.id] = channel
+        asyncio.get_running_loop().create_task(channel.deliver('sync'))
+        return channel.resource()
+
+    def stop(self, body: dict) -> bool:
+        entry = self.channels.get(body.get('id'))
+        if not entry or entry[1].resource_id != body.get('resourceId'):
+            return False
+        cal, channel = self.channels.pop(body['id'])
+        cal.channels.pop(channel.id, None)
+        return True
@@ -0,0 +1,276 @@
+"""
+End-to-end load test for /chat/message against local stand-ins
+
+    python backend/loadtest/run.py                           # 50 users, 20s per phase
+    python backend/loadtest/run.py --users 300 --duration 60
+    python backend/loadtest/run.py --google-latency 120 --google-jitter 200 --google-errors 0.01
+    python backend/loadtest/run.py --groq-only               # every message goes to (fake) Groq
+    python backend/loadtest/run.py --mongo mongodb://db:27017/ --phases create,list
+    python backend/loadtest/run.py --mongo memory            # no server; times mongomock, not calPal
+    python backend/loadtest/run.py --watch                   # push channels instead of mirror polling
+
+Starts fake Google (fake_google.py) and fake Groq (fake_groq.py) servers on
+background threads, points calPal at them through GOOGLE_CALENDAR_API_URL,
+GOOGLE_CALENDAR_BATCH_URL and GROQ_BASE_URL, seeds users into Mongo
+(the app's MONGODB_URI unless --mongo names another server) and serves the
+app with uvicorn on this thread's event loop. A probe on
+that loop records event-loop lag while the load generator, running on its
+own thread and loop, drives each action type in turn:
+
+    create, list, update, delete, delete_all
+
+For every phase it prints requests, errors, throughput, p50/p95/p99
+latency and p50/p99/max event-loop lag. With --watch, fake Google delivers
+push notifications to the app's /webhooks/calendar and the run ends with
+the delivery counts.
+
+--mongo memory swaps in mongomock-motor, which answers every query
+synchronously on the app's event loop and scans whole collections. With
+the mirror on, its full syncs stall the loop for seconds, so such a run
+measures mongomock rather than calPal; the report says so.
+"""
+
+from pathlib import Path
+import argparse
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+
+# Add backend directory to path
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+PHASES = ('create', 'list', 'update', 'delete', 'delete_all')
+TITLES = ['standup', 'design review', 'gym', 'dentist', 'team sync', '1:1 with priya', 'lunch',
+          'interview', 'budget planning', 'offsite', 'yoga', 'pwc call', 'code review', 'retro']
+LAG_INTERVAL = 0.01
+# Seconds to wait for a real MongoDB before giving up
+MONGO_PING_TIMEOUT = 5
+MEMORY_WARNING = (
+    "⚠️  --mongo memory: mongomock-motor runs every query on the app's event loop,"
+    " so latency and lag below measure mongomock, not calPal"
+)
+
+def messages_for(action: str):
+    """Endless generator of chat messages for one action type"""
+    days = ['tomorrow', 'on friday', 'next monday', 'in 3 days', 'today']
+    while True:
+        title = random.choice(TITLES)
+        hour = random.randint(1, 11)
+        if action == 'create':
+            yield f"add {title} {random.choice(days)} at {hour}pm"
+        elif action == 'list':
+            yield random.choice(["list my events this week", "show my schedule next 7 days",
+                                 "list events next week", "what's on tomorrow"])
+        elif action == 'update':
+            yield f"move {title} to {hour}pm"
+        elif action == 'delete':
+            yield f"delete {title}"
+        else:
+            yield random.choice(["delete all events next week", "delete all events this week"])
+
+def seed_events(count: int) -> list:
+    """Events spread over the next two weeks, so every phase finds something"""
+    from datetime import datetime, timedelta
+    import pytz
+    tz = pytz.timezone('Asia/Kolkata')
+    base = tz.localize(datetime.now().replace(minute=0, second=0, microsecond=0))
+    events = []
+    for i in range(count):
+        start = base + timedelta(hours=random.randint(1, 14 * 24))
+        events.append({
+            'id': f"seed{i}",
+            'summary': random.choice(TITLES).title(),
+            'start': {'dateTime': start.isoformat(), 'timeZone': 'Asia/Kolkata'},
+            'end': {'dateTime': (start + timedelta(hours=1)).isoformat(), 'timeZone': 'Asia/Kolkata'}
+        })
+    return events
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+def serve_in_thread(app, port: int):
+    import uvicorn
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+def out(line: str):
+    """Write to the real stdout; the app's own output may be silenced"""
+    sys.__stdout__.write(line + "\n")
+    sys.__stdout__.flush()
+
+def report(phase: str, latencies: list, errors: int, elapsed: float, lags: list):
+    ms = lambda s: f"{s * 1000:8.1f}"
+    out(
+        f"{phase:<11} {len(latencies):>7} {errors:>6} {len(latencies) / elapsed:>8.1f}"
+        f" {ms(percentile(latencies, 0.5))} {ms(percentile(latencies, 0.95))} {ms(percentile(latencies, 0.99))}"
+        f" {ms(percentile(lags, 0.5))} {ms(percentile(lags, 0.99))} {ms(max(lags, default=0))}"
+    )
+
+async def drive(args, app_url: str, lags: list) -> int:
+    """Run every phase against the app; returns the number of failed requests"""
+    import httpx
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    total_errors = 0
+
+    if args.mongo == 'memory':
+        out(f"\n{MEMORY_WARNING}")
+    out(f"\n{'phase':<11} {'reqs':>7} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+        f" {'lag p50':>8} {'lag p99':>8} {'lag max':>8}")
+    async with httpx.AsyncClient(base_url=app_url, limits=limits, timeout=args.timeout) as client:
+        for phase in args.phases:
+            latencies, errors = [], 0
+            deadline = time.perf_counter() + args.duration
+            lag_start = len(lags)
+
+            async def virtual_user(n: int):
+                nonlocal errors
+                messages = messages_for(phase)
+                user_id = f"user{n % args.accounts}@loadtest.local"
+                while time.perf_counter() < deadline:
+                    t0 = time.perf_counter()
+                    try:
+                        response = await client.post("/chat/message", json={"message": next(messages), "user_id": user_id})
+                        ok = response.status_code == 200 and response.json().get("success", False)
+                    except httpx.HTTPError:
+                        ok = False
+                    latencies.append(time.perf_counter() - t0)
+                    errors += not ok
+                    if args.think:
+                        await asyncio.sleep(random.uniform(0, 2 * args.think / 1000))
+
+            started = time.perf_counter()
+            await asyncio.gather(*(virtual_user(n) for n in range(args.users)))
+            report(phase, latencies, errors, time.perf_counter() - started, lags[lag_start:])
+            total_errors += errors
+    return total_errors
+
+async def main(args) -> int:
+    import uvicorn
+    import db
+    from loadtest import fake_google, fake_groq
+
+    google = fake_google.create_app(args.google_latency, args.google_jitter, args.google_errors)
+    groq = fake_groq.create_app(args.groq_latency, args.groq_jitter, args.groq_errors)
+    serve_in_thread(google, args.google_port)
+    serve_in_thread(groq, args.groq_port)
+
+    if args.mongo == 'memory':
+        from mongomock_motor import AsyncMongoMockClient
+        db._client = AsyncMongoMockClient()
+    else:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        probe_client = AsyncIOMotorClient(db.settings.MONGODB_URI, serverSelectionTimeoutMS=MONGO_PING_TIMEOUT * 1000)
+        try:
+            await probe_client.admin.command('ping')
+        except Exception as e:
+            out(f"❌ No MongoDB at {db.settings.MONGODB_URI} ({type(e).__name__}); start one, pass --mongo URI, or --mongo memory")
+            return 1
+        finally:
+            probe_client.close()
+    users = db.get_db()['users']
+    await users.delete_many({'email': {'$regex': '@loadtest\\.local$'}})
+    for i in range(args.accounts):
+        token = f"loadtest-{i}"
+        fake_google.seed(google, token, seed_events(args.events))
+        await users.insert_one({
+            'email': f"user{i}@loadtest.local",
+            'name': f"Load Test {i}",
+            'credentials': {
+                'token': token,
+                'refresh_token': token,
+                'token_uri': f"http://127.0.0.1:{args.google_port}/token",
+                'client_id': 'loadtest',
+                'client_secret': 'loadtest'
+            }
+        })
+
+    # Keep the app's chat logging and tracebacks from swamping the report
+    if not args.verbose:
+        sys.stdout = sys.stderr = open(os.devnull, 'w')
+
+    from main import app
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    lags = []
+    async def probe():
+        while True:
+            t0 = time.perf_counter()
+            await asyncio.sleep(LAG_INTERVAL)
+            lags.append(time.perf_counter() - t0 - LAG_INTERVAL)
+    probing = asyncio.create_task(probe())
+
+    # The generator gets its own loop so its work doesn't show up as app lag
+    errors = await asyncio.to_thread(asyncio.run, drive(args, f"http://127.0.0.1:{args.port}", lags))
+
+    probing.cancel()
+    if args.watch:
+        out(f"\npush notifications delivered (by status): {google.state.notifier.delivered}")
+    await users.delete_many({'email': {'$regex': '@loadtest\\.local$'}})
+    server.should_exit = True
+    await serving
+    return errors
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=50, help="concurrent virtual users")
+    parser.add_argument('--accounts', type=int, default=20, help="distinct calPal accounts the users share")
+    parser.add_argument('--events', type=int, default=200, help="events seeded per account")
+    parser.add_argument('--duration', type=float, default=20, help="seconds per phase")
+    parser.add_argument('--think', type=float, default=0, help="mean think time between requests (ms)")
+    parser.add_argument('--timeout', type=float, default=30, help="client timeout per request (s)")
+    parser.add_argument('--phases', default=','.join(PHASES), help="comma-separated subset of " + ','.join(PHASES))
+    parser.add_argument('--google-latency', type=float, default=80, help="fake Google base latency (ms)")
+    parser.add_argument('--google-jitter', type=float, default=40, help="fake Google extra random latency (ms)")
+    parser.add_argument('--google-errors', type=float, default=0.0, help="fake Google 503 rate (0-1)")
+    parser.add_argument('--groq-latency', type=float, default=300, help="fake Groq base latency (ms)")
+    parser.add_argument('--groq-jitter', type=float, default=200, help="fake Groq extra random latency (ms)")
+    parser.add_argument('--groq-errors', type=float, default=0.0, help="fake Groq 503 rate (0-1)")
+    parser.add_argument('--groq-only', action='store_true', help="disable the local parser and intent cache")
+    parser.add_argument('--no-mirror', action='store_true', help="disable the events_cache mirror")
+    parser.add_argument('--watch', action='store_true', help="open push channels (WEBHOOK_BASE_URL) for every account")
+    parser.add_argument('--mongo', default=None, help="MongoDB URI (default: the app's MONGODB_URI), or 'memory' for mongomock-motor")
+    parser.add_argument('--port', type=int, default=8100)
+    parser.add_argument('--google-port', type=int, default=8101)
+    parser.add_argument('--groq-port', type=int, default=8102)
+    parser.add_argument('--verbose', action='store_true', help="keep the app's console output")
+    args = parser.parse_args(argv)
+    args.phases = [p for p in args.phases.split(',') if p]
+    unknown = set(args.phases) - set(PHASES)
+    if unknown:
+        parser.error(f"unknown phases: {', '.join(sorted(unknown))}")
+    return args
+
+def configure(args):
+    """Point the app at the fakes; must run before config is first imported"""
+    os.environ['GOOGLE_CALENDAR_API_URL'] = f"http://127.0.0.1:{args.google_port}/calendar/v3"
+    os.environ['GOOGLE_CALENDAR_BATCH_URL'] = f"http://127.0.0.1:{args.google_port}/batch/calendar/v3"
+    os.environ['GROQ_BASE_URL'] = f"http://127.0.0.1:{args.groq_port}"
+    os.environ.setdefault('GROQ_API_KEY', 'loadtest')
+    os.environ['DATABASE_NAME'] = os.environ.get('LOADTEST_DATABASE_NAME', 'calpal_loadtest')
+    if args.mongo and args.mongo != 'memory':
+        os.environ['MONGODB_URI'] = args.mongo
+    if args.groq_only:
+        os.environ['LOCAL_INTENT_THRESHOLD'] = '1.1'
+        os.environ['INTENT_CACHE_SIZE'] = '0'
+    if args.no_mirror:
+        os.environ['EVENT_MIRROR_ENABLED'] = 'false'
+    if args.watch:
+        os.environ['WEBHOOK_BASE_URL'] = f"http://127.0.0.1:{args.port}"
+
+if __name__ == "__main__":
+    args = parse_args()
+    configure(args)
+    sys.exit(1 if asyncio.run(main(args)) else 0)
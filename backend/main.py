@@ -1,11 +1,41 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from routes import auth, chat
+from routes import auth, chat, events, webhooks
 from config import get_settings
+from services.http_client import close_http_client
+from services.groq_service import groq_service
+from services.chat_history import chat_history
+from services.watch_service import watch_service
+from services.credential_manager import credential_manager
+from services import metrics
+from db import get_db, close_db
+from contextlib import asynccontextmanager
+import logging
 import os
 settings = get_settings()
-print("FRONTEND_URL =", settings.FRONTEND_URL)
-app = FastAPI(title="calPal API")
+logging.basicConfig(
+    level=settings.LOG_LEVEL.upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+)
+# httpx logs every request at INFO; that's one line per Calendar call
+logging.getLogger("httpx").setLevel(logging.WARNING)
+logging.getLogger(__name__).info("FRONTEND_URL = %s", settings.FRONTEND_URL)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    get_db()
+    chat_history.start()
+    watch_service.start()
+    credential_manager.start()
+    yield
+    await credential_manager.stop()
+    await watch_service.stop()
+    await chat_history.stop()
+    await close_http_client()
+    await groq_service.close()
+    close_db()
+
+app = FastAPI(title="calPal API", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -22,6 +52,8 @@ app.add_middleware(
 # Include routers
 app.include_router(auth.router)
 app.include_router(chat.router)
+app.include_router(events.router)
+app.include_router(webhooks.router)
 
 @app.get("/")
 async def root():
@@ -29,7 +61,17 @@ async def root():
 
 @app.get("/health")
 async def health():
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "intent_cache": groq_service.cache.stats(),
+        "chat_history": chat_history.stats(),
+        "credentials": credential_manager.stats()
+    }
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    body, content_type = metrics.render()
+    return Response(content=body, headers={"Content-Type": content_type})
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,18 +1,17 @@
 from fastapi import APIRouter, HTTPException, Depends
 from fastapi.responses import RedirectResponse
 from services.auth_service import AuthService
+from services.calendar_pool import calendar_pool
+from services.user_cache import user_cache
 from config import get_settings
-from pymongo import MongoClient
+from db import get_db
 from datetime import datetime
 import httpx
+import logging
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 settings = get_settings()
-
-# MongoDB connection
-client = MongoClient(settings.MONGODB_URI)
-db = client[settings.DATABASE_NAME]
-users_collection = db['users']
+logger = logging.getLogger(__name__)
 
 @router.get("/login")
 async def login():
@@ -48,18 +47,20 @@ async def callback(code: str):
             'updated_at': datetime.utcnow()
         }
         
-        users_collection.update_one(
+        await get_db()['users'].update_one(
             {'google_id': user_info['id']},
             {'$set': user_data, '$setOnInsert': {'created_at': datetime.utcnow()}},
             upsert=True
         )
+        user_cache.invalidate(user_info['email'])
+        calendar_pool.invalidate(user_info['email'])
         
         # Redirect to frontend with user info
         redirect_url = f"{settings.FRONTEND_URL}?login=success&email={user_info['email']}"
         return RedirectResponse(url=redirect_url)
         
     except Exception as e:
-        print(f"Auth error: {e}")
+        logger.warning("Auth error: %s", e)
         return RedirectResponse(url=f"{settings.FRONTEND_URL}?login=error")
 
 @router.get("/user/{email}")
@@ -67,7 +68,7 @@ async def get_user(email: str):
     """
     Get user by email
     """
-    user = users_collection.find_one({'email': email}, {'_id': 0, 'credentials': 0})
+    user = await get_db()['users'].find_one({'email': email}, {'_id': 0, 'credentials': 0})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
\ No newline at end of file
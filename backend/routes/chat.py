@@ -1,165 +1,424 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from models.schemas import ChatMessage
 from services.groq_service import groq_service
-from services.calendar_service import CalendarService
+from services.calendar_pool import calendar_pool
 from utils.nlp_extractor import NLPExtractor
-from pymongo import MongoClient
+from utils.sse import sse
+from services.user_cache import user_cache
+from services.metrics import start_request, phase, observe_request
+from services.chat_history import chat_history
+from services.session_store import session_store
+from utils.intent_parser import IntentParser
 from config import get_settings
+from datetime import datetime, timedelta
+import asyncio
+import logging
+import time
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 settings = get_settings()
-
-client = MongoClient(settings.MONGODB_URI)
-db = client[settings.DATABASE_NAME]
-users_collection = db['users']
+logger = logging.getLogger(__name__)
 
 @router.post("/message")
 async def process_message(chat_msg: ChatMessage):
+    started = time.perf_counter()
+    phases = start_request()
+    intents, user, result = [], None, None
     try:
-        user = users_collection.find_one({'email': chat_msg.user_id})
+        with phase("user_lookup"):
+            user = await user_cache.get(chat_msg.user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
-        print(f"\n{'='*60}")
-        print(f"📨 USER: {chat_msg.message}")
+        logger.debug("📨 USER: %s", chat_msg.message)
+        # Before parsing, so a due token refresh runs alongside it
+        cal = calendar_pool.get(user['email'], user['credentials'])
         
-        # Extract intent using Groq (now includes time_range)
-        intent = await groq_service.extract_intent(chat_msg.message)
-        action = intent.get("action")
-        title = intent.get("title")
-        time_range = intent.get("time_range")
+        # Extract every command's intent locally or with one Groq call (now includes time_range)
+        with phase("intent"):
+            intents = await groq_service.extract_intents(chat_msg.message)
+        
+        if len(intents) == 1:
+            result = await execute_intent(cal, intents[0], chat_msg.message)
+        else:
+            result = combine_replies(await asyncio.gather(*schedule_intents(cal, intents)))
+        result["parser"] = intents[0].get("source")
+        return result
 
-        print(f"🎯 Action: {action}, Title: {title}, Time Range: {time_range}")
-
-        # Use Groq-extracted date/time/duration; fall back to NLPExtractor for missing fields
-        nlp = NLPExtractor.extract_all(chat_msg.message)
-
-        date = intent.get("date") or nlp["date"]
-        time = intent.get("time") or nlp["time"]
-        duration = intent.get("duration") or nlp["duration"]
-
-        print(f"📅 Date: {date}, Time: {time}, Duration: {duration}min")
-        print(f"{'='*60}\n")
-
-        cal = CalendarService(user['credentials'])
-
-        if action == 'create':
-            if not title:
-                title = "Event"
-            
-            if not time:
-                return {"success": True, "message": "⏰ What time should I schedule this?"}
-            
-            if not date:
-                date = "today"
-            
-            cal.create_event(title, date, time, duration)
-            msg = f"✅ Created '{title}' on {date} at {time}"
-            if duration != 60:
-                msg += f" ({duration} min)"
-            return {"success": True, "message": msg}
-
-        elif action == 'delete':
-            if not title:
-                return {"success": False, "message": "❌ Which event should I delete?"}
-            
-            date_filter = date if date and date != "today" else None
-            ev = cal.find_event(title, date_filter)
-            
-            if not ev:
-                if date_filter:
-                    print("🔄 Trying without date filter...")
-                    ev = cal.find_event(title, None)
-                
-                if not ev:
-                    return {"success": False, "message": f"❌ Couldn't find '{title}'. Try: 'list my events' to see what's available."}
-            
-            cal.delete_event(ev['id'])
-            return {"success": True, "message": f"🗑️ Deleted '{ev['summary']}'"}
+    except Exception as e:
+        logger.exception("❌ Error: %s", e)
+        return {"success": False, "message": "😔 Something went wrong. Please try again."}
+    finally:
+        finish_request(chat_msg, user, intents, result, phases, started)
 
-        elif action == 'delete_all':
-            # Delete all events with optional time range filter
-            count = cal.delete_all_events(time_range)
-            
-            if count == 0:
-                if time_range:
-                    msg = f"📭 No events found in {time_range.replace('_', ' ')}"
-                else:
-                    msg = "📭 No upcoming events to delete"
-            else:
-                if time_range:
-                    msg = f"🗑️ Deleted {count} event{'s' if count != 1 else ''} from {time_range.replace('_', ' ')}"
-                else:
-                    msg = f"🗑️ Deleted {count} event{'s' if count != 1 else ''}"
-            
-            return {"success": True, "message": msg}
-
-        elif action == 'update':
-            if not title:
-                return {"success": False, "message": "❌ Which event should I update?"}
-            
-            date_filter = date if date and date != "today" else None
-            ev = cal.find_event(title, date_filter)
-            
-            if not ev:
-                if date_filter:
-                    ev = cal.find_event(title, None)
-                if not ev:
-                    return {"success": False, "message": f"❌ Couldn't find '{title}'"}
-            
-            # Pass duration if it's not default (60)
-            new_duration = duration if duration != 60 else None
-            
-            cal.update_event(
-                ev['id'],
-                date if date and date != "today" else None,
-                time,
-                new_duration
-            )
-            
-            msg = f"✅ Updated '{ev['summary']}'"
-            if time:
-                msg += f" to {time}"
-            if date and date != "today":
-                msg += f" on {date}"
-            if new_duration:
-                hours = new_duration // 60
-                mins = new_duration % 60
-                if hours > 0 and mins > 0:
-                    msg += f" (duration: {hours}h {mins}min)"
-                elif hours > 0:
-                    msg += f" (duration: {hours}h)"
-                else:
-                    msg += f" (duration: {mins}min)"
-            
-            return {"success": True, "message": msg}
+def finish_request(chat_msg: ChatMessage, user: dict, intents: list, result: dict, phases: dict, started: float):
+    """Observe the request's latency and queue the turn for chat_history"""
+    elapsed = time.perf_counter() - started
+    observe_request(request_action(intents), intents[0].get("source") if intents else None, elapsed)
+    if user:
+        chat_history.record(user['email'], chat_msg.message, intents, result, phases, elapsed)
+
+def request_action(intents: list) -> str:
+    """Action label for a request's metrics"""
+    if len(intents) > 1:
+        return "multi"
+    return intents[0].get("action") if intents else None
+
+def depends_on(later: dict, earlier: dict) -> bool:
+    """
+    Whether later has to wait for earlier: both name the same event, one
+    lists or bulk-deletes while the other writes, or later refers back
+    ("it", "the second one")
+    """
+    actions = {later.get("action"), earlier.get("action")}
+    if "delete_all" in actions:
+        return True
+    # "add standup and move it to 5": 'it' is whatever came before
+    if IntentParser.extract_reference(later.get("title"), later.get("text", "")) is not None:
+        return True
+    if "list" in actions:
+        return actions != {"list"}
+    a = (later.get("title") or "").lower().strip()
+    b = (earlier.get("title") or "").lower().strip()
+    # find_event matches substrings both ways, so these could resolve to one event
+    return bool(a and b and (a in b or b in a))
+
+def schedule_intents(cal, intents: list) -> list:
+    """
+    Start one task per intent, in message order
+
+    Independent intents run concurrently; each task first waits for the
+    earlier intents it depends on, so "delete standup and add standup at 5"
+    still deletes first.
+    """
+    tasks = []
+    for i, intent in enumerate(intents):
+        after = [tasks[j] for j in range(i) if depends_on(intent, intents[j])]
+        tasks.append(asyncio.ensure_future(run_intent(cal, intent, after)))
+    return tasks
+
+async def run_intent(cal, intent: dict, after: list) -> dict:
+    """One intent of a multi-command message; a failure only fails this part"""
+    if after:
+        await asyncio.wait(after)
+    try:
+        # Locally split clauses keep their own text for the NLP fallback; LLM-split ones rely on the LLM's fields
+        return await execute_intent(cal, intent, intent.get("text", ""))
+    except Exception as e:
+        logger.exception("❌ Error in %s: %s", intent.get("action"), e)
+        return {"success": False, "message": f"😔 Couldn't {intent.get('action', 'do')} {intent.get('title') or 'that'}. Please try again."}
+
+def combine_replies(results: list) -> dict:
+    """One chat reply for the results of a multi-command message"""
+    reply = {
+        "success": all(r.get("success") for r in results),
+        "message": "\n\n".join(r["message"] for r in results),
+        "results": results
+    }
+    events = [e for r in results for e in r.get("events", [])]
+    if events:
+        reply["events"] = events
+    return reply
+
+@router.post("/stream")
+async def stream_message(chat_msg: ChatMessage):
+    """
+    Server-sent-events variant of /chat/message
+
+    Emits 'intent' as soon as the message is parsed, then one 'event' per
+    listed event or one 'deleted'/'failed' per event of a delete_all as its
+    batch completes, and finally 'summary' with the same body /chat/message
+    would have returned. Other actions go straight to 'summary'.
+    
+    A multi-command message emits 'intent' with {"actions": [...]}, then a
+    'result' (with its action's index) as each command finishes.
+    """
+    return StreamingResponse(
+        stream_intent(chat_msg),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def stream_intent(chat_msg: ChatMessage):
+    started = time.perf_counter()
+    phases = start_request()
+    intents, user, result = [], None, None
+    try:
+        with phase("user_lookup"):
+            user = await user_cache.get(chat_msg.user_id)
+        if not user:
+            yield sse("error", {"success": False, "message": "User not found"})
+            return
 
+        logger.debug("📨 USER (stream): %s", chat_msg.message)
+        cal = calendar_pool.get(user['email'], user['credentials'])
+        with phase("intent"):
+            intents = await groq_service.extract_intents(chat_msg.message)
+        intent = intents[0]
+        yield sse("intent", {"actions": intents} if len(intents) > 1 else intent)
+
+        action = intent.get("action")
+        time_range = intent.get("time_range")
+        if len(intents) > 1:
+            tasks = schedule_intents(cal, intents)
+            index = {task: i for i, task in enumerate(tasks)}
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=index.get):
+                    yield sse("result", {"index": index[task], **task.result()})
+            result = combine_replies([task.result() for task in tasks])
         elif action == 'list':
-            # List events with optional time range filter
-            events = cal.list_events(max_results=50, time_range=time_range)
-            
-            if not events:
-                if time_range:
-                    msg = f"📭 No events in {time_range.replace('_', ' ')}"
+            # Each line goes out as soon as its event is read
+            events = []
+            async for e in cal.iter_list(max_results=50, time_range=time_range):
+                yield sse("event", {"index": len(events) + 1, "line": list_line(cal, len(events), e), "event": e})
+                events.append(e)
+            session_store.remember_list(cal.user_email, events)
+            result = list_reply(cal, events, time_range)
+        elif action == 'delete_all':
+            events = await cal.list_all_events(time_range)
+            yield sse("progress", {"total": len(events)})
+            report = {'deleted': 0, 'failed': []}
+            async for outcome in cal.iter_delete(events):
+                if outcome['deleted']:
+                    report['deleted'] += 1
+                    yield sse("deleted", outcome)
                 else:
-                    msg = "📭 No upcoming events"
-                return {"success": True, "message": msg}
-            
-            lines = [f"{i+1}. {e['summary']} - {cal.format_time(e)}" 
-                    for i, e in enumerate(events)]
-            
-            if time_range:
-                header = f"📅 Events in {time_range.replace('_', ' ')} ({len(events)} total):\n\n"
+                    report['failed'].append({k: outcome[k] for k in ('id', 'summary', 'error')})
+                    yield sse("failed", outcome)
+            session_store.forget_events(cal.user_email)
+            result = delete_all_reply(report, time_range)
+        else:
+            result = await execute_intent(cal, intent, chat_msg.message)
+
+        result["parser"] = intent.get("source")
+        yield sse("summary", result)
+
+    except Exception as e:
+        logger.exception("❌ Error: %s", e)
+        yield sse("error", {"success": False, "message": "😔 Something went wrong. Please try again."})
+    finally:
+        finish_request(chat_msg, user, intents, result, phases, started)
+
+async def execute_intent(cal, intent: dict, message: str) -> dict:
+    """Run one parsed intent against the user's calendar and build the chat reply"""
+    action = intent.get("action")
+    title = intent.get("title")
+    time_range = intent.get("time_range")
+
+    logger.debug("🎯 Action: %s, Title: %s, Time Range: %s", action, title, time_range)
+
+    # Use Groq-extracted date/time/duration; fall back to NLPExtractor for missing fields
+    with phase("nlp"):
+        nlp = NLPExtractor.extract_all(message)
+
+    date = intent.get("date") or nlp["date"]
+    time = intent.get("time") or nlp["time"]
+    duration = intent.get("duration") or nlp["duration"]
+
+    logger.debug("📅 Date: %s, Time: %s, Duration: %smin", date, time, duration)
+
+    if action == 'create':
+        if not title:
+            title = "Event"
+        
+        picked = False
+        if not time:
+            # No time given: book the earliest free slot in the requested window
+            window_start, window_end = slot_window(cal, date, time_range)
+            slot = None
+            # A day or range that is already over leaves nothing to search
+            if window_start < window_end:
+                with phase("slots"):
+                    slot = await cal.find_free_slot(window_start, window_end, duration)
+            if not slot:
+                where = time_range.replace('_', ' ') if time_range else (date or f"the next {settings.SLOT_SEARCH_DAYS} days")
+                return {"success": False, "message": f"😕 No free {duration}-minute slot in working hours for {where}. Try giving a time."}
+            slot = slot.astimezone(cal.tz)
+            date, time, picked = slot.strftime("%Y-%m-%d"), slot.strftime("%H:%M"), True
+        
+        if not date:
+            date = "today"
+        
+        # The overlap check runs alongside the insert; the new event is filtered out of its answer
+        start = cal.parse_dt(date, time)
+        created, conflicts = await asyncio.gather(
+            cal.create_event(title, date, time, duration),
+            find_conflicts(cal, start, start + timedelta(minutes=duration))
+        )
+        conflicts = [e for e in conflicts if e['id'] != created.get('id')]
+        session_store.remember_event(cal.user_email, created)
+        msg = f"✅ Created '{title}' on {date} at {time}"
+        if duration != 60:
+            msg += f" ({duration} min)"
+        if picked:
+            msg += " – first free slot"
+        if conflicts:
+            msg += "\n⚠️ Overlaps with " + ", ".join(conflict_label(cal, e) for e in conflicts[:5])
+            if len(conflicts) > 5:
+                msg += f" and {len(conflicts) - 5} more"
+        return {"success": True, "message": msg, "conflicts": conflicts}
+
+    elif action == 'delete':
+        ev, reply = await find_target(cal, action, title, date, message)
+        if not ev:
+            return {"success": False, "message": reply}
+        
+        await cal.delete_event(ev['id'])
+        session_store.forget_events(cal.user_email, [ev['id']])
+        return {"success": True, "message": f"🗑️ Deleted '{ev['summary']}'"}
+
+    elif action == 'delete_all':
+        # Delete all events with optional time range filter
+        report = await cal.bulk_delete(time_range)
+        session_store.forget_events(cal.user_email)
+        return delete_all_reply(report, time_range)
+
+    elif action == 'update':
+        ev, reply = await find_target(cal, action, title, date, message)
+        if not ev:
+            return {"success": False, "message": reply}
+        
+        # Pass duration if it's not default (60)
+        new_duration = duration if duration != 60 else None
+        
+        updated = await cal.update_event(
+            ev['id'],
+            date if date and date != "today" else None,
+            time,
+            new_duration
+        )
+        session_store.remember_event(cal.user_email, updated)
+        
+        msg = f"✅ Updated '{ev['summary']}'"
+        if time:
+            msg += f" to {time}"
+        if date and date != "today":
+            msg += f" on {date}"
+        if new_duration:
+            hours = new_duration // 60
+            mins = new_duration % 60
+            if hours > 0 and mins > 0:
+                msg += f" (duration: {hours}h {mins}min)"
+            elif hours > 0:
+                msg += f" (duration: {hours}h)"
             else:
-                header = f"📅 Upcoming events ({len(events)} total):\n\n"
-            
-            msg = header + "\n".join(lines)
-            return {"success": True, "message": msg, "events": events}
+                msg += f" (duration: {mins}min)"
+        
+        return {"success": True, "message": msg}
+
+    elif action == 'list':
+        # List events with optional time range filter
+        events = await cal.list_events(max_results=50, time_range=time_range)
+        session_store.remember_list(cal.user_email, events)
+        return list_reply(cal, events, time_range)
+
+    return {"success": False, "message": "🤔 Didn't understand that. Try: 'Add meeting tomorrow at 2pm'"}
+
+async def find_target(cal, action: str, title: str, date: str, message: str) -> tuple:
+    """
+    (event, None) for the event a delete/update names, or (None, reply)
+
+    Ordinals ("the third one") and pronouns ("it") resolve against the
+    user's session without a Calendar call; titles go to find_event,
+    retried without the date if that finds nothing.
+    """
+    ref = IntentParser.extract_reference(title, message)
+    if ref is not None:
+        ev, reason = session_store.resolve(cal.user_email, ref)
+        if not ev:
+            return None, f"❌ {reason}. Try: 'list my events' first."
+        logger.debug("🔗 '%s' resolved from session: %s", title, ev.get('summary'))
+        return ev, None
+
+    if not title:
+        return None, f"❌ Which event should I {action}?"
+    
+    date_filter = date if date and date != "today" else None
+    ev = await cal.find_event(title, date_filter)
+    if not ev and date_filter:
+        logger.debug("🔄 Trying without date filter...")
+        ev = await cal.find_event(title, None)
+    if not ev:
+        if action == 'delete':
+            return None, f"❌ Couldn't find '{title}'. Try: 'list my events' to see what's available."
+        return None, f"❌ Couldn't find '{title}'"
+    session_store.remember_event(cal.user_email, ev)
+    return ev, None
 
-        return {"success": False, "message": "🤔 Didn't understand that. Try: 'Add meeting tomorrow at 2pm'"}
+def slot_window(cal, date: str, time_range: str = None) -> tuple:
+    """
+    (start, end) to search for a free slot: the time_range, else the given
+    day, else the next SLOT_SEARCH_DAYS days; never earlier than now, so
+    start >= end when the window is already over
+    """
+    now = datetime.now(cal.tz)
+    bounds = cal.get_time_range_bounds(time_range) if time_range else (None, None)
+    if bounds[0]:
+        start, end = (datetime.fromisoformat(b) for b in bounds)
+    elif date:
+        start = cal.parse_dt(date).replace(hour=0, minute=0, second=0, microsecond=0)
+        end = start + timedelta(days=1)
+    else:
+        start, end = now, now + timedelta(days=settings.SLOT_SEARCH_DAYS)
+    return max(start, now), end
 
+async def find_conflicts(cal, start, end) -> list:
+    """Events overlapping a slot being booked; a failed check only loses the warning"""
+    try:
+        with phase("conflicts"):
+            return await cal.find_conflicts(start, end)
     except Exception as e:
-        print(f"❌ Error: {e}")
-        import traceback
-        traceback.print_exc()
-        return {"success": False, "message": "😔 Something went wrong. Please try again."}
\ No newline at end of file
+        logger.warning("⚠️ Conflict check failed: %s", e)
+        return []
+
+def conflict_label(cal, event: dict) -> str:
+    if event['start'].get('date'):
+        return f"'{event.get('summary', 'Untitled')}' (all day)"
+    return f"'{event.get('summary', 'Untitled')}' ({cal.format_time(event)})"
+
+def list_line(cal, i: int, event: dict) -> str:
+    return f"{i+1}. {event['summary']} - {cal.format_time(event)}"
+
+def list_reply(cal, events: list, time_range: str = None) -> dict:
+    """Chat reply for a list of events"""
+    if not events:
+        if time_range:
+            msg = f"📭 No events in {time_range.replace('_', ' ')}"
+        else:
+            msg = "📭 No upcoming events"
+        return {"success": True, "message": msg}
+    
+    with phase("format"):
+        lines = [list_line(cal, i, e) for i, e in enumerate(events)]
+        
+        if time_range:
+            header = f"📅 Events in {time_range.replace('_', ' ')} ({len(events)} total):\n\n"
+        else:
+            header = f"📅 Upcoming events ({len(events)} total):\n\n"
+        
+        msg = header + "\n".join(lines)
+    return {"success": True, "message": msg, "events": events}
+
+def delete_all_reply(report: dict, time_range: str = None) -> dict:
+    """Chat reply for a bulk_delete report"""
+    count = report['deleted']
+    failed = report['failed']
+    
+    if count == 0:
+        if time_range:
+            msg = f"📭 No events found in {time_range.replace('_', ' ')}"
+        else:
+            msg = "📭 No upcoming events to delete"
+    else:
+        if time_range:
+            msg = f"🗑️ Deleted {count} event{'s' if count != 1 else ''} from {time_range.replace('_', ' ')}"
+        else:
+            msg = f"🗑️ Deleted {count} event{'s' if count != 1 else ''}"
+    
+    if failed:
+        msg += f" (⚠️ {len(failed)} couldn't be deleted)"
+    
+    return {"success": True, "message": msg, "failed": failed}
@@ -0,0 +1,230 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.datastructures import UploadFile
+from services.calendar_pool import calendar_pool
+from services.user_cache import user_cache
+from utils.ics_parser import ICSParser, vevent_to_body
+from utils.ics_writer import CALENDAR_HEADER, CALENDAR_FOOTER, CSV_COLUMNS, format_vevent, csv_row
+from utils.sse import sse
+from config import get_settings
+from collections import deque
+from datetime import datetime, timedelta, timezone
+import codecs
+import csv
+import io
+import logging
+import pytz
+
+router = APIRouter(prefix="/events", tags=["events"])
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Bytes read from the upload at a time
+READ_SIZE = 64 * 1024
+# Emit a progress event every this many processed VEVENTs
+PROGRESS_EVERY = 50
+# Events rendered per chunk written to an export response
+EXPORT_CHUNK = 100
+
+IST = pytz.timezone('Asia/Kolkata')
+EXPORT_TYPES = {'ics': 'text/calendar', 'csv': 'text/csv'}
+
+@router.post("/import")
+async def import_events(request: Request):
+    """
+    Import an .ics file into the user's primary calendar
+
+    Multipart form with user_id and file. The upload is spooled to disk,
+    parsed incrementally, and VEVENTs go to Google through events.import
+    batch requests, so neither the file nor the event list is held in
+    memory. Streams server-sent events: 'progress' counters, 'failed' /
+    'skipped' per problem event, and a final 'summary'. Events already in
+    the calendar (same UID) are updated, not duplicated; repeated UIDs
+    within the file are skipped.
+    """
+    # Parsed here rather than as File()/Form() parameters: FastAPI closes
+    # those uploads when the handler returns, before the stream is read
+    form = await request.form()
+    upload = form.get('file')
+    user = await user_cache.get(form.get('user_id') or '')
+    if not user:
+        await form.close()
+        raise HTTPException(status_code=404, detail="User not found")
+    if not isinstance(upload, UploadFile):
+        await form.close()
+        raise HTTPException(status_code=400, detail="An .ics file is required")
+    cal = calendar_pool.get(user['email'], user['credentials'])
+    return StreamingResponse(
+        stream_import(cal, upload, form),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def stream_import(cal, file: UploadFile, form):
+    counts = {'parsed': 0, 'imported': 0, 'failed': 0, 'skipped': 0}
+    problems = deque()    # 'failed' / 'skipped' events waiting to be sent
+
+    async def bodies():
+        """Event bodies from the upload, read chunk by chunk"""
+        parser = ICSParser()
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        seen = set()
+
+        def convert(vevents):
+            for vevent in vevents:
+                counts['parsed'] += 1
+                summary = vevent.get('SUMMARY', ('',))[0]
+                # Overrides of a recurring event's instances aren't imported on their own
+                if 'RECURRENCE-ID' in vevent:
+                    counts['skipped'] += 1
+                    problems.append(('skipped', {'summary': summary, 'reason': 'recurrence override'}))
+                    continue
+                try:
+                    body = vevent_to_body(vevent, cal)
+                except (ValueError, TypeError, KeyError) as e:
+                    counts['failed'] += 1
+                    problems.append(('failed', {'summary': summary, 'error': f"unreadable VEVENT: {e}"}))
+                    continue
+                if body['iCalUID'] in seen:
+                    counts['skipped'] += 1
+                    problems.append(('skipped', {'uid': body['iCalUID'], 'summary': body['summary'], 'reason': 'duplicate UID in file'}))
+                    continue
+                seen.add(body['iCalUID'])
+                yield body
+
+        while True:
+            chunk = await file.read(READ_SIZE)
+            if not chunk:
+                break
+            for body in convert(parser.feed(decoder.decode(chunk))):
+                yield body
+        for body in convert(parser.feed(decoder.decode(b'', final=True))):
+            yield body
+        for body in convert(parser.close()):
+            yield body
+
+    yield sse("progress", counts)
+    try:
+        processed = 0
+        async for outcome in cal.iter_import(bodies()):
+            if outcome['imported']:
+                counts['imported'] += 1
+            else:
+                counts['failed'] += 1
+                problems.append(('failed', outcome))
+            while problems:
+                yield sse(*problems.popleft())
+            processed += 1
+            if processed % PROGRESS_EVERY == 0:
+                yield sse("progress", counts)
+        while problems:
+            yield sse(*problems.popleft())
+
+        msg = f"📥 Imported {counts['imported']} event{'s' if counts['imported'] != 1 else ''}"
+        if counts['failed']:
+            msg += f" (⚠️ {counts['failed']} failed)"
+        if counts['skipped']:
+            msg += f" ({counts['skipped']} skipped)"
+        yield sse("summary", {"success": counts['failed'] == 0, "message": msg, **counts})
+
+    except Exception as e:
+        logger.exception("❌ Import error: %s", e)
+        yield sse("error", {"success": False, "message": "😔 Import failed. Please try again.", **counts})
+    finally:
+        await form.close()
+
+def export_bound(day: str, name: str) -> datetime:
+    """YYYY-MM-DD query value -> midnight in Asia/Kolkata"""
+    try:
+        return IST.localize(datetime.strptime(day, "%Y-%m-%d"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be YYYY-MM-DD")
+
+@router.get("/export")
+async def export_events(user_id: str, format: str = "ics", start: str = None, end: str = None):
+    """
+    Download events from start to end (inclusive dates, Asia/Kolkata) as ICS or CSV
+
+    Either bound may be left out for an open range. Events are read page by
+    page (from the mirror when fresh) and written out in chunks, so the
+    size of the range doesn't change memory use. A Calendar failure on the
+    first page answers 502; a later one aborts the download mid-stream.
+    """
+    if format not in EXPORT_TYPES:
+        raise HTTPException(status_code=400, detail="format must be ics or csv")
+    time_min = export_bound(start, "start") if start else None
+    time_max = export_bound(end, "end") + timedelta(days=1) if end else None
+    if time_min and time_max and time_max <= time_min:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+
+    user = await user_cache.get(user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    cal = calendar_pool.get(user['email'], user['credentials'])
+
+    render = stream_ics if format == 'ics' else stream_csv
+    events = cal.iter_range(
+        time_min.isoformat() if time_min else None,
+        time_max.isoformat() if time_max else None
+    )
+    # Pull the first page before answering, so an early Calendar failure gets a real error status
+    try:
+        first = await anext(events, None)
+    except Exception as e:
+        logger.warning("❌ Export failed before streaming: %s", e)
+        raise HTTPException(status_code=502, detail="Couldn't read your calendar. Please try again.")
+    return StreamingResponse(
+        render(resume(first, events)),
+        media_type=EXPORT_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="calpal-events.{format}"'}
+    )
+
+async def resume(first, events):
+    """events with the already-fetched first one put back in front"""
+    if first is None:
+        return
+    yield first
+    async for event in events:
+        yield event
+
+async def stream_ics(events):
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    yield CALENDAR_HEADER
+    chunk = []
+    try:
+        async for event in events:
+            if event.get('status') == 'cancelled':
+                continue
+            chunk.append(format_vevent(event, stamp))
+            if len(chunk) >= EXPORT_CHUNK:
+                yield ''.join(chunk)
+                chunk = []
+    except Exception as e:
+        # The 200 is already sent: re-raise so the connection is aborted instead of ending cleanly
+        logger.warning("❌ ICS export failed mid-stream: %s", e)
+        raise
+    yield ''.join(chunk) + CALENDAR_FOOTER
+
+async def stream_csv(events):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    rows = 0
+    try:
+        async for event in events:
+            if event.get('status') == 'cancelled':
+                continue
+            writer.writerow(csv_row(event))
+            rows += 1
+            if rows % EXPORT_CHUNK == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+    except Exception as e:
+        # The 200 is already sent: mark the file as incomplete, then abort the connection
+        # so clients see a broken transfer rather than a short CSV
+        logger.warning("❌ CSV export failed mid-stream: %s", e)
+        writer.writerow([f"# export incomplete after {rows} events: calendar read failed"])
+        yield buffer.getvalue()
+        raise
+    yield buffer.getvalue()
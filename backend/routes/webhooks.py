@@ -0,0 +1,25 @@
+from fastapi import APIRouter, HTTPException, Header, Response
+from services.watch_service import watch_service
+import logging
+
+router = APIRouter(prefix="/webhooks", tags=["webhooks"])
+logger = logging.getLogger(__name__)
+
+@router.post("/calendar")
+async def calendar_notification(
+    x_goog_channel_id: str = Header(...),
+    x_goog_resource_state: str = Header(...),
+    x_goog_channel_token: str = Header(None),
+    x_goog_message_number: str = Header(None)
+):
+    """
+    Receive a Calendar push notification
+
+    Notifications carry no event data, only which channel changed; the
+    user's mirror is marked dirty and resynced in the background. Google
+    retries anything but a 2xx, so the reply is immediate.
+    """
+    logger.debug("📬 Push %s for channel %s (#%s)", x_goog_resource_state, x_goog_channel_id, x_goog_message_number)
+    if not await watch_service.handle_notification(x_goog_channel_id, x_goog_channel_token, x_goog_resource_state):
+        raise HTTPException(status_code=403, detail="Invalid channel token")
+    return Response(status_code=200)
@@ -0,0 +1,501 @@
+from services.calendar_service import CalendarBase, BATCH_SIZE, BULK_PAGE_SIZE, LIST_PAGE_SIZE, EVENT_FIELDS, EXPORT_FIELDS
+from services.http_client import get_http_client
+from services.event_mirror import SyncTokenExpired, parse_bound
+from services.credential_manager import credential_manager
+from utils.interval_index import IntervalIndex
+from utils.slot_finder import find_slot
+from services.metrics import phase, count_calendar_call
+from config import get_settings
+from urllib.parse import urlparse
+from datetime import datetime, timedelta
+from typing import Optional
+import asyncio
+import json
+import re
+import time
+import uuid
+import logging
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+class CalendarAPIError(Exception):
+    """Non-2xx response from the Calendar API"""
+    def __init__(self, status_code: int, message: str):
+        super().__init__(f"Calendar API {status_code}: {message}")
+        self.status_code = status_code
+
+class AsyncCalendarService(CalendarBase):
+    """
+    Calendar v3 client on the shared httpx pool.
+
+    The app's only Calendar client: every call is awaitable, so a slow
+    Google response never blocks the event loop.
+    """
+    def __init__(self, creds_dict: dict, user_email: str = None, mirror=None):
+        self.creds = creds_dict
+        self.base_url = settings.GOOGLE_CALENDAR_API_URL
+        self.user_email = user_email
+        # Optional EventMirror; reads come from it while it is fresh
+        self.mirror = mirror if user_email else None
+        # Without a mirror: (start, end, IntervalIndex, fetched_at) of the last conflict window
+        self._window = None
+
+    async def _send(self, method: str, url: str, **kwargs):
+        """Send an authorized request, refreshing the access token once on 401"""
+        client = get_http_client()
+        headers = kwargs.pop('headers', {})
+
+        for attempt in range(2):
+            token = await credential_manager.access_token(self.user_email, self.creds)
+            headers['Authorization'] = f"Bearer {token}"
+            with phase("calendar"):
+                response = await client.request(method, url, headers=headers, **kwargs)
+            count_calendar_call(method, response.status_code)
+            if response.status_code == 401 and attempt == 0 and self.creds.get('refresh_token'):
+                # Revoked or expired early; the stored expiry was wrong
+                await credential_manager.refresh(self.user_email, self.creds)
+                continue
+            return response
+
+    async def _request(self, method: str, path: str, **kwargs) -> dict:
+        """Call a Calendar API path and return the decoded JSON body"""
+        response = await self._send(method, self.base_url + path, **kwargs)
+
+        if response.status_code >= 400:
+            raise CalendarAPIError(response.status_code, response.text)
+        if response.status_code == 204 or not response.content:
+            return {}
+        return response.json()
+
+    async def _batch(self, calls: list) -> list:
+        """
+        Run up to BATCH_SIZE (method, path, body) calls in one batch HTTP request
+
+        Returns one (status_code, body) tuple per call, in order.
+        """
+        boundary = f"batch_{uuid.uuid4().hex}"
+        prefix = urlparse(self.base_url).path
+        parts = []
+        for i, (method, path, body) in enumerate(calls):
+            part = (
+                f"--{boundary}\r\n"
+                "Content-Type: application/http\r\n"
+                f"Content-ID: <item{i}>\r\n\r\n"
+                f"{method} {prefix}{path} HTTP/1.1\r\n"
+            )
+            if body is not None:
+                part += f"Content-Type: application/json\r\n\r\n{json.dumps(body)}"
+            parts.append(part + "\r\n")
+        payload = "".join(parts) + f"--{boundary}--"
+
+        response = await self._send(
+            'POST',
+            settings.GOOGLE_CALENDAR_BATCH_URL,
+            content=payload.encode(),
+            headers={'Content-Type': f'multipart/mixed; boundary={boundary}'}
+        )
+        if response.status_code >= 400:
+            raise CalendarAPIError(response.status_code, response.text)
+        return self._parse_batch_response(response, len(calls))
+
+    @staticmethod
+    def _parse_batch_response(response, count: int) -> list:
+        """Split a multipart/mixed batch response into per-call (status_code, body) tuples"""
+        match = re.search(r'boundary=([^;\s]+)', response.headers.get('content-type', ''))
+        results = [(500, 'missing from batch response')] * count
+        if not match:
+            return results
+
+        for part in response.text.split('--' + match.group(1).strip('"')):
+            item = re.search(r'Content-ID:\s*<response-item(\d+)>', part, re.I)
+            status = re.search(r'HTTP/1\.1 (\d{3})', part)
+            if not item or not status:
+                continue
+            # Body follows the blank line after the inner HTTP headers
+            inner = part[status.start():].replace('\r\n', '\n')
+            body = inner.split('\n\n', 1)[1].strip() if '\n\n' in inner else ''
+            index = int(item.group(1))
+            if index < count:
+                results[index] = (int(status.group(1)), body)
+        return results
+
+    async def _use_mirror(self) -> bool:
+        return self.mirror is not None and await self.mirror.ensure_fresh(self.user_email, self)
+
+    async def _write_through(self, upserted: dict = None, removed: list = None):
+        """Keep the mirror and conflict window in step with our own writes; a failure only costs a resync"""
+        if self._window is not None:
+            index = self._window[2]
+            if upserted:
+                index.add(upserted)
+            for event_id in removed or ():
+                index.remove(event_id)
+        if self.mirror is None:
+            return
+        try:
+            if upserted:
+                await self.mirror.upsert(self.user_email, upserted)
+            if removed:
+                await self.mirror.remove(self.user_email, removed)
+        except Exception as e:
+            logger.warning("⚠️ Event mirror write failed: %s", e)
+            await self.mirror.mark_dirty(self.user_email)
+
+    def invalidate_window(self):
+        """Forget the conflict-check window; the next check lists it again"""
+        self._window = None
+
+    async def watch(self, channel_id: str, address: str, token: str, ttl: int) -> dict:
+        """Open an events.watch push channel on the primary calendar; returns the channel resource"""
+        return await self._request('POST', '/calendars/primary/events/watch', json={
+            'id': channel_id,
+            'type': 'web_hook',
+            'address': address,
+            'token': token,
+            'params': {'ttl': str(ttl)}
+        })
+
+    async def stop_channel(self, channel_id: str, resource_id: str):
+        await self._request('POST', '/channels/stop', json={'id': channel_id, 'resourceId': resource_id})
+
+    async def sync_events(self, sync_token: str = None) -> tuple:
+        """
+        Page through events.list for incremental sync
+
+        With sync_token returns only changes since it (cancelled events
+        included); without one returns every event. Returns
+        (events, next_sync_token); raises SyncTokenExpired on 410 Gone.
+        """
+        params = {'singleEvents': True, 'maxResults': BULK_PAGE_SIZE}
+        if sync_token:
+            params['syncToken'] = sync_token
+        events = []
+        while True:
+            try:
+                result = await self._request('GET', '/calendars/primary/events', params=params)
+            except CalendarAPIError as e:
+                if e.status_code == 410:
+                    raise SyncTokenExpired() from e
+                raise
+            events.extend(result.get('items', []))
+            if result.get('nextPageToken'):
+                params['pageToken'] = result['nextPageToken']
+                continue
+            return events, result.get('nextSyncToken')
+
+    async def create_event(self, title: str, date: str, time: str, duration: int = 60) -> dict:
+        """Create event with duration support"""
+        event = self.build_event_body(title, date, time, duration)
+
+        logger.debug("📅 Creating: %s | %s → %s (%smin)", title, event['start']['dateTime'], event['end']['dateTime'], duration)
+        created = await self._request('POST', '/calendars/primary/events', json=event)
+        await self._write_through(upserted=created)
+        return created
+
+    async def iter_events(self, time_min: str = None, time_max: str = None, fields: str = EVENT_FIELDS, page_size: int = LIST_PAGE_SIZE, limit: int = None):
+        """
+        Yield events overlapping [time_min, time_max) in start order
+
+        Pages are fetched lazily with the fields partial-response mask, so a
+        caller that stops early never downloads the rest. At most limit
+        events are yielded. Always goes to Google, never the mirror.
+        """
+        params = self.iter_params(time_min, time_max, fields, page_size)
+        count = 0
+        while True:
+            result = await self._request('GET', '/calendars/primary/events', params=params)
+            for event in result.get('items', []):
+                yield event
+                count += 1
+                if limit and count >= limit:
+                    return
+            if not result.get('nextPageToken'):
+                return
+            params['pageToken'] = result['nextPageToken']
+
+    async def iter_range(self, time_min: str = None, time_max: str = None):
+        """
+        Yield every event overlapping [time_min, time_max) in start order
+
+        Streams from the mirror's cursor when it is fresh, otherwise pages
+        through Google with EXPORT_FIELDS. Nothing is collected, so a
+        multi-year range costs one page of memory.
+        """
+        if await self._use_mirror():
+            async for event in self.mirror.iter_query(self.user_email, time_min, time_max):
+                yield event
+            return
+        async for event in self.iter_events(time_min, time_max, fields=EXPORT_FIELDS):
+            yield event
+
+    async def list_events(self, max_results: int = 10, date_filter: str = None, include_past: bool = False, time_range: str = None) -> list:
+        """
+        List events with optional time range filtering
+
+        Args:
+            max_results: Maximum number of events
+            date_filter: Single date filter (legacy)
+            include_past: Include past events from today
+            time_range: Time range filter (this_week, this_month, etc.)
+        """
+        return [e async for e in self.iter_list(max_results, date_filter, include_past, time_range)]
+
+    async def iter_list(self, max_results: int = 10, date_filter: str = None, include_past: bool = False, time_range: str = None):
+        """list_events() as an async generator, for replies that stream each line as it arrives"""
+        params = self.list_params(max_results, date_filter, include_past, time_range)
+        if await self._use_mirror():
+            events = self.mirror.iter_query(self.user_email, params.get('timeMin'), params.get('timeMax'), max_results)
+        else:
+            events = self.iter_events(
+                params.get('timeMin'), params.get('timeMax'),
+                page_size=min(max_results, LIST_PAGE_SIZE), limit=max_results
+            )
+        async for event in events:
+            yield event
+
+    async def find_event(self, title: str, date_filter: str = None) -> dict:
+        """Find event by title with improved matching; stops listing at the first exact or substring hit"""
+        params = self.list_params(100, date_filter, include_past=True)
+        if await self._use_mirror():
+            index = await self.mirror.title_index(self.user_email)
+            logger.debug("🔍 Searching '%s' in title index (%s events)", title, len(index))
+            return index.match(
+                title,
+                parse_bound(params['timeMin']) if params.get('timeMin') else None,
+                parse_bound(params['timeMax']) if params.get('timeMax') else None
+            )
+
+        events = []
+        async for e in self.iter_events(params.get('timeMin'), params.get('timeMax'), page_size=100, limit=100):
+            if self.is_direct_match(title, e):
+                logger.debug("✅ Direct match: '%s' after %s events", e.get('summary'), len(events) + 1)
+                return e
+            events.append(e)
+
+        if not events:
+            logger.debug("🔍 No events found")
+            return None
+
+        logger.debug("🔍 Searching '%s' among %s events:", title, len(events))
+        for e in events[:10]:
+            logger.debug("   - %s", e.get('summary', 'Untitled'))
+        if len(events) > 10:
+            logger.debug("   ... and %s more", len(events) - 10)
+
+        return self.match_event(title, events)
+
+    async def find_conflicts(self, start: datetime, end: datetime) -> list:
+        """
+        Events overlapping [start, end), ordered by start
+
+        Answered from an IntervalIndex: the mirror's per-user one when the
+        mirror is fresh, otherwise one built from a CONFLICT_WINDOW_DAYS
+        listing starting at start's Asia/Kolkata day, reused until it ages
+        past EVENT_MIRROR_TTL_SECONDS or a query falls outside it.
+        """
+        if await self._use_mirror():
+            index = await self.mirror.interval_index(self.user_email)
+            return index.overlapping(start, end)
+
+        window = self._window
+        if (window is None or start < window[0] or end > window[1]
+                or time.monotonic() - window[3] > settings.EVENT_MIRROR_TTL_SECONDS):
+            day = self.tz.localize(datetime.combine(start.astimezone(self.tz).date(), datetime.min.time()))
+            window_end = max(day + timedelta(days=settings.CONFLICT_WINDOW_DAYS), end)
+            fetched_at = time.monotonic()
+            events = [e async for e in self.iter_events(day.isoformat(), window_end.isoformat(), page_size=BULK_PAGE_SIZE)]
+            window = self._window = (day, window_end, IntervalIndex(events), fetched_at)
+            logger.debug("🗓️ Conflict window %s → %s: %s events", day, window_end, len(events))
+        return window[2].overlapping(start, end)
+
+    async def freebusy(self, time_min: str, time_max: str) -> list:
+        """Busy (start, end) spans on the primary calendar from freebusy.query, as UTC datetimes"""
+        result = await self._request('POST', '/freeBusy', json={
+            'timeMin': time_min,
+            'timeMax': time_max,
+            'timeZone': 'Asia/Kolkata',
+            'items': [{'id': 'primary'}]
+        })
+        primary = result.get('calendars', {}).get('primary', {})
+        if primary.get('errors'):
+            raise CalendarAPIError(400, json.dumps(primary['errors']))
+        return [(parse_bound(b['start']), parse_bound(b['end'])) for b in primary.get('busy', [])]
+
+    async def find_free_slot(self, start: datetime, end: datetime, duration: int) -> Optional[datetime]:
+        """
+        Earliest free duration-minute slot in [start, end) within working hours
+
+        One freebusy query covers the window; WORK_DAY_START/END,
+        SLOT_BUFFER_MINUTES and SLOT_WEEKENDS shape what counts as free.
+        """
+        if start >= end:
+            # Google rejects an inverted freebusy window with a 400
+            return None
+        busy = await self.freebusy(start.isoformat(), end.isoformat())
+        slot = find_slot(
+            busy, start, end, timedelta(minutes=duration), self.tz,
+            datetime.strptime(settings.WORK_DAY_START, "%H:%M").time(),
+            datetime.strptime(settings.WORK_DAY_END, "%H:%M").time(),
+            buffer=timedelta(minutes=settings.SLOT_BUFFER_MINUTES),
+            weekends=settings.SLOT_WEEKENDS
+        )
+        logger.debug("🕳️ Free slot search %s → %s over %s busy spans: %s", start, end, len(busy), slot)
+        return slot
+
+    async def list_all_events(self, time_range: str = None) -> list:
+        """List every upcoming event (or every event in time_range), following page tokens"""
+        params = self.list_params(BULK_PAGE_SIZE, time_range=time_range)
+        if await self._use_mirror():
+            return await self.mirror.query(self.user_email, params.get('timeMin'), params.get('timeMax'))
+        return [e async for e in self.iter_events(params.get('timeMin'), params.get('timeMax'), page_size=BULK_PAGE_SIZE)]
+
+    async def bulk_delete(self, time_range: str = None) -> dict:
+        """
+        Delete all events, optionally filtered by time range
+
+        Returns: {'deleted': count, 'failed': [{'id', 'summary', 'error'}, ...]}
+        """
+        events = await self.list_all_events(time_range)
+        if time_range:
+            logger.debug("🗑️ Deleting %s events in range: %s", len(events), time_range)
+        else:
+            logger.debug("🗑️ Deleting %s upcoming events", len(events))
+
+        report = {'deleted': 0, 'failed': []}
+        async for outcome in self.iter_delete(events):
+            if outcome['deleted']:
+                report['deleted'] += 1
+            else:
+                report['failed'].append({k: outcome[k] for k in ('id', 'summary', 'error')})
+        return report
+
+    async def iter_delete(self, events: list):
+        """
+        Delete events, yielding {'id', 'summary', 'deleted', 'error'} per event
+        as each batch completes
+
+        Deletes go out as batch requests of BATCH_SIZE calls, with at most
+        CALENDAR_BATCH_CONCURRENCY batches in flight. If the consumer stops
+        early, batches not yet sent are cancelled.
+        """
+        semaphore = asyncio.Semaphore(settings.CALENDAR_BATCH_CONCURRENCY)
+
+        async def run_chunk(chunk):
+            calls = [('DELETE', f"/calendars/primary/events/{e['id']}", None) for e in chunk]
+            async with semaphore:
+                try:
+                    results = await self._batch(calls)
+                except Exception as e:
+                    results = [(None, str(e))] * len(chunk)
+            return zip(chunk, results)
+
+        tasks = [
+            asyncio.ensure_future(run_chunk(events[i:i + BATCH_SIZE]))
+            for i in range(0, len(events), BATCH_SIZE)
+        ]
+        removed = []
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                for event, (status, body) in await next_done:
+                    summary = event.get('summary', 'Untitled')
+                    # 410 Gone means someone else already deleted it
+                    if status in (200, 204, 410):
+                        logger.debug("   ✓ Deleted: %s", summary)
+                        removed.append(event['id'])
+                        yield {'id': event['id'], 'summary': summary, 'deleted': True, 'error': None}
+                    else:
+                        logger.warning("   ✗ Failed to delete: %s - %s %s", summary, status, body)
+                        yield {'id': event['id'], 'summary': summary, 'deleted': False, 'error': f"{status} {body}".strip()}
+        finally:
+            unfinished = [task for task in tasks if not task.done()]
+            for task in unfinished:
+                task.cancel()
+            if unfinished:
+                self._window = None
+            await self._write_through(removed=removed)
+            # A cancelled batch may already have reached Google
+            if unfinished and self.mirror is not None:
+                await self.mirror.mark_dirty(self.user_email)
+
+    async def iter_import(self, bodies):
+        """
+        Import event bodies (an async iterable) through batch requests to
+        events.import, yielding {'uid', 'summary', 'imported', 'error'} per
+        event as its batch completes
+
+        events.import keys on iCalUID, so re-importing updates instead of
+        duplicating. At most CALENDAR_BATCH_CONCURRENCY batches are in
+        flight; bodies are not pulled from the iterable while they are.
+        """
+        async def run_chunk(chunk):
+            calls = [('POST', '/calendars/primary/events/import', body) for body in chunk]
+            try:
+                results = await self._batch(calls)
+            except Exception as e:
+                results = [(None, str(e))] * len(chunk)
+            return zip(chunk, results)
+
+        def outcomes(done):
+            for task in done:
+                for body, (status, raw) in task.result():
+                    ok = status == 200
+                    if not ok:
+                        logger.warning("   ✗ Failed to import: %s - %s %s", body.get('summary'), status, raw)
+                    yield {
+                        'uid': body.get('iCalUID'),
+                        'summary': body.get('summary'),
+                        'imported': ok,
+                        'error': None if ok else f"{status} {raw}".strip()
+                    }
+
+        in_flight = set()
+        chunk = []
+        try:
+            async for body in bodies:
+                chunk.append(body)
+                if len(chunk) < BATCH_SIZE:
+                    continue
+                in_flight.add(asyncio.ensure_future(run_chunk(chunk)))
+                chunk = []
+                if len(in_flight) >= settings.CALENDAR_BATCH_CONCURRENCY:
+                    done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                    for outcome in outcomes(done):
+                        yield outcome
+            if chunk:
+                in_flight.add(asyncio.ensure_future(run_chunk(chunk)))
+            while in_flight:
+                done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for outcome in outcomes(done):
+                    yield outcome
+        finally:
+            for task in in_flight:
+                task.cancel()
+            # Imports can touch any date range; let the next read resync
+            self._window = None
+            if self.mirror is not None:
+                await self.mirror.mark_dirty(self.user_email)
+
+    async def delete_all_events(self, time_range: str = None) -> int:
+        """
+        Delete all events, optionally filtered by time range
+
+        Returns: Number of events deleted
+        """
+        return (await self.bulk_delete(time_range))['deleted']
+
+    async def update_event(self, event_id: str, new_date: str = None, new_time: str = None, new_duration: int = None) -> dict:
+        """Update event with support for date, time, and duration changes"""
+        path = f'/calendars/primary/events/{event_id}'
+        event = await self._request('GET', path)
+
+        self.apply_update(event, new_date, new_time, new_duration)
+
+        updated = await self._request('PUT', path, json=event)
+        await self._write_through(upserted=updated)
+        return updated
+
+    async def delete_event(self, event_id: str) -> bool:
+        await self._request('DELETE', f'/calendars/primary/events/{event_id}')
+        await self._write_through(removed=[event_id])
+        return True
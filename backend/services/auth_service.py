@@ -62,5 +62,7 @@ class AuthService:
             'token_uri': credentials.token_uri,
             'client_id': credentials.client_id,
             'client_secret': credentials.client_secret,
-            'scopes': credentials.scopes
+            'scopes': credentials.scopes,
+            # Naive UTC, as google-auth reports it; the credential manager refreshes ahead of it
+            'expiry': credentials.expiry
         }
\ No newline at end of file
@@ -0,0 +1,69 @@
+from cachetools import TTLCache
+from services.async_calendar_service import AsyncCalendarService
+from services.event_mirror import EventMirror
+from services.credential_manager import credential_manager
+from config import get_settings
+
+settings = get_settings()
+
+def credentials_fingerprint(creds_dict: dict) -> tuple:
+    """
+    Identity of a stored credentials dict; changes whenever the user re-authorizes
+
+    The access token is left out: refreshes update the pooled client's
+    credentials in place, and the write-back must not rebuild it.
+    """
+    return (
+        creds_dict.get('refresh_token'),
+        creds_dict.get('client_id'),
+        tuple(creds_dict.get('scopes') or ())
+    )
+
+class CalendarPool:
+    """
+    Bounded LRU/TTL pool of ready-to-use calendar clients keyed by user email.
+
+    A cached client is reused only while the stored credentials it was built
+    from still belong to the same grant; a new login rebuilds it. Handing
+    out a client starts a background token refresh when the token is
+    about to expire, so it overlaps intent parsing instead of the first
+    Calendar call.
+    """
+    def __init__(self, factory=AsyncCalendarService, maxsize: int = None, ttl: int = None, **client_kwargs):
+        self.factory = factory
+        self.client_kwargs = client_kwargs
+        # Called with (email, client) whenever a client is built, i.e. a user becomes active
+        self.on_new_client = None
+        self._clients = TTLCache(
+            maxsize=maxsize or settings.CALENDAR_POOL_SIZE,
+            ttl=ttl or settings.CALENDAR_POOL_TTL_SECONDS
+        )
+
+    def get(self, email: str, creds_dict: dict):
+        """Return the pooled client for email, building one if missing or stale"""
+        fingerprint = credentials_fingerprint(creds_dict)
+        entry = self._clients.get(email)
+        if entry and entry[0] == fingerprint:
+            client = entry[1]
+        else:
+            # Tokens are refreshed in the client's credentials in place, so give it its own copy
+            client = self.factory(dict(creds_dict), user_email=email, **self.client_kwargs)
+            self._clients[email] = (fingerprint, client)
+            if self.on_new_client:
+                self.on_new_client(email, client)
+        credential_manager.refresh_ahead(email, client.creds)
+        return client
+
+    def peek(self, email: str):
+        """The pooled client for email, if any, without building one"""
+        entry = self._clients.get(email)
+        return entry[1] if entry else None
+
+    def invalidate(self, email: str):
+        """Drop the pooled client for email"""
+        self._clients.pop(email, None)
+
+    def __len__(self):
+        return len(self._clients)
+
+calendar_pool = CalendarPool(mirror=EventMirror() if settings.EVENT_MIRROR_ENABLED else None)
@@ -1,21 +1,23 @@
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
 from datetime import datetime, timedelta
 import pytz
 from difflib import SequenceMatcher
+import logging
 
-class CalendarService:
-    def __init__(self, creds_dict: dict):
-        creds = Credentials(
-            token=creds_dict.get('token'),
-            refresh_token=creds_dict.get('refresh_token'),
-            token_uri=creds_dict.get('token_uri'),
-            client_id=creds_dict.get('client_id'),
-            client_secret=creds_dict.get('client_secret'),
-            scopes=creds_dict.get('scopes')
-        )
-        self.service = build('calendar', 'v3', credentials=creds)
-        self.tz = pytz.timezone('Asia/Kolkata')
+logger = logging.getLogger(__name__)
+
+# Google caps a batch request at 50 calls; events.list pages at most 2500 items
+BATCH_SIZE = 50
+BULK_PAGE_SIZE = 2500
+LIST_PAGE_SIZE = 250
+
+# Partial-response mask for listings: only what matching, formatting and deletes read
+EVENT_FIELDS = 'items(id,summary,start,end,status),nextPageToken'
+# Partial response for exports, which also carry the text fields and UIDs
+EXPORT_FIELDS = 'items(id,iCalUID,recurringEventId,summary,description,location,start,end,status),nextPageToken'
+
+class CalendarBase:
+    """Date handling, request bodies and matching for AsyncCalendarService, kept free of I/O"""
+    tz = pytz.timezone('Asia/Kolkata')
     
     def get_time_range_bounds(self, time_range: str) -> tuple:
         """
@@ -115,45 +117,31 @@ class CalendarService:
         except:
             return start
     
-    def create_event(self, title: str, date: str, time: str, duration: int = 60) -> dict:
-        """Create event with duration support"""
+    def build_event_body(self, title: str, date: str, time: str, duration: int = 60) -> dict:
+        """Build the event resource create_event inserts"""
         start = self.parse_dt(date, time)
         end = start + timedelta(minutes=duration)
         
-        event = {
+        return {
             'summary': title,
             'start': {'dateTime': start.isoformat(), 'timeZone': 'Asia/Kolkata'},
             'end': {'dateTime': end.isoformat(), 'timeZone': 'Asia/Kolkata'}
         }
-        
-        print(f"📅 Creating: {title} | {start} → {end} ({duration}min)")
-        return self.service.events().insert(calendarId='primary', body=event).execute()
     
-    def list_events(self, max_results: int = 10, date_filter: str = None, include_past: bool = False, time_range: str = None) -> list:
-        """
-        List events with optional time range filtering
-        
-        Args:
-            max_results: Maximum number of events
-            date_filter: Single date filter (legacy)
-            include_past: Include past events from today
-            time_range: Time range filter (this_week, this_month, etc.)
-        """
-        
+    def list_params(self, max_results: int = 10, date_filter: str = None, include_past: bool = False, time_range: str = None) -> dict:
+        """Query parameters for an events.list call with the given filters"""
         # If time_range specified, use it
         if time_range:
             time_min, time_max = self.get_time_range_bounds(time_range)
             if time_min and time_max:
-                print(f"📅 Time range filter: {time_range} ({time_min} to {time_max})")
-                result = self.service.events().list(
-                    calendarId='primary',
-                    timeMin=time_min,
-                    timeMax=time_max,
-                    maxResults=max_results,
-                    singleEvents=True,
-                    orderBy='startTime'
-                ).execute()
-                return result.get('items', [])
+                logger.debug("📅 Time range filter: %s (%s to %s)", time_range, time_min, time_max)
+                return {
+                    'timeMin': time_min,
+                    'timeMax': time_max,
+                    'maxResults': max_results,
+                    'singleEvents': True,
+                    'orderBy': 'startTime'
+                }
         
         # Legacy date filter logic
         if include_past:
@@ -161,6 +149,13 @@ class CalendarService:
         else:
             time_min = datetime.utcnow().isoformat() + 'Z'
         
+        params = {
+            'timeMin': time_min,
+            'maxResults': max_results,
+            'singleEvents': True,
+            'orderBy': 'startTime'
+        }
+        
         if date_filter:
             try:
                 if date_filter == "today":
@@ -173,47 +168,63 @@ class CalendarService:
                 start_of_day = filter_date.replace(hour=0, minute=0, second=0, microsecond=0)
                 end_of_day = filter_date.replace(hour=23, minute=59, second=59, microsecond=0)
                 
-                result = self.service.events().list(
-                    calendarId='primary',
-                    timeMin=start_of_day.isoformat() + 'Z',
-                    timeMax=end_of_day.isoformat() + 'Z',
-                    maxResults=max_results,
-                    singleEvents=True,
-                    orderBy='startTime'
-                ).execute()
+                params['timeMin'] = start_of_day.isoformat() + 'Z'
+                params['timeMax'] = end_of_day.isoformat() + 'Z'
             except:
-                result = self.service.events().list(
-                    calendarId='primary',
-                    timeMin=time_min,
-                    maxResults=max_results,
-                    singleEvents=True,
-                    orderBy='startTime'
-                ).execute()
-        else:
-            result = self.service.events().list(
-                calendarId='primary',
-                timeMin=time_min,
-                maxResults=max_results,
-                singleEvents=True,
-                orderBy='startTime'
-            ).execute()
+                pass
         
-        return result.get('items', [])
+        return params
     
-    def find_event(self, title: str, date_filter: str = None) -> dict:
-        """Find event by title with improved matching"""
-        events = self.list_events(100, date_filter, include_past=True)
+    def apply_update(self, event: dict, new_date: str = None, new_time: str = None, new_duration: int = None) -> dict:
+        """Move event's start/end in place, keeping its duration unless a new one is given"""
+        curr_start = datetime.fromisoformat(event['start']['dateTime'])
+        curr_end = datetime.fromisoformat(event['end']['dateTime'])
+        current_duration = (curr_end - curr_start).total_seconds() / 60
+        
+        logger.debug("📝 Current: %s → %s (%.0fmin)", curr_start, curr_end, current_duration)
+        
+        if new_date or new_time:
+            new_start = self.parse_dt(
+                new_date or curr_start.strftime("%Y-%m-%d"),
+                new_time or curr_start.strftime("%H:%M")
+            )
+        else:
+            new_start = curr_start
+        
+        if new_duration:
+            new_end = new_start + timedelta(minutes=new_duration)
+            logger.debug("✏️  Updated duration: %smin", new_duration)
+        else:
+            duration_to_use = current_duration
+            new_end = new_start + timedelta(minutes=duration_to_use)
         
-        if not events:
-            print(f"🔍 No events found")
-            return None
+        event['start']['dateTime'] = new_start.isoformat()
+        event['end']['dateTime'] = new_end.isoformat()
         
-        print(f"🔍 Searching '{title}' among {len(events)} events:")
-        for e in events[:10]:
-            print(f"   - {e.get('summary', 'Untitled')}")
-        if len(events) > 10:
-            print(f"   ... and {len(events) - 10} more")
+        logger.debug("📅 New: %s → %s", new_start, new_end)
         
+        return event
+    
+    def iter_params(self, time_min: str = None, time_max: str = None, fields: str = EVENT_FIELDS, page_size: int = LIST_PAGE_SIZE) -> dict:
+        """events.list parameters for one page of an iter_events listing"""
+        params = {'maxResults': page_size, 'singleEvents': True, 'orderBy': 'startTime'}
+        if time_min:
+            params['timeMin'] = time_min
+        if time_max:
+            params['timeMax'] = time_max
+        if fields:
+            params['fields'] = fields
+        return params
+    
+    @staticmethod
+    def is_direct_match(title: str, event: dict) -> bool:
+        """Whether event's summary equals, contains or is contained in title (match_event's outright wins)"""
+        tl = title.lower().strip()
+        et = event.get('summary', '').lower().strip()
+        return tl == et or tl in et or et in tl
+    
+    def match_event(self, title: str, events: list) -> dict:
+        """Pick the event whose summary best matches title"""
         best = None
         best_score = 0
         tl = title.lower().strip()
@@ -222,11 +233,11 @@ class CalendarService:
             et = e.get('summary', '').lower().strip()
             
             if tl == et:
-                print(f"✅ Exact match: '{et}'")
+                logger.debug("✅ Exact match: '%s'", et)
                 return e
             
             if tl in et or et in tl:
-                print(f"✅ Substring match: '{et}'")
+                logger.debug("✅ Substring match: '%s'", et)
                 return e
             
             score = SequenceMatcher(None, tl, et).ratio()
@@ -244,68 +255,8 @@ class CalendarService:
         threshold = 0.3 if len(tl) <= 5 else 0.4
         
         if best_score >= threshold:
-            print(f"✅ Found match: '{best.get('summary')}' (score: {best_score:.2f})")
+            logger.debug("✅ Found match: '%s' (score: %.2f)", best.get('summary'), best_score)
             return best
         
-        print(f"❌ No match found (best score: {best_score:.2f})")
+        logger.debug("❌ No match found (best score: %.2f)", best_score)
         return None
-    
-    def delete_all_events(self, time_range: str = None) -> int:
-        """
-        Delete all events, optionally filtered by time range
-        
-        Returns: Number of events deleted
-        """
-        if time_range:
-            events = self.list_events(max_results=500, time_range=time_range)
-            print(f"🗑️ Deleting all events in range: {time_range}")
-        else:
-            events = self.list_events(max_results=500)
-            print(f"🗑️ Deleting all upcoming events")
-        
-        count = 0
-        for event in events:
-            try:
-                self.service.events().delete(calendarId='primary', eventId=event['id']).execute()
-                print(f"   ✓ Deleted: {event.get('summary', 'Untitled')}")
-                count += 1
-            except Exception as e:
-                print(f"   ✗ Failed to delete: {event.get('summary', 'Untitled')} - {e}")
-        
-        return count
-    
-    def update_event(self, event_id: str, new_date: str = None, new_time: str = None, new_duration: int = None) -> dict:
-        """Update event with support for date, time, and duration changes"""
-        event = self.service.events().get(calendarId='primary', eventId=event_id).execute()
-        
-        curr_start = datetime.fromisoformat(event['start']['dateTime'])
-        curr_end = datetime.fromisoformat(event['end']['dateTime'])
-        current_duration = (curr_end - curr_start).total_seconds() / 60
-        
-        print(f"📝 Current: {curr_start} → {curr_end} ({current_duration:.0f}min)")
-        
-        if new_date or new_time:
-            new_start = self.parse_dt(
-                new_date or curr_start.strftime("%Y-%m-%d"),
-                new_time or curr_start.strftime("%H:%M")
-            )
-        else:
-            new_start = curr_start
-        
-        if new_duration:
-            new_end = new_start + timedelta(minutes=new_duration)
-            print(f"✏️  Updated duration: {new_duration}min")
-        else:
-            duration_to_use = current_duration
-            new_end = new_start + timedelta(minutes=duration_to_use)
-        
-        event['start']['dateTime'] = new_start.isoformat()
-        event['end']['dateTime'] = new_end.isoformat()
-        
-        print(f"📅 New: {new_start} → {new_end}")
-        
-        return self.service.events().update(calendarId='primary', eventId=event_id, body=event).execute()
-    
-    def delete_event(self, event_id: str) -> bool:
-        self.service.events().delete(calendarId='primary', eventId=event_id).execute()
-        return True
\ No newline at end of file
@@ -0,0 +1,143 @@
+from db import get_db
+from config import get_settings
+from services.metrics import count_history_write
+from datetime import datetime
+import asyncio
+import logging
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+class ChatHistoryWriter:
+    """
+    Write-behind buffer for the chat_history collection.
+
+    record() only puts the turn on a bounded asyncio.Queue, so a response
+    never waits on Mongo. One background task drains it with insert_many
+    whenever CHAT_HISTORY_BATCH_SIZE turns are waiting or
+    CHAT_HISTORY_FLUSH_SECONDS have passed since the first one. With a
+    single insert in flight, a slow Mongo fills the queue; turns recorded
+    while it is full are dropped and counted instead of piling up in memory.
+    """
+    def __init__(self, db=None, maxsize: int = None, batch_size: int = None, interval: float = None):
+        self._db = db
+        self.maxsize = maxsize or settings.CHAT_HISTORY_QUEUE_SIZE
+        self.batch_size = batch_size or settings.CHAT_HISTORY_BATCH_SIZE
+        self.interval = interval or settings.CHAT_HISTORY_FLUSH_SECONDS
+        self._queue = None
+        self._task = None
+        self._batch = []          # turns taken off the queue but not yet sent
+        self._inflight = None     # the insert_many currently running
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    @property
+    def collection(self):
+        if self._db is None:
+            self._db = get_db()
+        return self._db['chat_history']
+
+    def start(self):
+        """Start the flusher on the running loop (FastAPI lifespan)"""
+        if self._task is None:
+            self._queue = asyncio.Queue(maxsize=self.maxsize)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher and write out whatever is still buffered"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        # The insert the flusher was waiting on keeps running; let it land
+        if self._inflight is not None:
+            await self._inflight
+            self._inflight = None
+        while not self._queue.empty():
+            self._batch.append(self._queue.get_nowait())
+        while self._batch:
+            await self._flush()
+
+    def record(self, user_email: str, message: str, intents: list, result: dict, phases: dict, seconds: float) -> bool:
+        """Queue one chat turn; False if it was dropped because the buffer is full"""
+        if self._queue is None:
+            return False
+        doc = {
+            'user_email': user_email,
+            'message': message,
+            'intents': intents,
+            'parser': intents[0].get('source') if intents else None,
+            'result': summarize(result),
+            'latency_ms': {name: round(s * 1000, 2) for name, s in (phases or {}).items()},
+            'total_ms': round(seconds * 1000, 2),
+            'timestamp': datetime.utcnow()
+        }
+        try:
+            self._queue.put_nowait(doc)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            count_history_write('dropped')
+            return False
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._batch.append(await self._queue.get())
+            deadline = loop.time() + self.interval
+            while len(self._batch) < self.batch_size:
+                try:
+                    self._batch.append(self._queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    self._batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            await self._flush()
+
+    async def _flush(self):
+        batch, self._batch = self._batch[:self.batch_size], self._batch[self.batch_size:]
+        # Shielded so stopping the flusher doesn't abandon a batch halfway
+        self._inflight = asyncio.ensure_future(self._insert(batch))
+        await asyncio.shield(self._inflight)
+        self._inflight = None
+
+    async def _insert(self, batch: list):
+        try:
+            await self.collection.insert_many(batch, ordered=False)
+            self.written += len(batch)
+            count_history_write('written', len(batch))
+        except Exception as e:
+            self.failed += len(batch)
+            count_history_write('failed', len(batch))
+            logger.warning("⚠️ Chat history write of %s turns failed: %s", len(batch), e)
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed
+        }
+
+def summarize(result: dict) -> dict:
+    """The parts of a chat reply worth keeping: outcome and text, not event payloads"""
+    if not result:
+        return {'success': False, 'message': None}
+    summary = {'success': result.get('success'), 'message': result.get('message')}
+    for key in ('events', 'conflicts', 'results'):
+        if result.get(key):
+            summary[key] = len(result[key])
+    return summary
+
+chat_history = ChatHistoryWriter()
@@ -0,0 +1,211 @@
+from db import get_db
+from config import get_settings
+from services.http_client import get_http_client
+from services.user_cache import user_cache
+from services.metrics import count_token_refresh, detach_request
+from cachetools import TTLCache
+from datetime import datetime, timedelta
+from typing import Optional
+import asyncio
+import logging
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOKEN_URI = 'https://oauth2.googleapis.com/token'
+# A token this close to expiry counts as expired (clock skew, the call's own latency)
+EXPIRY_SKEW_SECONDS = 30
+
+class TokenRefreshError(Exception):
+    """The token endpoint refused a refresh (revoked grant, bad client)"""
+    def __init__(self, status_code: int, message: str):
+        super().__init__(f"token refresh failed ({status_code}): {message}")
+        self.status_code = status_code
+
+def seconds_left(creds: dict) -> Optional[float]:
+    """Seconds until the access token expires; None if its expiry was never stored"""
+    if not creds.get('token'):
+        return 0
+    expiry = creds.get('expiry')
+    if expiry is None:
+        return None
+    return (expiry - datetime.utcnow()).total_seconds()
+
+class CredentialManager:
+    """
+    Keeps users' OAuth access tokens fresh, off the request path.
+
+    Stored credentials carry the access token's expiry (naive UTC). A client
+    asks access_token() before every call: a token inside the last
+    CREDENTIAL_REFRESH_BEFORE_SECONDS is still returned while a refresh runs
+    in the background, and only an expired one makes the call wait.
+    Concurrent refreshes for one user share a single token request. The new
+    token is written back to the user's document in one update, guarded on
+    the refresh token so a newer login wins, and a worker that finds a
+    fresh token already stored adopts it instead of refreshing again. A
+    background loop refreshes recently active users before they need it.
+    Credentials stored without an expiry (logins before it was recorded)
+    count as due: one background refresh learns and stores it.
+    """
+    def __init__(self, db=None):
+        self._db = db
+        self._task = None
+        self._refreshing = {}    # email -> task running the token request
+        # Recently active users' credentials (each client's own dict), for the loop
+        self._active = TTLCache(maxsize=settings.CALENDAR_POOL_SIZE, ttl=settings.CALENDAR_POOL_TTL_SECONDS)
+        self.refreshed = 0
+        self.adopted = 0
+        self.failed = 0
+
+    @property
+    def users(self):
+        if self._db is None:
+            self._db = get_db()
+        return self._db['users']
+
+    def start(self):
+        """Start the proactive refresh loop (FastAPI lifespan)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        tasks = [self._task, *self._refreshing.values()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+
+    def refresh_ahead(self, email: str, creds: dict):
+        """Note email as active and start a refresh now if its token expires soon"""
+        if email:
+            self._active[email] = creds
+        if creds.get('refresh_token') and self._due(seconds_left(creds), settings.CREDENTIAL_REFRESH_BEFORE_SECONDS):
+            self.refresh_soon(email, creds)
+
+    @staticmethod
+    def _due(left: Optional[float], within: float) -> bool:
+        """Whether a token with `left` seconds to go needs refreshing within `within`"""
+        return left is None or left <= within
+
+    async def access_token(self, email: str, creds: dict) -> str:
+        """Token to send now; waits only when the current one has expired"""
+        if email:
+            self._active[email] = creds
+        left = seconds_left(creds)
+        if creds.get('refresh_token'):
+            # An unknown expiry may still be valid: learn it in the background
+            if left is not None and left <= EXPIRY_SKEW_SECONDS:
+                await self.refresh(email, creds)
+            elif self._due(left, settings.CREDENTIAL_REFRESH_BEFORE_SECONDS):
+                self.refresh_soon(email, creds)
+        return creds.get('token')
+
+    def refresh_soon(self, email: str, creds: dict):
+        """Refresh in the background unless one is already running for email"""
+        if email in self._refreshing:
+            return
+        task = asyncio.ensure_future(self.refresh(email, creds))
+        task.add_done_callback(self._log_failure)
+
+    @staticmethod
+    def _log_failure(task):
+        if not task.cancelled() and task.exception():
+            logger.warning("⚠️ Background token refresh failed: %s", task.exception())
+
+    async def refresh(self, email: str, creds: dict):
+        """Refresh creds in place, joining the refresh already running for email"""
+        task = self._refreshing.get(email) if email else None
+        if task is None:
+            task = asyncio.ensure_future(self._refresh(email, dict(creds)))
+            if email:
+                self._refreshing[email] = task
+                task.add_done_callback(lambda _: self._refreshing.pop(email, None))
+        # Shielded so one cancelled request doesn't cancel the others' refresh
+        creds.update(await asyncio.shield(task))
+
+    async def _refresh(self, email: str, creds: dict) -> dict:
+        """One token request for email; returns the credential fields that changed"""
+        # Shared by every request waiting on it; each times its own wait
+        detach_request()
+        if email:
+            adopted = await self._stored_token(email, creds)
+            if adopted:
+                self.adopted += 1
+                count_token_refresh('adopted')
+                return adopted
+
+        requested_at = datetime.utcnow()
+        response = await get_http_client().post(
+            creds.get('token_uri') or DEFAULT_TOKEN_URI,
+            data={
+                'grant_type': 'refresh_token',
+                'refresh_token': creds.get('refresh_token'),
+                'client_id': creds.get('client_id'),
+                'client_secret': creds.get('client_secret')
+            }
+        )
+        if response.status_code != 200:
+            self.failed += 1
+            count_token_refresh('failed')
+            raise TokenRefreshError(response.status_code, response.text)
+
+        body = response.json()
+        fields = {
+            'token': body['access_token'],
+            'expiry': requested_at + timedelta(seconds=body.get('expires_in', 3600))
+        }
+        # Google rotates the refresh token only occasionally
+        if body.get('refresh_token'):
+            fields['refresh_token'] = body['refresh_token']
+        if email:
+            await self._store(email, creds, fields)
+        self.refreshed += 1
+        count_token_refresh('refreshed')
+        logger.debug("🔑 Refreshed token for %s (expires %s)", email, fields['expiry'])
+        return fields
+
+    async def _stored_token(self, email: str, creds: dict) -> Optional[dict]:
+        """A fresh token another worker already stored for the same grant, if any"""
+        user = await self.users.find_one({'email': email}, {'_id': 0, 'credentials': 1})
+        stored = (user or {}).get('credentials') or {}
+        if (
+            stored.get('refresh_token') == creds.get('refresh_token')
+            and stored.get('token') != creds.get('token')
+            and (seconds_left(stored) or 0) > settings.CREDENTIAL_REFRESH_BEFORE_SECONDS
+        ):
+            return {'token': stored['token'], 'expiry': stored['expiry']}
+        return None
+
+    async def _store(self, email: str, creds: dict, fields: dict):
+        """Write the new token back, unless the user has logged in again since"""
+        try:
+            await self.users.update_one(
+                {'email': email, 'credentials.refresh_token': creds.get('refresh_token')},
+                {'$set': {f'credentials.{key}': value for key, value in fields.items()}}
+            )
+        except Exception as e:
+            # The token still works from memory; the next refresh tries again
+            logger.warning("⚠️ Storing refreshed token for %s failed: %s", email, e)
+        user_cache.invalidate(email)
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(settings.CREDENTIAL_CHECK_SECONDS)
+            # Whatever would cross into the refresh window before the next pass
+            horizon = settings.CREDENTIAL_REFRESH_BEFORE_SECONDS + settings.CREDENTIAL_CHECK_SECONDS
+            for email, creds in list(self._active.items()):
+                if creds.get('refresh_token') and self._due(seconds_left(creds), horizon):
+                    self.refresh_soon(email, creds)
+
+    def stats(self) -> dict:
+        return {
+            "active_users": len(self._active),
+            "refreshing": len(self._refreshing),
+            "refreshed": self.refreshed,
+            "adopted": self.adopted,
+            "failed": self.failed
+        }
+
+credential_manager = CredentialManager()
@@ -0,0 +1,291 @@
+from pymongo import UpdateOne, DeleteOne, ASCENDING, ReturnDocument
+from cachetools import LRUCache
+from datetime import datetime, timedelta, timezone
+from db import get_db
+from utils.date_parser import DateParser
+from utils.title_index import TitleIndex
+from utils.interval_index import IntervalIndex
+from services.metrics import detach_request
+from config import get_settings
+import asyncio
+import logging
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+class SyncTokenExpired(Exception):
+    """Google answered 410 Gone: the sync token is no longer valid"""
+
+def parse_bound(value: str) -> datetime:
+    """Parse a timeMin/timeMax query value to an aware UTC datetime"""
+    dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+class EventMirror:
+    """
+    Per-user copy of calendar events in the events_cache collection.
+
+    Kept current with Calendar incremental sync (syncToken/nextSyncToken);
+    falls back to a full resync when Google expires the token. Reads are
+    served from Mongo while the last sync is younger than
+    EVENT_MIRROR_TTL_SECONDS and nobody marked the user dirty. A stale
+    mirror is synced in the background while that request goes to Google,
+    so no chat request waits on a sync.
+
+    Every write to a user's mirror, from any worker, bumps a version in
+    their sync_state. The in-process title and interval indexes remember
+    the version they were built at and are rebuilt once it moves on, so
+    one worker's syncs and write-throughs reach the others' indexes.
+    """
+    def __init__(self, db=None):
+        self._db = db
+        self._locks = {}
+        self._syncing = {}      # email -> background sync task
+        # In-process (version, index) title and interval indexes for recently active users
+        self._indexes = LRUCache(maxsize=settings.CALENDAR_POOL_SIZE)
+        self._intervals = LRUCache(maxsize=settings.CALENDAR_POOL_SIZE)
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = get_db()
+        return self._db
+
+    @property
+    def events(self):
+        return self.db['events_cache']
+
+    @property
+    def state(self):
+        return self.db['sync_state']
+
+    def _lock(self, email: str) -> asyncio.Lock:
+        if email not in self._locks:
+            self._locks[email] = asyncio.Lock()
+        return self._locks[email]
+
+    async def _version(self, email: str) -> int:
+        """How many times email's mirror has been written, by any worker"""
+        state = await self.state.find_one({'user_email': email}, {'version': 1, '_id': 0})
+        return (state or {}).get('version', 0)
+
+    async def _bump(self, email: str) -> int:
+        """Record a write to email's mirror (after making it) and return the new version"""
+        state = await self.state.find_one_and_update(
+            {'user_email': email},
+            {'$inc': {'version': 1}},
+            projection={'version': 1, '_id': 0},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return state['version']
+
+    async def _indexes_to_update(self, email: str) -> list:
+        """
+        Record a write for email and return the cached indexes it must reach
+
+        An index is kept, and updated by the caller, only if it was current
+        right before this write; if another worker wrote in between it is
+        dropped and rebuilt from the mirror on next use.
+        """
+        version = await self._bump(email)
+        indexes = []
+        for cache in (self._indexes, self._intervals):
+            entry = cache.get(email)
+            if entry is None:
+                continue
+            if entry[0] == version - 1:
+                cache[email] = (version, entry[1])
+                indexes.append(entry[1])
+            else:
+                cache.pop(email, None)
+        return indexes
+
+    def _doc(self, email: str, event: dict) -> dict:
+        start, end = DateParser.event_bounds(event)
+        return {
+            'user_email': email, 'event_id': event['id'], 'start': start, 'end': end, 'event': event,
+            # Lets a full resync tell its own stale leftovers from writes that raced it
+            'written_at': datetime.utcnow()
+        }
+
+    async def is_fresh(self, email: str) -> bool:
+        state = await self.state.find_one({'user_email': email})
+        if not state or state.get('dirty') or not state.get('synced_at'):
+            return False
+        now = datetime.utcnow()
+        # A live push channel marks the user dirty on every change, so polling can back off
+        watched = state.get('watched_until') and state['watched_until'] > now
+        ttl = settings.EVENT_MIRROR_WATCHED_TTL_SECONDS if watched else settings.EVENT_MIRROR_TTL_SECONDS
+        return now - state['synced_at'] < timedelta(seconds=ttl)
+
+    async def ensure_fresh(self, email: str, cal) -> bool:
+        """True if reads can use the mirror; otherwise start a background sync and go to Google"""
+        if await self.is_fresh(email):
+            return True
+        self.sync_soon(email, cal)
+        return False
+
+    def sync_soon(self, email: str, cal):
+        """Sync email's mirror in the background unless a sync is already running"""
+        if email in self._syncing:
+            return
+        task = asyncio.ensure_future(self._sync_quietly(email, cal))
+        self._syncing[email] = task
+        task.add_done_callback(lambda _: self._syncing.pop(email, None))
+
+    async def _sync_quietly(self, email: str, cal):
+        detach_request()
+        try:
+            await self.sync(email, cal)
+        except Exception as e:
+            logger.warning("⚠️ Event mirror sync failed for %s: %s", email, e)
+
+    async def sync(self, email: str, cal):
+        """Apply changes since the stored sync token, or resync everything"""
+        async with self._lock(email):
+            # Another request may have synced while we waited for the lock
+            if await self.is_fresh(email):
+                return
+
+            state = await self.state.find_one({'user_email': email}) or {}
+            token = state.get('sync_token')
+            if token:
+                try:
+                    await self._incremental_sync(email, cal, token)
+                    return
+                except SyncTokenExpired:
+                    logger.debug("🔄 Sync token expired for %s, doing a full resync", email)
+            await self._full_sync(email, cal)
+
+    async def _incremental_sync(self, email: str, cal, token: str):
+        changed, next_token = await cal.sync_events(token)
+        ops = []
+        for event in changed:
+            if event.get('status') == 'cancelled':
+                ops.append(DeleteOne({'user_email': email, 'event_id': event['id']}))
+            else:
+                ops.append(UpdateOne(
+                    {'user_email': email, 'event_id': event['id']},
+                    {'$set': self._doc(email, event)},
+                    upsert=True
+                ))
+        if ops:
+            await self.events.bulk_write(ops, ordered=False)
+        for index in await self._indexes_to_update(email):
+            for event in changed:
+                if event.get('status') == 'cancelled':
+                    index.remove(event['id'])
+                else:
+                    index.add(event)
+        await self._save_state(email, next_token)
+        logger.debug("🔄 Incremental sync for %s: %s changes", email, len(changed))
+
+    async def _full_sync(self, email: str, cal):
+        started = datetime.utcnow()
+        version = await self._version(email)
+        events, next_token = await cal.sync_events(None)
+        docs = [self._doc(email, e) for e in events if e.get('status') != 'cancelled']
+
+        # Upsert over the old copy, then drop what the listing no longer has, so
+        # readers never see an empty mirror and racing write-throughs survive
+        if docs:
+            await self.events.bulk_write([
+                UpdateOne({'user_email': email, 'event_id': d['event_id']}, {'$set': d}, upsert=True)
+                for d in docs
+            ], ordered=False)
+        await self.events.delete_many({
+            'user_email': email,
+            'event_id': {'$nin': [d['event_id'] for d in docs]},
+            'written_at': {'$not': {'$gte': started}}
+        })
+
+        index = await asyncio.to_thread(TitleIndex, [d['event'] for d in docs])
+        synced = await self._bump(email)
+        if synced == version + 1:
+            self._indexes[email] = (synced, index)
+        else:
+            # A write landed meanwhile; rebuild from the mirror on next use
+            self._indexes.pop(email, None)
+        # Rebuilt from the mirror on the next conflict check
+        self._intervals.pop(email, None)
+        await self._save_state(email, next_token)
+        logger.debug("🔄 Full sync for %s: %s events", email, len(docs))
+
+    async def _save_state(self, email: str, token: str):
+        await self.state.update_one(
+            {'user_email': email},
+            {'$set': {'sync_token': token, 'synced_at': datetime.utcnow(), 'dirty': False}},
+            upsert=True
+        )
+
+    async def set_watched(self, email: str, until: datetime):
+        """Record that a push channel covers email's calendar until `until` (naive UTC)"""
+        await self.state.update_one({'user_email': email}, {'$set': {'watched_until': until}}, upsert=True)
+
+    async def mark_dirty(self, email: str):
+        """Force the next read for email to sync first"""
+        await self.state.update_one({'user_email': email}, {'$set': {'dirty': True}})
+
+    def _range_cursor(self, email: str, time_min: str = None, time_max: str = None, limit: int = 0):
+        filt = {'user_email': email}
+        if time_min:
+            filt['end'] = {'$gt': parse_bound(time_min)}
+        if time_max:
+            filt['start'] = {'$lt': parse_bound(time_max)}
+
+        cursor = self.events.find(filt, {'event': 1, '_id': 0}).sort('start', ASCENDING)
+        if limit:
+            cursor = cursor.limit(limit)
+        return cursor
+
+    async def query(self, email: str, time_min: str = None, time_max: str = None, limit: int = 0) -> list:
+        """Events overlapping [time_min, time_max), ordered by start like events.list"""
+        return [doc['event'] async for doc in self._range_cursor(email, time_min, time_max, limit)]
+
+    async def iter_query(self, email: str, time_min: str = None, time_max: str = None, limit: int = 0):
+        """query() as an async generator; documents are pulled from the cursor in batches"""
+        async for doc in self._range_cursor(email, time_min, time_max, limit):
+            yield doc['event']
+
+    async def _load_index(self, cache: LRUCache, email: str, index_type):
+        """cache[email], rebuilt from the mirror when any worker has written since it was built"""
+        # Read before the events: every write counted up to here is in the listing
+        version = await self._version(email)
+        entry = cache.get(email)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+
+        cursor = self.events.find({'user_email': email}, {'event': 1, '_id': 0})
+        events = [doc['event'] async for doc in cursor]
+        index = await asyncio.to_thread(index_type, events)
+        # A write that lands mid-build moves the version on, so the next caller rebuilds
+        cache[email] = (version, index)
+        return index
+
+    async def title_index(self, email: str) -> TitleIndex:
+        """The user's TitleIndex, loaded from the mirror on first use"""
+        return await self._load_index(self._indexes, email, TitleIndex)
+
+    async def interval_index(self, email: str) -> IntervalIndex:
+        """The user's IntervalIndex, loaded from the mirror on first use"""
+        return await self._load_index(self._intervals, email, IntervalIndex)
+
+    async def upsert(self, email: str, event: dict):
+        """Write a created/updated event through to the mirror"""
+        await self.events.update_one(
+            {'user_email': email, 'event_id': event['id']},
+            {'$set': self._doc(email, event)},
+            upsert=True
+        )
+        for index in await self._indexes_to_update(email):
+            index.add(event)
+
+    async def remove(self, email: str, event_ids: list):
+        """Drop deleted events from the mirror"""
+        await self.events.delete_many({'user_email': email, 'event_id': {'$in': list(event_ids)}})
+        for index in await self._indexes_to_update(email):
+            for event_id in event_ids:
+                index.remove(event_id)
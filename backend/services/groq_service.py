@@ -1,117 +1,230 @@
-from groq import Groq
+from groq import AsyncGroq
+from collections import deque
+import asyncio
+import httpx
 import json
 import re
+import time
 from datetime import datetime, timedelta
+from functools import lru_cache
 from config import get_settings
 from utils.nlp_extractor import NLPExtractor
+from utils.intent_parser import IntentParser
+from services.intent_cache import IntentCache
+from services.metrics import phase
+import logging
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
-class GroqService:
-    def __init__(self):
-        self.client = Groq(api_key=settings.GROQ_API_KEY)
-        self.model = "llama-3.1-8b-instant"
-    
-    async def extract_intent(self, user_message: str) -> dict:
-        """Extract action, title, date, time, duration AND time_range using Groq"""
-        
-        now = datetime.now()
-        today_str = now.strftime("%Y-%m-%d")
-        today_day = now.strftime("%A")
-        tomorrow_str = (now + timedelta(days=1)).strftime("%Y-%m-%d")
+# Identical on every request, so it forms a stable, cacheable prompt prefix
+SYSTEM_PROMPT = """You are a JSON-only calendar parser. A user message holds one or more commands.
+Return {"actions": [...]} with one object per command, in the order given, each with these fields:
+- action: "create", "update", "delete", "delete_all" or "list"
+- title: the event name only, without time/date/duration/action words. null for list/delete_all or if none.
+- date: YYYY-MM-DD. Resolve "tomorrow", "next monday", "this friday", "in 3 days", "April 30" etc. with the reference dates. null if none.
+- time: start time, HH:MM 24-hour. null if none.
+- duration: minutes as an integer. null if none.
+- time_range: "this_week", "this_month", "next_week", "next_month", "next_X_days" ("next 10 days" -> "next_10_days") or null.
 
-        # Pre-compute next occurrences of each weekday
-        day_names = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-        next_days = {}
-        for i, name in enumerate(day_names):
-            days_ahead = i - now.weekday()
-            if days_ahead <= 0:
-                days_ahead += 7
-            next_days[name] = (now + timedelta(days=days_ahead)).strftime("%Y-%m-%d")
+Action words:
+- create: add, schedule, book, create, set up, remind
+- update: move, change, reschedule, update, shift
+- delete: delete, remove, cancel (single event)
+- delete_all: delete all, remove all, cancel all, clear all
+- list: list, show, display, what, view
 
-        next_week_dates = "\n".join(f"  next {name} = {date}" for name, date in next_days.items())
-
-        prompt = f"""You are a calendar assistant. Today is {today_day}, {today_str}.
-
-Reference dates:
-  today = {today_str}
-  tomorrow = {tomorrow_str}
-{next_week_dates}
-
-User message: "{user_message}"
-
-Extract ALL of the following fields from the message:
-- action: one of "create", "update", "delete", "delete_all", "list"
-- title: the event name only (no time/date/duration/action words). null if none.
-- date: event date in YYYY-MM-DD format. Resolve relative expressions using the reference dates above. null if no date mentioned.
-- time: event start time in HH:MM 24-hour format. null if no time mentioned.
-- duration: event duration in minutes as an integer. null if no duration mentioned.
-- time_range: one of "this_week", "this_month", "next_week", "next_month", "next_X_days" (e.g. "next_7_days"), or null
+Examples:
+"list my events this week" -> {"actions":[{"action":"list","title":null,"date":null,"time":null,"duration":null,"time_range":"this_week"}]}
+"show schedules next 10 days" -> {"actions":[{"action":"list","title":null,"date":null,"time":null,"duration":null,"time_range":"next_10_days"}]}
+"delete all events this month" -> {"actions":[{"action":"delete_all","title":null,"date":null,"time":null,"duration":null,"time_range":"this_month"}]}
+"delete all events" -> {"actions":[{"action":"delete_all","title":null,"date":null,"time":null,"duration":null,"time_range":null}]}
+"add meeting at 10am" -> {"actions":[{"action":"create","title":"meeting","date":null,"time":"10:00","duration":null,"time_range":null}]}
+"schedule 30 min sometime next week" -> {"actions":[{"action":"create","title":null,"date":null,"time":null,"duration":30,"time_range":"next_week"}]}
+"delete pwc" -> {"actions":[{"action":"delete","title":"pwc","date":null,"time":null,"duration":null,"time_range":null}]}
+"delete pwc and list next week" -> {"actions":[{"action":"delete","title":"pwc","date":null,"time":null,"duration":null,"time_range":null},{"action":"list","title":null,"date":null,"time":null,"duration":null,"time_range":"next_week"}]}
 
-RULES:
-- action "create": triggered by add, schedule, book, create, set up, remind
-- action "update": triggered by move, change, reschedule, update, shift
-- action "delete": triggered by delete, remove, cancel (single event)
-- action "delete_all": triggered by "delete all", "remove all", "cancel all", "clear all"
-- action "list": triggered by list, show, display, what, view
-- title: remove time, date, action words. Keep only the event name. null for list/delete_all.
-- Resolve "next monday", "this friday", "next week", "in 3 days", "April 30" etc. using the reference dates.
-- time_range: detect phrases like "this week", "this month", "next 10 days"
+Respond ONLY with the JSON object, no explanation."""
 
-TIME RANGE DETECTION:
-- "this week" -> "this_week"
-- "this month" -> "this_month"
-- "next week" -> "next_week"
-- "next month" -> "next_month"
-- "next 7 days", "next 10 days" -> "next_7_days", "next_10_days"
+WEEKDAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
 
-Examples:
-"list my events this week" -> {{"action":"list","title":null,"date":null,"time":null,"duration":null,"time_range":"this_week"}}
-"show schedules next 10 days" -> {{"action":"list","title":null,"date":null,"time":null,"duration":null,"time_range":"next_10_days"}}
-"delete all events this month" -> {{"action":"delete_all","title":null,"date":null,"time":null,"duration":null,"time_range":"this_month"}}
-"delete all events" -> {{"action":"delete_all","title":null,"date":null,"time":null,"duration":null,"time_range":null}}
-"add meeting tomorrow at 10am" -> {{"action":"create","title":"meeting","date":"{tomorrow_str}","time":"10:00","duration":null,"time_range":null}}
-"delete pwc" -> {{"action":"delete","title":"pwc","date":null,"time":null,"duration":null,"time_range":null}}
+@lru_cache(maxsize=4)
+def date_reference(day: str) -> str:
+    """Reference-date block for day (YYYY-MM-DD); built once per day"""
+    now = datetime.strptime(day, "%Y-%m-%d")
+    lines = [
+        f"Today is {now.strftime('%A')}, {day}.",
+        f"today = {day}",
+        f"tomorrow = {(now + timedelta(days=1)).strftime('%Y-%m-%d')}"
+    ]
+    # Next occurrence of each weekday
+    for i, name in enumerate(WEEKDAY_NAMES):
+        days_ahead = i - now.weekday()
+        if days_ahead <= 0:
+            days_ahead += 7
+        lines.append(f"next {name} = {(now + timedelta(days=days_ahead)).strftime('%Y-%m-%d')}")
+    return "\n".join(lines)
 
-Respond ONLY with valid JSON, no explanation."""
+def prompt_messages(user_message: str) -> list:
+    """Chat messages for one extraction: static system prefix, then today's dates and the user text"""
+    day = datetime.now().strftime("%Y-%m-%d")
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"{date_reference(day)}\n\nUser message: \"{user_message}\""}
+    ]
 
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a JSON-only calendar parser. Return only valid JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.1,
-                max_tokens=200
+class GroqService:
+    def __init__(self):
+        # One pooled connection set for every completion; retries are replaced by hedging
+        self.client = AsyncGroq(
+            api_key=settings.GROQ_API_KEY,
+            base_url=settings.GROQ_BASE_URL or None,
+            max_retries=0,
+            http_client=httpx.AsyncClient(
+                timeout=settings.GROQ_TIMEOUT_SECONDS,
+                limits=httpx.Limits(max_connections=50, max_keepalive_connections=20)
             )
+        )
+        self.model = "llama-3.1-8b-instant"
+        # Recent completion latencies (seconds), used to pick the hedge delay
+        self.latencies = deque(maxlen=200)
+        self.cache = IntentCache(settings.INTENT_CACHE_SIZE, settings.INTENT_CACHE_TTL_SECONDS)
+    
+    async def extract_intent(self, user_message: str) -> dict:
+        """First intent of user_message (see extract_intents)"""
+        return (await self.extract_intents(user_message))[0]
+    
+    async def extract_intents(self, user_message: str) -> list:
+        """
+        Extract action, title, date, time, duration AND time_range for every
+        command in the message, in the order given
+        
+        Unambiguous commands are answered by the local IntentParser; Groq is
+        only called when its confidence is below LOCAL_INTENT_THRESHOLD, and
+        then once for the whole message. Each intent's 'source' says which
+        path answered. Results are cached per normalized message and day;
+        fallback parses are not.
+        """
+        cached = self.cache.get(user_message)
+        if cached is not None:
+            logger.debug("💾 Cached intents: %s", cached)
+            return [{**intent, "source": "cache"} for intent in cached]
+        
+        with phase("local_parse"):
+            local, confidence = IntentParser.parse_all(user_message)
+        if confidence >= settings.LOCAL_INTENT_THRESHOLD:
+            logger.debug("⚡ Local parse (%.2f): %s", confidence, local)
+            intents = [{**intent, "source": "local", "confidence": confidence} for intent in local]
+        else:
+            intents = await self._extract_with_groq(user_message)
+        
+        if intents[0].get("source") != "fallback":
+            self.cache.put(user_message, intents)
+        return intents
+    
+    async def _extract_with_groq(self, user_message: str) -> list:
+        """Extract the intents with one Groq completion"""
+        try:
+            with phase("llm"):
+                response = await asyncio.wait_for(
+                    self._complete_hedged(prompt_messages(user_message)),
+                    timeout=settings.GROQ_TIMEOUT_SECONDS
+                )
             
             text = response.choices[0].message.content.strip()
-            print(f"🤖 Groq response: {text}")
-            
-            # Clean and parse JSON
-            text = re.sub(r'```(?:json)?|```', '', text).strip()
-            match = re.search(r'\{.*\}', text, re.DOTALL)
-            if match:
-                text = match.group(0)
-            
-            parsed = json.loads(text)
+            logger.debug("🤖 Groq response: %s", text)
+            intents = self.parse_completion(text)
+            logger.debug("✅ Parsed: %s", intents)
+            return [{**intent, "source": "groq"} for intent in intents]
             
+        except asyncio.TimeoutError:
+            logger.warning("⏱️ Groq timed out after %ss, using fallback parser", settings.GROQ_TIMEOUT_SECONDS)
+        except Exception as e:
+            logger.warning("❌ Groq error: %s", e)
+        
+        with phase("fallback"):
+            return [{**self._fallback(user_message), "source": "fallback"}]
+    
+    @staticmethod
+    def parse_completion(text: str) -> list:
+        """Intent dicts from a completion's text ({"actions": [...]} or a bare intent)"""
+        # Clean and parse JSON
+        text = re.sub(r'```(?:json)?|```', '', text).strip()
+        match = re.search(r'[\[{].*[\]}]', text, re.DOTALL)
+        if match:
+            text = match.group(0)
+        
+        parsed = json.loads(text)
+        if isinstance(parsed, dict):
+            parsed = parsed.get('actions', [parsed])
+        if not parsed:
+            raise ValueError("completion has no actions")
+        
+        intents = []
+        for intent in parsed:
             # Clean title
-            if parsed.get('title'):
-                parsed['title'] = parsed['title'].strip('"\'')
+            if intent.get('title'):
+                intent['title'] = intent['title'].strip('"\'')
             
             # Normalize null-like values
             for field in ('date', 'time', 'duration', 'time_range', 'title'):
-                if parsed.get(field) in ('null', '', 'none', 'None', 'N/A'):
-                    parsed[field] = None
-
-            print(f"✅ Parsed: {parsed}")
-            return parsed
+                if intent.get(field) in ('null', '', 'none', 'None', 'N/A'):
+                    intent[field] = None
+            intents.append(intent)
+        return intents
+    
+    async def _complete(self, messages: list):
+        """One chat completion, recording its latency"""
+        start = time.perf_counter()
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=0.1,
+            max_tokens=200
+        )
+        self.latencies.append(time.perf_counter() - start)
+        return response
+    
+    def hedge_delay(self) -> float:
+        """p95 of recent completion latencies, or None until there are enough samples"""
+        if len(self.latencies) < settings.GROQ_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+    
+    async def _complete_hedged(self, messages: list):
+        """
+        Completion with an optional hedge: if the first request hasn't answered
+        by the p95 latency, send a second and take whichever returns first
+        """
+        delay = self.hedge_delay()
+        if not settings.GROQ_HEDGE_ENABLED or delay is None:
+            return await self._complete(messages)
+        
+        first = asyncio.create_task(self._complete(messages))
+        pending = {first}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                logger.debug("🔀 Groq slower than p95 (%.2fs), sending hedge request", delay)
+                pending.add(asyncio.create_task(self._complete(messages)))
             
-        except Exception as e:
-            print(f"❌ Groq error: {e}")
-            return self._fallback(user_message)
+            error = None
+            while done or pending:
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    async def close(self):
+        await self.client.close()
     
     def _fallback(self, msg: str) -> dict:
         """Fallback parser with time range detection"""
@@ -148,21 +261,7 @@ Respond ONLY with valid JSON, no explanation."""
     
     def _extract_time_range(self, text: str) -> str:
         """Extract time range from text"""
-        if "this week" in text:
-            return "this_week"
-        elif "this month" in text:
-            return "this_month"
-        elif "next week" in text:
-            return "next_week"
-        elif "next month" in text:
-            return "next_month"
-        
-        # Check for "next X days"
-        match = re.search(r'next\s+(\d+)\s+days?', text)
-        if match:
-            return f"next_{match.group(1)}_days"
-        
-        return None
+        return IntentParser.extract_time_range(text)
     
     def _extract_title(self, msg: str) -> str:
         """Extract title from message"""
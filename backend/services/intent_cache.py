@@ -0,0 +1,76 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import re
+import time
+
+_SPACES = re.compile(r'\s+')
+
+def normalize_message(message: str) -> str:
+    """Case-fold, collapse whitespace and drop trailing punctuation"""
+    return _SPACES.sub(' ', message.casefold()).strip().rstrip('.!?').strip()
+
+def _seconds_until_midnight() -> float:
+    now = datetime.now()
+    midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (midnight - now).total_seconds()
+
+class IntentCache:
+    """
+    Bounded LRU cache of parsed intents with a TTL.
+
+    Each entry is the list of intents one message parsed into. Keys are
+    the normalized message plus today's date, since relative dates
+    ("tomorrow", "next friday") resolve against it. Entries also expire at
+    local midnight, so nothing parsed yesterday is served today.
+    """
+    def __init__(self, maxsize: int = 1024, ttl: int = 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _key(self, message: str) -> tuple:
+        return normalize_message(message), datetime.now().strftime("%Y-%m-%d")
+
+    def get(self, message: str):
+        key = self._key(message)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        intents = [dict(intent) for intent in entry[1]]
+
+        # Same phrasing, different capitalisation: keep this message's title casing
+        for intent in intents:
+            title = intent.get('title')
+            if title:
+                pos = message.lower().find(title.lower())
+                if pos >= 0:
+                    intent['title'] = message[pos:pos + len(title)]
+        return intents
+
+    def put(self, message: str, intents: list):
+        key = self._key(message)
+        expires = time.monotonic() + min(self.ttl, _seconds_until_midnight())
+        self._entries[key] = (expires, tuple(dict(intent) for intent in intents))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
@@ -0,0 +1,88 @@
+from prometheus_client import Histogram, Counter, generate_latest, CONTENT_TYPE_LATEST
+from contextlib import contextmanager
+from contextvars import ContextVar
+import time
+
+# Seconds; phases range from sub-millisecond parsing to multi-second Calendar calls
+BUCKETS = (.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+
+PHASE_SECONDS = Histogram(
+    'calpal_phase_seconds',
+    'Time spent in one phase of a chat request',
+    ['phase'],
+    buckets=BUCKETS
+)
+REQUEST_SECONDS = Histogram(
+    'calpal_request_seconds',
+    'End-to-end /chat/message latency',
+    ['action', 'parser'],
+    buckets=BUCKETS
+)
+CALENDAR_CALLS = Counter(
+    'calpal_calendar_calls_total',
+    'Calendar API HTTP requests by method and status code',
+    ['method', 'status']
+)
+TOKEN_REFRESHES = Counter(
+    'calpal_token_refreshes_total',
+    'OAuth access-token refreshes by outcome (refreshed, adopted, failed)',
+    ['outcome']
+)
+HISTORY_TURNS = Counter(
+    'calpal_chat_history_turns_total',
+    'Chat turns handed to the history writer, by outcome (written, dropped, failed)',
+    ['outcome']
+)
+
+# Per-request phase totals; None outside a request
+_phases: ContextVar[dict] = ContextVar('calpal_phases', default=None)
+
+def start_request() -> dict:
+    """Begin collecting phase timings for the current request; returns the totals dict"""
+    phases = {}
+    _phases.set(phases)
+    return phases
+
+def detach_request():
+    """
+    Stop adding phase timings to the request the current task was started from
+
+    Tasks copy the context they are created in, so a background task started
+    during a request would otherwise add its own Calendar and token time to
+    that request's totals.
+    """
+    _phases.set(None)
+
+@contextmanager
+def phase(name: str):
+    """
+    Time a block as one span of the named phase
+
+    Every span is observed in calpal_phase_seconds and added to the current
+    request's totals, so a phase entered several times (Calendar calls) sums up.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        PHASE_SECONDS.labels(name).observe(elapsed)
+        phases = _phases.get()
+        if phases is not None:
+            phases[name] = phases.get(name, 0.0) + elapsed
+
+def observe_request(action: str, parser: str, seconds: float):
+    REQUEST_SECONDS.labels(action or 'unknown', parser or 'none').observe(seconds)
+
+def count_calendar_call(method: str, status: int):
+    CALENDAR_CALLS.labels(method, str(status)).inc()
+
+def count_history_write(outcome: str, turns: int = 1):
+    HISTORY_TURNS.labels(outcome).inc(turns)
+
+def count_token_refresh(outcome: str):
+    TOKEN_REFRESHES.labels(outcome).inc()
+
+def render() -> tuple:
+    """Prometheus exposition body and its content type"""
+    return generate_latest(), CONTENT_TYPE_LATEST
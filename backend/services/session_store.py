@@ -0,0 +1,82 @@
+from cachetools import TTLCache
+from config import get_settings
+from typing import Optional
+
+settings = get_settings()
+
+class SessionStore:
+    """
+    Per-user conversation state for follow-ups, keyed by email.
+
+    Holds the events of the last list reply (in the order shown) and the
+    event last matched, created or updated. "delete the third one" or
+    "move it to 5pm" resolve against this instead of listing and
+    fuzzy-matching again. Sessions are LRU-evicted past SESSION_STORE_SIZE
+    users and expire SESSION_TTL_SECONDS after their last write.
+    """
+    def __init__(self, maxsize: int = None, ttl: int = None):
+        self._sessions = TTLCache(
+            maxsize=maxsize or settings.SESSION_STORE_SIZE,
+            ttl=ttl or settings.SESSION_TTL_SECONDS
+        )
+
+    def _session(self, email: str) -> dict:
+        session = self._sessions.get(email)
+        if session is None:
+            session = {'events': [], 'deleted': set(), 'focus': None}
+        # Re-set on every write so the TTL counts from the latest turn
+        self._sessions[email] = session
+        return session
+
+    def get(self, email: str) -> Optional[dict]:
+        return self._sessions.get(email)
+
+    def remember_list(self, email: str, events: list):
+        session = self._session(email)
+        session['events'] = list(events)
+        session['deleted'] = set()
+        session['focus'] = events[0] if len(events) == 1 else None
+
+    def remember_event(self, email: str, event: dict):
+        """The event just matched, created or updated; it becomes 'it'"""
+        session = self._session(email)
+        session['focus'] = event
+        # Keep the listed copy current so a later ordinal sees the new times
+        session['events'] = [event if e['id'] == event['id'] else e for e in session['events']]
+
+    def forget_events(self, email: str, event_ids: list = None):
+        """Drop deleted events; positions in the last list stay as they were shown"""
+        session = self._sessions.get(email)
+        if session is None:
+            return
+        if event_ids is None:
+            session['events'], session['deleted'], session['focus'] = [], set(), None
+            return
+        session['deleted'].update(event_ids)
+        if session['focus'] and session['focus']['id'] in session['deleted']:
+            session['focus'] = None
+
+    def resolve(self, email: str, ref) -> tuple:
+        """
+        (event, None) for a reference from IntentParser.extract_reference,
+        or (None, reason) when the session can't answer it
+        """
+        session = self._sessions.get(email)
+        if ref == 'it':
+            if session and session['focus']:
+                return session['focus'], None
+            return None, "I'm not sure which event you mean"
+        if not session or not session['events']:
+            return None, "There's no recent list to pick from"
+
+        events = session['events']
+        if ref == -1:
+            ref = len(events)
+        if not 1 <= ref <= len(events):
+            return None, f"The last list only had {len(events)} event{'s' if len(events) != 1 else ''}"
+        event = events[ref - 1]
+        if event['id'] in session['deleted']:
+            return None, f"'{event.get('summary', 'Untitled')}' was already deleted"
+        return event, None
+
+session_store = SessionStore()
@@ -0,0 +1,35 @@
+from cachetools import TTLCache
+from db import get_db
+from config import get_settings
+
+settings = get_settings()
+
+# Only what the chat path reads from a user document
+USER_PROJECTION = {'_id': 0, 'email': 1, 'credentials': 1}
+
+class UserCache:
+    """
+    Short-TTL in-process cache of user credentials keyed by email.
+
+    The OAuth callback invalidates an entry when it stores new credentials,
+    so active users cost one Mongo read per TTL instead of one per message.
+    """
+    def __init__(self, maxsize: int = None, ttl: int = None):
+        self._users = TTLCache(
+            maxsize=maxsize or settings.USER_CACHE_SIZE,
+            ttl=ttl or settings.USER_CACHE_TTL_SECONDS
+        )
+
+    async def get(self, email: str) -> dict:
+        """User document (email + credentials) or None"""
+        user = self._users.get(email)
+        if user is None:
+            user = await get_db()['users'].find_one({'email': email}, USER_PROJECTION)
+            if user:
+                self._users[email] = user
+        return user
+
+    def invalidate(self, email: str):
+        self._users.pop(email, None)
+
+user_cache = UserCache()
@@ -0,0 +1,219 @@
+from db import get_db
+from config import get_settings
+from services.calendar_pool import calendar_pool
+from services.user_cache import user_cache
+from services.metrics import detach_request
+from datetime import datetime, timedelta
+import asyncio
+import hmac
+import logging
+import secrets
+import uuid
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# How long one process holds a channel while renewing it, so workers don't renew twice
+RENEW_LEASE_SECONDS = 120
+
+class WatchService:
+    """
+    Calendar push channels (events.watch) that keep cached events current.
+
+    A user gets a channel the first time a calendar client is built for them.
+    Google then POSTs to /webhooks/calendar on every change, and
+    handle_notification marks the user's mirror dirty, drops the client's
+    conflict window and starts one incremental sync (coalescing bursts), so
+    the mirror can trust itself for EVENT_MIRROR_WATCHED_TTL_SECONDS instead
+    of re-syncing every EVENT_MIRROR_TTL_SECONDS. Channels live in the
+    watch_channels collection; a background loop renews each one
+    WATCH_RENEW_BEFORE_SECONDS before it expires.
+    """
+    def __init__(self, db=None):
+        self._db = db
+        self._task = None
+        self._watching = {}      # email -> expiration, for users known to have a live channel
+        self._starting = {}      # email -> task opening their channel
+        self._syncing = {}       # email -> running sync task
+        self._resync = set()     # emails notified again while their sync ran
+
+    @property
+    def enabled(self) -> bool:
+        return bool(settings.WEBHOOK_BASE_URL)
+
+    @property
+    def channels(self):
+        if self._db is None:
+            self._db = get_db()
+        return self._db['watch_channels']
+
+    @property
+    def address(self) -> str:
+        return settings.WEBHOOK_BASE_URL.rstrip('/') + '/webhooks/calendar'
+
+    def start(self):
+        """Start the renewal loop and watch users as they become active (FastAPI lifespan)"""
+        if self.enabled and self._task is None:
+            calendar_pool.on_new_client = self.watch_soon
+            self._task = asyncio.create_task(self._renew_loop())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        calendar_pool.on_new_client = None
+        tasks = [self._task, *self._starting.values(), *self._syncing.values()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+
+    def watch_soon(self, email: str, cal):
+        """Make sure email has a live channel, in the background"""
+        expiration = self._watching.get(email)
+        if expiration and expiration > datetime.utcnow() or email in self._starting:
+            return
+        task = asyncio.ensure_future(self.ensure_channel(email, cal))
+        self._starting[email] = task
+        task.add_done_callback(lambda _: self._starting.pop(email, None))
+
+    async def ensure_channel(self, email: str, cal):
+        detach_request()
+        try:
+            now = datetime.utcnow()
+            renew_after = now + timedelta(seconds=settings.WATCH_RENEW_BEFORE_SECONDS)
+            live = await self.channels.find_one(
+                {'user_email': email, 'expiration': {'$gt': now}},
+                sort=[('expiration', -1)]
+            )
+            if live and live['expiration'] > renew_after:
+                self._watching[email] = live['expiration']
+                return
+            if live:
+                # Expiring soon: replace it, unless another worker is already doing so
+                if await self._claim(live, now):
+                    await self.open_channel(email, cal, replaces=live)
+                return
+            await self.open_channel(email, cal)
+        except Exception as e:
+            logger.warning("⚠️ Couldn't watch calendar for %s: %s", email, e)
+
+    async def _claim(self, channel: dict, now: datetime) -> bool:
+        """Lease channel for renewal; False if another worker holds it"""
+        claimed = await self.channels.update_one(
+            {'channel_id': channel['channel_id'], '$or': [{'lease': {'$lt': now}}, {'lease': None}]},
+            {'$set': {'lease': now + timedelta(seconds=RENEW_LEASE_SECONDS)}}
+        )
+        return bool(claimed.modified_count)
+
+    async def open_channel(self, email: str, cal, replaces: dict = None):
+        """Open a new channel for email, then stop the one it replaces"""
+        channel_id, token = str(uuid.uuid4()), secrets.token_urlsafe(24)
+        channel = await cal.watch(channel_id, self.address, token, settings.WATCH_TTL_SECONDS)
+        # Google reports expiration in epoch milliseconds
+        expiration = datetime.utcfromtimestamp(int(channel['expiration']) / 1000)
+        doc = {
+            'channel_id': channel_id,
+            'user_email': email,
+            'resource_id': channel['resourceId'],
+            'token': token,
+            'expiration': expiration,
+            'created_at': datetime.utcnow()
+        }
+        if replaces:
+            # Swap the old document for the new one in a single write
+            await self.channels.replace_one({'channel_id': replaces['channel_id']}, doc, upsert=True)
+        else:
+            await self.channels.insert_one(doc)
+        self._watching[email] = expiration
+        if cal.mirror is not None:
+            await cal.mirror.set_watched(email, expiration)
+        logger.debug("👀 Watching %s until %s (channel %s)", email, expiration, channel_id)
+
+        if replaces:
+            try:
+                await cal.stop_channel(replaces['channel_id'], replaces['resource_id'])
+            except Exception as e:
+                # It expires on its own; notifications for it are ignored meanwhile
+                logger.debug("Stopping channel %s failed: %s", replaces['channel_id'], e)
+
+    async def _renew_loop(self):
+        while True:
+            try:
+                await self.renew_expiring()
+            except Exception as e:
+                logger.warning("⚠️ Channel renewal pass failed: %s", e)
+            await asyncio.sleep(settings.WATCH_CHECK_SECONDS)
+
+    async def renew_expiring(self):
+        """Replace every channel that expires within WATCH_RENEW_BEFORE_SECONDS"""
+        now = datetime.utcnow()
+        threshold = now + timedelta(seconds=settings.WATCH_RENEW_BEFORE_SECONDS)
+        async for channel in self.channels.find({'expiration': {'$lt': threshold}}):
+            if channel['expiration'] <= now:
+                # Already dead (say, renewals kept failing); the user's next visit opens a new one
+                await self.channels.delete_one({'channel_id': channel['channel_id']})
+                continue
+            # Claim it first; another worker may be renewing the same channel
+            if not await self._claim(channel, now):
+                continue
+            email = channel['user_email']
+            user = await user_cache.get(email)
+            if not user:
+                await self.channels.delete_one({'channel_id': channel['channel_id']})
+                continue
+            try:
+                await self.open_channel(email, calendar_pool.get(email, user['credentials']), replaces=channel)
+            except Exception as e:
+                logger.warning("⚠️ Renewing channel for %s failed: %s", email, e)
+
+    async def handle_notification(self, channel_id: str, token: str, state: str) -> bool:
+        """
+        Act on one push notification; False if the token doesn't match
+        (the caller answers 403)
+        """
+        # 'sync' only confirms a new channel, and may beat our insert of it
+        if state == 'sync':
+            return True
+        channel = await self.channels.find_one({'channel_id': channel_id})
+        if not channel:
+            # A replaced channel Google hasn't stopped yet; a 2xx keeps it from retrying
+            logger.debug("Push for unknown channel %s ignored", channel_id)
+            return True
+        if not hmac.compare_digest(channel['token'], token or ''):
+            return False
+
+        email = channel['user_email']
+        cal = calendar_pool.peek(email)
+        if cal is not None:
+            cal.invalidate_window()
+        mirror = cal.mirror if cal is not None else calendar_pool.client_kwargs.get('mirror')
+        if mirror is None:
+            return True
+        await mirror.mark_dirty(email)
+
+        if email in self._syncing:
+            # A change landed mid-sync; run once more when it finishes
+            self._resync.add(email)
+        else:
+            task = asyncio.ensure_future(self._sync(email, mirror))
+            self._syncing[email] = task
+            task.add_done_callback(lambda _: self._syncing.pop(email, None))
+        return True
+
+    async def _sync(self, email: str, mirror):
+        """Pull the changes behind a notification now, so the next read is already fresh"""
+        detach_request()
+        try:
+            while True:
+                self._resync.discard(email)
+                user = await user_cache.get(email)
+                if not user:
+                    return
+                await mirror.sync(email, calendar_pool.get(email, user['credentials']))
+                if email not in self._resync:
+                    return
+                await mirror.mark_dirty(email)
+        except Exception as e:
+            logger.warning("⚠️ Push-triggered sync for %s failed: %s", email, e)
+
+watch_service = WatchService()
@@ -0,0 +1,29 @@
+from config import get_settings
+from utils.intent_parser import IntentParser
+
+THRESHOLD = get_settings().LOCAL_INTENT_THRESHOLD
+
+def test_range_without_start_meridiem_goes_to_llm():
+    intent, confidence = IntentParser.parse("add gym session today from 5 to 6:30 PM")
+    assert confidence < THRESHOLD
+
+def test_range_with_start_meridiem_stays_local():
+    intent, confidence = IntentParser.parse("add gym from 5pm to 6:30pm")
+    assert confidence >= THRESHOLD
+    assert intent["time"] == "17:00"
+    assert intent["duration"] == 90
+
+def test_relative_offset_goes_to_llm():
+    for msg in ("add review in 2 hours", "add lunch in 30 minutes", "add call in an hour"):
+        intent, confidence = IntentParser.parse(msg)
+        assert confidence < THRESHOLD, msg
+
+def test_unresolved_ordinal_goes_to_llm():
+    intent, confidence = IntentParser.parse("add doctor appointment on 3rd at 5pm")
+    assert intent["date"] is None
+    assert confidence < THRESHOLD
+
+def test_resolved_ordinal_stays_local():
+    intent, confidence = IntentParser.parse("add dentist on 3rd march at 5pm")
+    assert intent["date"] is not None
+    assert confidence >= THRESHOLD
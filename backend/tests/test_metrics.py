@@ -0,0 +1,25 @@
+import asyncio
+from mongomock_motor import AsyncMongoMockClient
+from services.event_mirror import EventMirror
+from services.metrics import start_request, phase
+
+class SlowCalendar:
+    """Calendar client whose listing takes a while, timed as a Calendar call"""
+    async def sync_events(self, token):
+        with phase("calendar"):
+            await asyncio.sleep(0.05)
+        return [], 'token'
+
+def test_background_sync_leaves_request_phases_alone():
+    async def request():
+        phases = start_request()
+        mirror = EventMirror(AsyncMongoMockClient()['calpal'])
+        mirror.sync_soon('user@example.com', SlowCalendar())
+        with phase("intent"):
+            pass
+        await asyncio.gather(*mirror._syncing.values())
+        return phases
+
+    phases = asyncio.run(request())
+    assert 'intent' in phases
+    assert 'calendar' not in phases
@@ -1,9 +1,21 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import re
+import pytz
 
 class DateParser:
     """Advanced date/time parser"""
     
+    @staticmethod
+    def event_bounds(event: dict, tz=pytz.timezone('Asia/Kolkata')) -> tuple:
+        """(start, end) of a calendar event as UTC datetimes; all-day events span whole days in tz"""
+        def parse(point: dict) -> datetime:
+            if point.get('dateTime'):
+                return datetime.fromisoformat(point['dateTime'].replace('Z', '+00:00')).astimezone(timezone.utc)
+            day = datetime.strptime(point['date'], "%Y-%m-%d")
+            return tz.localize(day).astimezone(timezone.utc)
+        
+        return parse(event['start']), parse(event['end'])
+    
     @staticmethod
     def parse_relative(date_str: str) -> datetime:
         """Parse relative dates like 'today', 'tomorrow', 'next monday'"""
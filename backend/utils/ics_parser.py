@@ -0,0 +1,162 @@
+import re
+import hashlib
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, Optional
+import pytz
+
+IST = pytz.timezone('Asia/Kolkata')
+
+DURATION = re.compile(r'^([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$')
+ESCAPES = re.compile(r'\\([\\;,nN])')
+
+def unescape(text: str) -> str:
+    """Undo RFC 5545 TEXT escaping"""
+    return ESCAPES.sub(lambda m: '\n' if m.group(1) in 'nN' else m.group(1), text)
+
+def parse_duration(value: str) -> Optional[timedelta]:
+    m = DURATION.match(value.strip())
+    if not m:
+        return None
+    weeks, days, hours, minutes, seconds = (int(g or 0) for g in m.groups()[1:])
+    delta = timedelta(weeks=weeks, days=days, hours=hours, minutes=minutes, seconds=seconds)
+    return -delta if m.group(1) == '-' else delta
+
+def parse_datetime(value: str, params: Dict[str, str]):
+    """
+    DTSTART/DTEND value -> (aware datetime, False) or (date, True) for all-day
+
+    UTC ('Z'), TZID-qualified and floating times are supported; floating
+    times and unknown TZIDs are taken as Asia/Kolkata like the rest of calPal.
+    """
+    value = value.strip()
+    if params.get('VALUE') == 'DATE' or len(value) == 8:
+        return datetime.strptime(value[:8], "%Y%m%d").date(), True
+
+    naive = datetime.strptime(value.rstrip('Z')[:15], "%Y%m%dT%H%M%S")
+    if value.endswith('Z'):
+        return pytz.utc.localize(naive), False
+    try:
+        tz = pytz.timezone(params['TZID'].strip('"')) if 'TZID' in params else IST
+    except pytz.UnknownTimeZoneError:
+        tz = IST
+    return tz.localize(naive), False
+
+class ICSParser:
+    """
+    Incremental iCalendar reader.
+
+    feed() takes text chunks of any size and yields each top-level VEVENT
+    as soon as its END:VEVENT line arrives, so a file is never held in
+    memory whole. Folded lines are unfolded; components nested in a VEVENT
+    (VALARM) are skipped. Each VEVENT comes out as
+    {NAME: (value, {PARAM: value})}, keeping the first occurrence of a name.
+    """
+    def __init__(self):
+        self._buffer = ''
+        self._line = None        # logical line being unfolded
+        self._depth = 0          # nesting inside the current VEVENT
+        self._event = None
+
+    def feed(self, chunk: str) -> Iterator[Dict]:
+        self._buffer += chunk
+        *lines, self._buffer = self._buffer.split('\n')
+        for raw in lines:
+            yield from self._physical(raw.rstrip('\r'))
+
+    def close(self) -> Iterator[Dict]:
+        """Flush whatever is left after the last chunk"""
+        if self._buffer:
+            yield from self._physical(self._buffer.rstrip('\r'))
+            self._buffer = ''
+        if self._line is not None:
+            line, self._line = self._line, None
+            yield from self._logical(line)
+
+    def _physical(self, raw: str) -> Iterator[Dict]:
+        # A line starting with a space or tab continues the previous one
+        if raw[:1] in (' ', '\t') and self._line is not None:
+            self._line += raw[1:]
+            return
+        if self._line is not None:
+            yield from self._logical(self._line)
+        self._line = raw
+
+    def _logical(self, line: str) -> Iterator[Dict]:
+        if not line:
+            return
+        name_part, sep, value = line.partition(':')
+        if not sep:
+            return
+        name, *raw_params = name_part.split(';')
+        name = name.upper()
+
+        if name == 'BEGIN':
+            if value.upper() == 'VEVENT' and self._event is None:
+                self._event, self._depth = {}, 0
+            elif self._event is not None:
+                self._depth += 1
+            return
+        if name == 'END':
+            if self._event is not None:
+                if self._depth:
+                    self._depth -= 1
+                elif value.upper() == 'VEVENT':
+                    event, self._event = self._event, None
+                    yield event
+            return
+
+        if self._event is not None and not self._depth and name not in self._event:
+            params = {}
+            for p in raw_params:
+                key, _, val = p.partition('=')
+                params[key.upper()] = val
+            self._event[name] = (value, params)
+
+def event_uid(vevent: Dict) -> str:
+    """The VEVENT's UID, or a stable one derived from its summary and start"""
+    if 'UID' in vevent:
+        return vevent['UID'][0].strip()
+    key = f"{vevent.get('SUMMARY', ('',))[0]}|{vevent.get('DTSTART', ('',))[0]}"
+    return hashlib.sha1(key.encode()).hexdigest() + '@calpal'
+
+def vevent_to_body(vevent: Dict, cal) -> Dict:
+    """
+    Calendar event resource for a parsed VEVENT
+
+    Timed events get the body cal.build_event_body (create_event's builder)
+    produces, in Asia/Kolkata; all-day events use start/end dates. iCalUID
+    makes events.import idempotent, so importing a file twice doesn't
+    duplicate anything. Raises ValueError for an unusable VEVENT.
+    """
+    if 'DTSTART' not in vevent:
+        raise ValueError("VEVENT has no DTSTART")
+    title = unescape(vevent.get('SUMMARY', ('Event',))[0]).strip() or 'Event'
+    start, all_day = parse_datetime(*vevent['DTSTART'])
+
+    if 'DTEND' in vevent:
+        end, _ = parse_datetime(*vevent['DTEND'])
+    elif 'DURATION' in vevent and parse_duration(vevent['DURATION'][0]) is not None:
+        end = start + parse_duration(vevent['DURATION'][0])
+    else:
+        end = start + (timedelta(days=1) if all_day else timedelta(hours=1))
+
+    if all_day:
+        if end <= start:
+            end = start + timedelta(days=1)
+        body = {
+            'summary': title,
+            'start': {'date': start.isoformat()},
+            'end': {'date': end.isoformat()}
+        }
+    else:
+        local = start.astimezone(IST)
+        minutes = max(1, int((end - start).total_seconds() // 60))
+        body = cal.build_event_body(title, local.strftime("%Y-%m-%d"), local.strftime("%H:%M"), minutes)
+
+    body['iCalUID'] = event_uid(vevent)
+    for name, field in (('DESCRIPTION', 'description'), ('LOCATION', 'location')):
+        if name in vevent:
+            body[field] = unescape(vevent[name][0])
+    if 'RRULE' in vevent:
+        body['recurrence'] = [f"RRULE:{vevent['RRULE'][0]}"]
+    return body
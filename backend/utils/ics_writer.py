@@ -0,0 +1,78 @@
+from datetime import datetime, timezone
+from typing import Dict, List
+import pytz
+
+IST = pytz.timezone('Asia/Kolkata')
+
+CALENDAR_HEADER = "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//calPal//Export//EN\r\nCALSCALE:GREGORIAN\r\n"
+CALENDAR_FOOTER = "END:VCALENDAR\r\n"
+
+CSV_COLUMNS = ['uid', 'summary', 'start', 'end', 'all_day', 'location', 'description']
+
+def escape(text: str) -> str:
+    """RFC 5545 TEXT escaping (the inverse of ics_parser.unescape)"""
+    return (text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+def fold(line: str) -> str:
+    """Fold a content line at 75 octets, never splitting a UTF-8 character"""
+    out, current, size = [], '', 0
+    for ch in line:
+        width = len(ch.encode('utf-8'))
+        if size + width > 75:
+            out.append(current)
+            current, size = ' ', 1
+        current += ch
+        size += width
+    out.append(current)
+    return '\r\n'.join(out) + '\r\n'
+
+def event_uid(event: Dict) -> str:
+    # Expanded instances of a recurring event share the series' iCalUID
+    if event.get('recurringEventId') or not event.get('iCalUID'):
+        return f"{event['id']}@calpal"
+    return event['iCalUID']
+
+def _point(point: Dict) -> tuple:
+    """(ICS property suffix, value) for an event start/end"""
+    if point.get('dateTime'):
+        dt = datetime.fromisoformat(point['dateTime'].replace('Z', '+00:00'))
+        return '', dt.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    return ';VALUE=DATE', point['date'].replace('-', '')
+
+def format_vevent(event: Dict, stamp: str) -> str:
+    """One VEVENT block for a Calendar event resource; times are written in UTC"""
+    start_param, start = _point(event['start'])
+    end_param, end = _point(event['end'])
+    lines: List[str] = [
+        'BEGIN:VEVENT',
+        f"UID:{event_uid(event)}",
+        f"DTSTAMP:{stamp}",
+        f"DTSTART{start_param}:{start}",
+        f"DTEND{end_param}:{end}",
+        f"SUMMARY:{escape(event.get('summary', ''))}",
+    ]
+    if event.get('location'):
+        lines.append(f"LOCATION:{escape(event['location'])}")
+    if event.get('description'):
+        lines.append(f"DESCRIPTION:{escape(event['description'])}")
+    lines.append('END:VEVENT')
+    return ''.join(fold(line) for line in lines)
+
+def csv_row(event: Dict) -> List[str]:
+    """CSV_COLUMNS values for an event; timed events in Asia/Kolkata"""
+    def local(point: Dict) -> str:
+        if point.get('dateTime'):
+            dt = datetime.fromisoformat(point['dateTime'].replace('Z', '+00:00'))
+            return dt.astimezone(IST).strftime("%Y-%m-%d %H:%M")
+        return point['date']
+
+    return [
+        event_uid(event),
+        event.get('summary', ''),
+        local(event['start']),
+        local(event['end']),
+        'no' if event['start'].get('dateTime') else 'yes',
+        event.get('location', ''),
+        event.get('description', ''),
+    ]
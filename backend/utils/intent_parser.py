@@ -0,0 +1,229 @@
+import re
+from typing import Dict, List, Tuple
+from utils.nlp_extractor import NLPExtractor, WEEKDAYS, MONTHS
+
+# Action verbs, same vocabulary as the Groq prompt rules
+VERBS = {
+    'create': {'add', 'schedule', 'book', 'create', 'remind', 'set'},
+    'update': {'move', 'change', 'reschedule', 'update', 'shift'},
+    'delete': {'delete', 'remove', 'cancel', 'clear'},
+    'list': {'list', 'show', 'display', 'what', "what's", 'whats', 'view'},
+}
+VERB_ACTION = {verb: action for action, verbs in VERBS.items() for verb in verbs}
+
+# Words that carry no title content
+FILLERS = {
+    'my', 'the', 'a', 'an', 'me', 'please', 'for', 'on', 'at', 'in', 'from', 'to', 'of', 'i',
+    'all', 'up', 'can', 'you', 'could', 'any', 'is', 'are', 'do', 'have', 'there', 's', 'by',
+    'events', 'event', 'schedule', 'schedules', 'calendar', 'appointments', 'upcoming', 'everything',
+    'called', 'named', 'till', 'until', 'sometime', 'anytime', 'whenever'
+}
+LIST_NOUNS = {'events', 'calendar', 'schedules', 'appointments', 'agenda'}
+
+DATE_WORDS = (
+    {'today', 'tomorrow', 'tonight', 'yesterday', 'next', 'this', 'week', 'weeks',
+     'month', 'months', 'day', 'days', 'am', 'pm', 'noon'}
+    | set(WEEKDAYS) | set(MONTHS)
+)
+UNITS = {'min', 'mins', 'minute', 'minutes', 'hour', 'hours', 'hr', 'hrs', 'h', 'day', 'days',
+         'week', 'weeks', 'am', 'pm'} | set(MONTHS)
+NUMBER_CONTEXT = {'at', 'from', 'to', 'in', 'next', 'by', 'for', 'till', 'until', 'of'} | set(MONTHS)
+
+TOKEN = re.compile(r"[A-Za-z0-9:.']+")
+TIME_TOKEN = re.compile(r"^\d{1,2}(?:[:.]\d{2})?(?:am|pm)$|^\d{1,2}[:.]\d{2}$")
+DURATION_TOKEN = re.compile(r"^\d+(?:min|mins|minutes?|h|hrs?|hours?)$")
+ORDINAL_TOKEN = re.compile(r"^\d{1,2}(?:st|nd|rd|th)$")
+DURATION = re.compile(r'\d+\s*(?:hours?|hrs?|minutes?|mins?)\b|from\s+\d{1,2}(?::\d{2})?\s*(?:am|pm)?\s+to\s+\d')
+BARE_HOUR = re.compile(r'\bat\s+\d{1,2}\b(?!\s*(?:am|pm|[:.]\d))')
+# "from 5 to 6:30 pm" – the start's am/pm is only implied by the end
+BARE_RANGE_START = re.compile(r'\bfrom\s+(\d{1,2})(?:[:.]\d{2})?\s+to\b')
+# "in 2 hours" – a start relative to now, which the extractor reads as a duration
+RELATIVE_OFFSET = re.compile(r'\bin\s+(?:an?|\d+)\s*(?:hours?|hrs?|h|minutes?|mins?)\b')
+QUOTED = re.compile(r'["\']([^"\']+)["\']')
+NEXT_DAYS = re.compile(r'next\s+(\d+)\s+days?')
+# Follow-up references to earlier results: "the third one", "#2", "it"
+ORDINAL_WORDS = {
+    'first': 1, 'second': 2, 'third': 3, 'fourth': 4, 'fifth': 5,
+    'sixth': 6, 'seventh': 7, 'eighth': 8, 'ninth': 9, 'tenth': 10, 'last': -1
+}
+PRONOUNS = {'it', 'that', 'this', 'that one', 'this one', 'the same one'}
+REFERENCE_WORDS = {'the', 'one', 'event', 'meeting', 'item', 'number', 'no', '#'} | set(ORDINAL_WORDS)
+ORDINAL_REF = re.compile(
+    r'\b(' + '|'.join(ORDINAL_WORDS) + r'|\d{1,2}(?:st|nd|rd|th))\s+(?:one|event|meeting|item)\b'
+    r'|(?:\bnumber|\bno\.|#)\s*(\d{1,2})\b', re.I
+)
+CLAUSE_SPLIT = re.compile(r'\s*(?:[,;]\s*)?\b(?:and then|and|then)\b\s*|\s*;\s*', re.I)
+
+class IntentParser:
+    """
+    Deterministic parser for unambiguous commands.
+
+    parse() returns the same intent dict GroqService produces plus a
+    confidence in [0, 1]. Confidence is high only when every word is
+    explained by the grammar (one action verb, filler, date/time/duration
+    words) and whatever is left forms a single contiguous title.
+    """
+
+    @staticmethod
+    def extract_time_range(text: str) -> str:
+        """Extract time range from text"""
+        if "this week" in text:
+            return "this_week"
+        elif "this month" in text:
+            return "this_month"
+        elif "next week" in text:
+            return "next_week"
+        elif "next month" in text:
+            return "next_month"
+
+        # Check for "next X days"
+        match = NEXT_DAYS.search(text)
+        if match:
+            return f"next_{match.group(1)}_days"
+
+        return None
+
+    @staticmethod
+    def extract_reference(title: str, text: str):
+        """
+        What a delete/update refers to when it names no event: a 1-based
+        position in the last listed events (-1 for "last"), 'it' for the
+        event last acted on, or None when title is an ordinary title
+        """
+        tl = (title or '').lower().strip(' .')
+        if tl in PRONOUNS:
+            return 'it'
+        # Only titles made of reference words ("third one", "number 2", "3")
+        if tl and not all(w in REFERENCE_WORDS or w.isdigit() or ORDINAL_TOKEN.match(w) for w in tl.replace('#', '# ').split()):
+            return None
+        match = ORDINAL_REF.search(text.lower())
+        if match:
+            word = match.group(1)
+            if word is None:
+                return int(match.group(2))
+            return ORDINAL_WORDS.get(word) or int(re.match(r'\d+', word).group(0))
+        if tl.lstrip('#').isdigit():
+            return int(tl.lstrip('#'))
+        return None
+
+    @staticmethod
+    def _explained(words: list, i: int) -> bool:
+        """Whether words[i] is grammar (filler, date/time/duration) rather than title"""
+        w = words[i]
+        if w in FILLERS or w in DATE_WORDS or w in UNITS:
+            return True
+        if TIME_TOKEN.match(w) or DURATION_TOKEN.match(w) or ORDINAL_TOKEN.match(w):
+            return True
+        if w.isdigit():
+            before = words[i - 1] if i > 0 else None
+            after = words[i + 1] if i + 1 < len(words) else None
+            return before in NUMBER_CONTEXT or after in UNITS
+        return False
+
+    @staticmethod
+    def parse_all(msg: str) -> Tuple[List[Dict], float]:
+        """
+        Intents for every command in msg, in order, with the lowest clause confidence
+
+        "delete standup and add review friday at 3pm" is split on and/then/;
+        into clauses that are parsed on their own. Each intent carries its
+        clause as 'text'. A clause without its own verb ("add coffee and
+        cake") keeps the confidence low, so the LLM gets those.
+        """
+        clauses = [c.strip(" ,.") for c in CLAUSE_SPLIT.split(msg)]
+        clauses = [c for c in clauses if c]
+        if len(clauses) <= 1:
+            intent, confidence = IntentParser.parse(msg)
+            return [intent], confidence
+
+        intents, confidences = [], []
+        for clause in clauses:
+            intent, confidence = IntentParser.parse(clause)
+            intents.append({**intent, "text": clause})
+            confidences.append(confidence)
+        return intents, min(confidences)
+
+    @staticmethod
+    def parse(msg: str) -> Tuple[Dict, float]:
+        ml = msg.lower()
+        tokens = [(m.group(0).lower().strip(".'"), m.start(), m.end()) for m in TOKEN.finditer(msg)]
+        words = [t[0] for t in tokens]
+
+        # Action verbs; "set up" counts as create only with "up" after it
+        actions = set()
+        verb_positions = []
+        for i, w in enumerate(words):
+            action = VERB_ACTION.get(w)
+            if w == 'set' and (i + 1 >= len(words) or words[i + 1] != 'up'):
+                action = None
+            # "show my schedule" – noun, not the verb
+            if w == 'schedule' and i > 0 and words[i - 1] in ('my', 'the', 'your', 'whole', 'full'):
+                action = None
+            if action:
+                actions.add(action)
+                verb_positions.append(i)
+
+        delete_all = 'delete' in actions and 'all' in words
+        if delete_all:
+            action = 'delete_all'
+        elif len(actions) == 1:
+            action = actions.pop()
+        elif not actions and LIST_NOUNS & set(words):
+            action = 'list'
+        else:
+            action = None
+
+        extracted = NLPExtractor.extract_all(msg)
+        intent = {
+            "action": action or "create",
+            "title": None,
+            "date": extracted.get("date"),
+            "time": extracted.get("time"),
+            "duration": extracted.get("duration") if DURATION.search(ml) else None,
+            "time_range": IntentParser.extract_time_range(ml)
+        }
+
+        # Several verbs ("delete x and add y") or none at all: leave it to the LLM
+        if action is None:
+            return intent, 0.2
+        if 'and' in words and not delete_all:
+            return intent, 0.4
+
+        leftover = [
+            i for i in range(len(words))
+            if i not in verb_positions and not IntentParser._explained(words, i)
+        ]
+
+        if action in ('list', 'delete_all'):
+            return intent, 1.0 if not leftover else 0.5
+
+        # "at 4" – morning or afternoon is the LLM's call
+        if BARE_HOUR.search(ml) and not intent["time"]:
+            return intent, 0.5
+        bare_start = BARE_RANGE_START.search(ml)
+        if bare_start and int(bare_start.group(1)) <= 12:
+            return intent, 0.5
+        if RELATIVE_OFFSET.search(ml):
+            return intent, 0.5
+        # "on 3rd" with no month: the grammar explains it but no date came of it
+        if not intent["date"] and any(ORDINAL_TOKEN.match(w) for w in words) and not ORDINAL_REF.search(ml):
+            return intent, 0.5
+
+        quote = QUOTED.search(msg)
+        if quote:
+            intent["title"] = quote.group(1).strip()
+            return intent, 0.95
+
+        if not leftover:
+            # "add event tomorrow at 5" – nothing that looks like a name
+            intent["title"] = "Event" if action == 'create' else None
+            return intent, 0.6 if action == 'create' else 0.3
+
+        contiguous = leftover == list(range(leftover[0], leftover[-1] + 1))
+        intent["title"] = msg[tokens[leftover[0]][1]:tokens[leftover[-1]][2]].strip(" \"'.,")
+        if not contiguous:
+            return intent, 0.5
+
+        # Titles right after the verb ("delete pwc") are the clearest case
+        confidence = 0.95 if verb_positions and verb_positions[0] < leftover[0] else 0.8
+        return intent, confidence
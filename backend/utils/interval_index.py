@@ -0,0 +1,119 @@
+from typing import List, Dict, Optional
+from datetime import datetime
+from utils.date_parser import DateParser
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Rebuild the tree once this many adds/removes are pending (or n/8, if larger)
+REBUILD_MIN = 32
+
+class _Node:
+    __slots__ = ('center', 'by_start', 'by_end', 'left', 'right')
+
+    def __init__(self, center, by_start, by_end, left, right):
+        self.center = center
+        self.by_start = by_start    # intervals containing center, ascending start
+        self.by_end = by_end        # the same intervals, descending end
+        self.left = left
+        self.right = right
+
+def _build(items: list) -> Optional[_Node]:
+    """Centered interval tree over (start, end, id) tuples"""
+    if not items:
+        return None
+    points = sorted(p for s, e, _ in items for p in (s, e))
+    center = points[len(points) // 2]
+    left, right, here = [], [], []
+    for item in items:
+        if item[1] < center:
+            left.append(item)
+        elif item[0] > center:
+            right.append(item)
+        else:
+            here.append(item)
+    # The median endpoint belongs to an interval that stays here, so both halves shrink
+    return _Node(
+        center,
+        sorted(here, key=lambda i: i[0]),
+        sorted(here, key=lambda i: i[1], reverse=True),
+        _build(left),
+        _build(right)
+    )
+
+class IntervalIndex:
+    """
+    Per-user index of event time spans for overlap queries.
+
+    A centered interval tree over DateParser.event_bounds (UTC; all-day
+    events cover whole Asia/Kolkata days) answers overlapping() in
+    O(log n + k). add()/remove() go to a small overlay that is scanned
+    linearly and folded into a rebuilt tree once it grows past
+    max(REBUILD_MIN, n/8), so write-through stays cheap.
+    """
+    def __init__(self, events: List[Dict] = ()):
+        self._docs = {}          # event id -> (start, end, event)
+        self._pending = {}       # event id -> (start, end, id), added since the last build
+        self._removed = set()    # ids still in the tree but no longer current
+        for e in events:
+            start, end = DateParser.event_bounds(e)
+            self._docs[e['id']] = (start, end, e)
+        self._rebuild()
+
+    def __len__(self):
+        return len(self._docs)
+
+    def _rebuild(self):
+        self._root = _build([(s, e, event_id) for event_id, (s, e, _) in self._docs.items()])
+        self._pending.clear()
+        self._removed.clear()
+
+    def _maybe_rebuild(self):
+        if len(self._pending) + len(self._removed) > max(REBUILD_MIN, len(self._docs) // 8):
+            self._rebuild()
+
+    def add(self, event: Dict):
+        """Index event, replacing any previous version with the same id"""
+        self.remove(event['id'])
+        start, end = DateParser.event_bounds(event)
+        self._docs[event['id']] = (start, end, event)
+        self._pending[event['id']] = (start, end, event['id'])
+        self._maybe_rebuild()
+
+    def remove(self, event_id: str):
+        if self._docs.pop(event_id, None) is None:
+            return
+        if self._pending.pop(event_id, None) is None:
+            self._removed.add(event_id)
+        self._maybe_rebuild()
+
+    def overlapping(self, start: datetime, end: datetime) -> List[Dict]:
+        """Events sharing time with [start, end), ordered by start"""
+        found = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            if end <= node.center:
+                # Every interval here ends at or after center, so only starts matter
+                for item in node.by_start:
+                    if item[0] >= end:
+                        break
+                    found.append(item)
+                stack.append(node.left)
+            elif start >= node.center:
+                for item in node.by_end:
+                    if item[1] <= start:
+                        break
+                    found.append(item)
+                stack.append(node.right)
+            else:
+                found.extend(node.by_start)
+                stack.append(node.left)
+                stack.append(node.right)
+
+        found = [i for i in found if i[2] not in self._removed and i[0] < end and i[1] > start]
+        found.extend(i for i in self._pending.values() if i[0] < end and i[1] > start)
+        found.sort(key=lambda i: (i[0], i[2]))
+        return [self._docs[i[2]][2] for i in found]
@@ -1,6 +1,10 @@
 import re
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Dict
+import logging
+
+logger = logging.getLogger(__name__)
 
 WEEKDAYS = {
     'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
@@ -15,6 +19,26 @@ MONTHS = {
     'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12
 }
 
+# Patterns are compiled once at import instead of rebuilt on every call
+_WEEKDAY_ALT = '|'.join(WEEKDAYS.keys())
+_MONTH_ALT = '|'.join(MONTHS.keys())
+
+IN_DAYS = re.compile(r'\bin\s+(\d+)\s+days?\b')
+IN_WEEKS = re.compile(r'\bin\s+(\d+)\s+weeks?\b')
+NEXT_WEEKDAY = re.compile(r'\bnext\s+(' + _WEEKDAY_ALT + r')\b')
+THIS_WEEKDAY = re.compile(r'\bthis\s+(' + _WEEKDAY_ALT + r')\b')
+BARE_WEEKDAY = re.compile(r'\b(' + _WEEKDAY_ALT + r')\b')
+MONTH_DAY = re.compile(r'\b(' + _MONTH_ALT + r')\s+(\d{1,2})(?:st|nd|rd|th)?\b')
+DAY_MONTH = re.compile(r'\b(\d{1,2})(?:st|nd|rd|th)?\s+(' + _MONTH_ALT + r')\b')
+NUMERIC_DATE = re.compile(r'\b(\d{1,2})/(\d{1,2})(?:/(\d{2,4}))?\b')
+
+RANGE_START = re.compile(r'from\s+(\d{1,2})(?:[:.](\d{2}))?\s*(am|pm)?')
+CLOCK_TIME = re.compile(r'(\d{1,2})(?:[:.] ?(\d{2}))?\s*(am|pm)')
+
+HOURS = re.compile(r'(\d+)\s*(?:hours?|hrs?)')
+MINUTES = re.compile(r'(\d+)\s*(?:minutes?|mins?)')
+TIME_RANGE = re.compile(r'from\s+(\d{1,2})(?::(\d{2}))?\s*(?:am|pm)?\s+to\s+(\d{1,2})(?::(\d{2}))?\s*(am|pm)?')
+
 def _next_weekday(target_weekday: int, force_next: bool = False) -> datetime:
     """Return the next occurrence of target_weekday (0=Mon...6=Sun).
     If force_next=True, always returns a future week (used for 'next X')."""
@@ -27,19 +51,44 @@ def _next_weekday(target_weekday: int, force_next: bool = False) -> datetime:
         pass
     return now + timedelta(days=days_ahead)
 
+@lru_cache(maxsize=512)
+def _extract_all(text: str, day: str) -> tuple:
+    """One lower-casing and one pass of each extractor; memoized per text and day"""
+    tl = text.lower()
+    has_digit = any(c.isdigit() for c in tl)
+    return (
+        NLPExtractor._date(tl, has_digit),
+        NLPExtractor._time(tl) if has_digit else None,
+        NLPExtractor._duration(tl) if has_digit else 60
+    )
+
 class NLPExtractor:
 
     @staticmethod
     def extract_all(text: str) -> Dict:
-        return {
-            "date": NLPExtractor.extract_date(text),
-            "time": NLPExtractor.extract_time(text),
-            "duration": NLPExtractor.extract_duration(text)
-        }
+        """
+        Date, time and duration in one call.
+
+        Results are memoized per (text, today), so the route and the Groq
+        fallback parser asking about the same message share one extraction.
+        """
+        date, time, duration = _extract_all(text, datetime.now().strftime("%Y-%m-%d"))
+        return {"date": date, "time": time, "duration": duration}
 
     @staticmethod
     def extract_date(text: str):
-        tl = text.lower()
+        return NLPExtractor._date(text.lower())
+
+    @staticmethod
+    def extract_time(text: str):
+        return NLPExtractor._time(text.lower())
+
+    @staticmethod
+    def extract_duration(text: str):
+        return NLPExtractor._duration(text.lower())
+
+    @staticmethod
+    def _date(tl: str, has_digit: bool = True):
         now = datetime.now()
 
         # Explicit keywords
@@ -55,41 +104,44 @@ class NLPExtractor:
             return (now + timedelta(weeks=1)).strftime("%Y-%m-%d")
 
         # "in X days" / "in X weeks"
-        m = re.search(r'\bin\s+(\d+)\s+days?\b', tl)
-        if m:
-            return (now + timedelta(days=int(m.group(1)))).strftime("%Y-%m-%d")
-        m = re.search(r'\bin\s+(\d+)\s+weeks?\b', tl)
-        if m:
-            return (now + timedelta(weeks=int(m.group(1)))).strftime("%Y-%m-%d")
-
-        # "next <weekday>" → always the coming week
-        m = re.search(r'\bnext\s+(' + '|'.join(WEEKDAYS.keys()) + r')\b', tl)
-        if m:
-            dt = _next_weekday(WEEKDAYS[m.group(1)], force_next=True)
-            return dt.strftime("%Y-%m-%d")
-
-        # "this <weekday>" → nearest occurrence this week (or today)
-        m = re.search(r'\bthis\s+(' + '|'.join(WEEKDAYS.keys()) + r')\b', tl)
-        if m:
-            dt = _next_weekday(WEEKDAYS[m.group(1)], force_next=False)
-            return dt.strftime("%Y-%m-%d")
+        if has_digit:
+            m = IN_DAYS.search(tl)
+            if m:
+                return (now + timedelta(days=int(m.group(1)))).strftime("%Y-%m-%d")
+            m = IN_WEEKS.search(tl)
+            if m:
+                return (now + timedelta(weeks=int(m.group(1)))).strftime("%Y-%m-%d")
 
         # Bare weekday name (e.g. "on friday", "schedule for monday") → this or next occurrence
         # If today matches the target weekday, return today; otherwise next occurrence
-        weekday_pattern = r'\b(' + '|'.join(WEEKDAYS.keys()) + r')\b'
-        m = re.search(weekday_pattern, tl)
+        m = BARE_WEEKDAY.search(tl)
         if m:
+            # "next <weekday>" → always the coming week
+            nm = NEXT_WEEKDAY.search(tl)
+            if nm:
+                dt = _next_weekday(WEEKDAYS[nm.group(1)], force_next=True)
+                return dt.strftime("%Y-%m-%d")
+
+            # "this <weekday>" → nearest occurrence this week (or today)
+            tm = THIS_WEEKDAY.search(tl)
+            if tm:
+                dt = _next_weekday(WEEKDAYS[tm.group(1)], force_next=False)
+                return dt.strftime("%Y-%m-%d")
+
             target = WEEKDAYS[m.group(1)]
             days_ahead = target - now.weekday()
             if days_ahead < 0:
                 days_ahead += 7
             return (now + timedelta(days=days_ahead)).strftime("%Y-%m-%d")
 
+        # Everything below needs a number
+        if not has_digit:
+            return None
+
         # "<Month> <day>" or "<day> <Month>" e.g. "April 30", "30th April"
-        month_pat = '|'.join(MONTHS.keys())
-        m = re.search(r'\b(' + month_pat + r')\s+(\d{1,2})(?:st|nd|rd|th)?\b', tl)
+        m = MONTH_DAY.search(tl)
         if not m:
-            m = re.search(r'\b(\d{1,2})(?:st|nd|rd|th)?\s+(' + month_pat + r')\b', tl)
+            m = DAY_MONTH.search(tl)
             if m:
                 day_num = int(m.group(1))
                 month_num = MONTHS[m.group(2)]
@@ -110,7 +162,7 @@ class NLPExtractor:
                 pass
 
         # Numeric date: MM/DD or DD/MM (assume MM/DD for ambiguous cases)
-        m = re.search(r'\b(\d{1,2})/(\d{1,2})(?:/(\d{2,4}))?\b', tl)
+        m = NUMERIC_DATE.search(tl)
         if m:
             try:
                 month_n, day_n = int(m.group(1)), int(m.group(2))
@@ -127,73 +179,60 @@ class NLPExtractor:
         return None
 
     @staticmethod
-    def extract_time(text: str):
-        tl = text.lower()
-
+    def _time(tl: str):
         # Priority 1: Range start time "from 5 to 5:30 PM"
-        range_match = re.search(r'from\s+(\d{1,2})(?:[:.](\d{2}))?\s*(am|pm)?', tl)
+        range_match = RANGE_START.search(tl)
         if range_match:
             hour = int(range_match.group(1))
             minute = int(range_match.group(2) or 0)
             meridiem = range_match.group(3)
-            
+
             if meridiem:
                 if meridiem == 'pm' and hour != 12:
                     hour += 12
                 elif meridiem == 'am' and hour == 12:
                     hour = 0
-            
+
             return f"{hour:02d}:{minute:02d}"
 
         # Priority 2: Regular time "at 5 PM", "5:30 PM"
-        m = re.search(r'(\d{1,2})(?:[:.] ?(\d{2}))?\s*(am|pm)', tl)
+        m = CLOCK_TIME.search(tl)
         if m:
             h = int(m.group(1))
             min_val = int(m.group(2) or 0)
             meridiem = m.group(3)
-            
+
             if meridiem == 'pm' and h != 12:
                 h += 12
             elif meridiem == 'am' and h == 12:
                 h = 0
-            
+
             return f"{h:02d}:{min_val:02d}"
 
         return None
 
     @staticmethod
-    def extract_duration(text: str):
-        tl = text.lower()
-
+    def _duration(tl: str):
         # Priority 1: Explicit hours "3 hours", "2 hrs"
-        m = re.search(r'(\d+)\s*(?:hours?|hrs?)', tl)
+        # (also covers the old "of X hours" pattern, which it always matched first)
+        m = HOURS.search(tl)
         if m:
             return int(m.group(1)) * 60
 
         # Priority 2: Explicit minutes "30 min", "45 minutes"
-        m = re.search(r'(\d+)\s*(?:minutes?|mins?)', tl)
-        if m:
-            return int(m.group(1))
-
-        # Priority 3: "of X min/hour" pattern
-        m = re.search(r'of\s+(\d+)\s*(?:hours?|hrs?)', tl)
-        if m:
-            return int(m.group(1)) * 60
-        
-        m = re.search(r'of\s+(\d+)\s*(?:minutes?|mins?)', tl)
+        m = MINUTES.search(tl)
         if m:
             return int(m.group(1))
 
-        # Priority 4: Time range "from 5 to 5:30", "5 to 5:30 PM"
-        range_pattern = r'from\s+(\d{1,2})(?::(\d{2}))?\s*(?:am|pm)?\s+to\s+(\d{1,2})(?::(\d{2}))?\s*(am|pm)?'
-        m = re.search(range_pattern, tl)
+        # Priority 3: Time range "from 5 to 5:30", "5 to 5:30 PM"
+        m = TIME_RANGE.search(tl)
         if m:
             start_h = int(m.group(1))
             start_m = int(m.group(2) or 0)
             end_h = int(m.group(3))
             end_m = int(m.group(4) or 0)
             meridiem = m.group(5)
-            
+
             # Handle PM times
             if meridiem == 'pm':
                 if end_h != 12:
@@ -201,11 +240,11 @@ class NLPExtractor:
                 # If start hour is less and in same period, also PM
                 if start_h < 12 and start_h < (end_h - 12):
                     start_h += 12
-            
+
             duration = (end_h * 60 + end_m) - (start_h * 60 + start_m)
             if duration > 0:
-                print(f"⏱️  Calculated duration from range: {duration}min")
+                logger.debug("⏱️  Calculated duration from range: %smin", duration)
                 return duration
 
         # Default
-        return 60
\ No newline at end of file
+        return 60
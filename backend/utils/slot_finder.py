@@ -0,0 +1,67 @@
+from typing import Iterator, List, Optional, Tuple
+from datetime import datetime, time, timedelta
+import logging
+
+logger = logging.getLogger(__name__)
+
+Span = Tuple[datetime, datetime]
+
+def merge_busy(busy: List[Span], buffer: timedelta = timedelta(0)) -> List[Span]:
+    """Sorted, non-overlapping busy spans, each padded by buffer on both sides"""
+    merged = []
+    for start, end in sorted(busy):
+        start, end = start - buffer, end + buffer
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [(s, e) for s, e in merged]
+
+def working_windows(start: datetime, end: datetime, tz, day_start: time, day_end: time, weekends: bool = False) -> Iterator[Span]:
+    """Each day's working hours in tz, clipped to [start, end)"""
+    day = start.astimezone(tz).date()
+    while True:
+        opens = tz.localize(datetime.combine(day, day_start))
+        if opens >= end:
+            return
+        if weekends or day.weekday() < 5:
+            lo = max(opens, start)
+            hi = min(tz.localize(datetime.combine(day, day_end)), end)
+            if lo < hi:
+                yield lo, hi
+        day += timedelta(days=1)
+
+def align(dt: datetime, tz, step: int) -> datetime:
+    """Round dt up to the next multiple of step minutes on tz's clock"""
+    local = dt.astimezone(tz)
+    extra = timedelta(minutes=local.minute % step, seconds=local.second, microseconds=local.microsecond)
+    return dt - extra + timedelta(minutes=step) if extra else dt
+
+def find_slot(busy: List[Span], start: datetime, end: datetime, duration: timedelta, tz,
+              day_start: time, day_end: time, buffer: timedelta = timedelta(0),
+              weekends: bool = False, step: int = 15) -> Optional[datetime]:
+    """
+    Earliest start of a free duration-long slot in [start, end)
+
+    Busy spans are padded by buffer and merged in one sorted sweep; the
+    working-hours windows and the merged spans are then walked together,
+    so the cost is O(b log b + days) however long the range is. Starts
+    are aligned to step minutes.
+    """
+    spans = merge_busy(busy, buffer)
+    i = 0
+    for opens, closes in working_windows(start, end, tz, day_start, day_end, weekends):
+        while i < len(spans) and spans[i][1] <= opens:
+            i += 1
+        cursor = align(opens, tz, step)
+        j = i
+        while cursor + duration <= closes:
+            while j < len(spans) and spans[j][1] <= cursor:
+                j += 1
+            if j < len(spans) and spans[j][0] < cursor + duration:
+                # Jump past the blocking span and try again
+                cursor = align(spans[j][1], tz, step)
+                continue
+            return cursor
+    return None
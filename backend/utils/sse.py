@@ -0,0 +1,5 @@
+import json
+
+def sse(event: str, data) -> str:
+    """One server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
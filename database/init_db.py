@@ -4,6 +4,7 @@ Run this once to set up MongoDB collections and indexes
 """
 
 from pymongo import MongoClient, ASCENDING
+from pymongo.errors import OperationFailure
 from datetime import datetime
 import sys
 import os
@@ -43,7 +44,7 @@ def init_database():
         db = client[settings.DATABASE_NAME]
         
         # Create collections
-        collections = ['users', 'chat_history', 'events_cache']
+        collections = ['users', 'chat_history', 'events_cache', 'sync_state', 'watch_channels']
         
         print(f"\n📦 Creating collections...")
         for collection_name in collections:
@@ -61,16 +62,33 @@ def init_database():
         db.users.create_index([("google_id", ASCENDING)], unique=True)
         print("✅ Users indexes created")
         
-        # Chat history indexes
+        # Chat history indexes; the timestamp one also expires old turns
+        retention = settings.CHAT_HISTORY_RETENTION_DAYS * 24 * 3600
         db.chat_history.create_index([("user_email", ASCENDING)])
-        db.chat_history.create_index([("timestamp", ASCENDING)])
-        print("✅ Chat history indexes created")
+        try:
+            db.chat_history.create_index([("timestamp", ASCENDING)], expireAfterSeconds=retention)
+        except OperationFailure:
+            # Plain timestamp index from an older setup, or a different retention
+            db.command('collMod', 'chat_history', index={'keyPattern': {'timestamp': 1}, 'expireAfterSeconds': retention})
+        print(f"✅ Chat history indexes created (retention: {settings.CHAT_HISTORY_RETENTION_DAYS} days)")
         
         # Events cache indexes
         db.events_cache.create_index([("user_email", ASCENDING)])
         db.events_cache.create_index([("event_id", ASCENDING)])
+        db.events_cache.create_index([("user_email", ASCENDING), ("event_id", ASCENDING)], unique=True)
+        db.events_cache.create_index([("user_email", ASCENDING), ("start", ASCENDING)])
         print("✅ Events cache indexes created")
         
+        # Sync state indexes (one sync token per user)
+        db.sync_state.create_index([("user_email", ASCENDING)], unique=True)
+        print("✅ Sync state indexes created")
+        
+        # Push channels: looked up by id on every notification, scanned by expiry for renewal
+        db.watch_channels.create_index([("channel_id", ASCENDING)], unique=True)
+        db.watch_channels.create_index([("user_email", ASCENDING)])
+        db.watch_channels.create_index([("expiration", ASCENDING)])
+        print("✅ Watch channel indexes created")
+        
         print(f"\n🎉 Database initialization completed successfully!")
         print(f"📊 Database: {settings.DATABASE_NAME}")
         print(f"📦 Collections: {', '.join(collections)}")
@@ -27,19 +27,37 @@ const ChatInterface = ({ userEmail }) => {
     setMessages(prev => [...prev, { text: userMessage, isUser: true }]);
     setLoading(true);
 
+    // The reply bubble appears with the first streamed content and is rewritten as more arrives
+    const replyId = Date.now();
+    const showReply = (text) => setMessages(prev => (
+      prev.some(m => m.id === replyId)
+        ? prev.map(m => (m.id === replyId ? { ...m, text } : m))
+        : [...prev, { id: replyId, text, isUser: false }]
+    ));
+    const lines = [];
+    let total = 0;
+    let deleted = 0;
+
     try {
-      const response = await chatService.sendMessage(userMessage, userEmail);
-      
-      setMessages(prev => [
-        ...prev,
-        { text: response.message, isUser: false }
-      ]);
+      const final = await chatService.streamMessage(userMessage, userEmail, (type, data) => {
+        if (type === 'event') {
+          lines.push(data.line);
+          showReply(lines.join('\n'));
+        } else if (type === 'result') {
+          lines.push(data.message);
+          showReply(lines.join('\n\n'));
+        } else if (type === 'progress') {
+          total = data.total;
+          showReply(`🗑️ Deleting ${total} events…`);
+        } else if (type === 'deleted') {
+          deleted += 1;
+          showReply(`🗑️ Deleted ${deleted} of ${total}…`);
+        }
+      });
+      showReply(final?.message || '❌ Sorry, something went wrong. Please try again.');
     } catch (error) {
       console.error('Send error:', error);
-      setMessages(prev => [
-        ...prev,
-        { text: '❌ Sorry, something went wrong. Please try again.', isUser: false }
-      ]);
+      showReply('❌ Sorry, something went wrong. Please try again.');
     } finally {
       setLoading(false);
     }
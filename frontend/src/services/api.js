@@ -29,4 +29,41 @@ export const chatService = {
     });
     return response.data;
   },
-};
\ No newline at end of file
+
+  // Calls onEvent(type, data) for each server-sent event from /chat/stream
+  // ('intent', 'event', 'result', 'progress', 'deleted', 'failed', 'summary',
+  // 'error') and resolves with the final summary (or error) payload.
+  streamMessage: async (message, userEmail, onEvent) => {
+    const response = await fetch(`${API_URL}/chat/stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ message, user_id: userEmail }),
+    });
+    if (!response.ok || !response.body) {
+      throw new Error(`Stream failed: ${response.status}`);
+    }
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let last = null;
+
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let boundary;
+      while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+        const chunk = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        const type = chunk.match(/^event: (.*)$/m)?.[1];
+        const data = chunk.match(/^data: (.*)$/m)?.[1];
+        if (!type || data === undefined) continue;
+        const payload = JSON.parse(data);
+        onEvent?.(type, payload);
+        if (type === 'summary' || type === 'error') last = payload;
+      }
+    }
+    return last;
+  },
+};